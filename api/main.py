@@ -1,5 +1,5 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Depends
-from fastapi.responses import HTMLResponse, FileResponse, JSONResponse
+from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Query
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from sqlalchemy.orm import Session
 import json
@@ -7,12 +7,29 @@ import geopandas as gpd
 from shapely.geometry import shape, mapping
 from config.database import SessionLocal, engine, Base
 from models.geospatial import GeospatialData
+from models.feature_stats import FeatureStats
 from pathlib import Path
+from typing import Optional
+from utils.artifacts import available_artifact, feature_collection
+from utils.spatial_queries import parse_bbox
+from utils.upload_jobs import upload_manager
+from utils.feature_stats import summarize
+from utils.request_metrics import MetricsMiddleware, TimedRoute, metrics_endpoint
+from utils.profiling import DEBUG_ENDPOINTS, ProfilingMiddleware
+from api import monitor
+from routers import debug
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
 app = FastAPI()
+app.router.route_class = TimedRoute
+app.add_middleware(MetricsMiddleware)
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+app.add_middleware(ProfilingMiddleware)
+app.include_router(monitor.router)
+if DEBUG_ENDPOINTS:
+    app.include_router(debug.router)
 
 # Dependency
 def get_db():
@@ -27,33 +44,22 @@ async def read_root():
     with open("templates/index.html", "r") as f:
         return HTMLResponse(content=f.read())
 
-@app.post("/api/upload")
-async def upload_file(file: UploadFile = File(...), db: Session = Depends(get_db)):
+@app.post("/api/upload", status_code=202)
+async def upload_file(file: UploadFile = File(...)):
+    if not file.filename.endswith('.geojson'):
+        raise HTTPException(status_code=400, detail="Unsupported file format")
     try:
-        # Read the uploaded file
-        content = await file.read()
-        
-        # Parse the file using geopandas
-        if file.filename.endswith('.geojson'):
-            gdf = gpd.read_file(content)
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported file format")
-        
-        # Store each feature in the database
-        for _, row in gdf.iterrows():
-            geom_json = json.loads(row.geometry.json())
-            feature = GeospatialData(
-                name=file.filename,
-                data_type="geojson",
-                geometry=geom_json
-            )
-            db.add(feature)
-        
-        db.commit()
-        return {"message": "File uploaded successfully"}
-    
+        job = await upload_manager.start(file)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return {"message": "File accepted for processing", "upload_id": job.id, "status": job.status}
+
+@app.get("/api/upload/{upload_id}")
+async def get_upload_status(upload_id: str):
+    job = upload_manager.get(upload_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return job.to_dict()
 
 @app.get("/api/data")
 def get_data(db: Session = Depends(get_db)):
@@ -76,7 +82,8 @@ def get_data(db: Session = Depends(get_db)):
 
 @app.get("/api/stats")
 def get_stats(db: Session = Depends(get_db)):
-    total = db.query(GeospatialData).count()
+    rows = db.query(FeatureStats).filter(FeatureStats.layer == GeospatialData.__tablename__).all()
+    total = summarize(rows)["total_features"]
     return {
         "total": total,
         "processing": 0,
@@ -88,20 +95,28 @@ def get_stats(db: Session = Depends(get_db)):
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 @app.get("/api/karnataka-data")
-async def get_karnataka_data():
+def get_karnataka_data(
+    bbox: Optional[str] = Query(None, description="min_lon,min_lat,max_lon,max_lat"),
+    fields: Optional[str] = Query(None, description="Comma-separated properties to include"),
+):
     try:
-        # First try to read from processed data
-        data_file = Path("data/karnataka_processed.geojson")
-        if not data_file.exists():
+        bounds = parse_bbox(bbox) if bbox else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    columns = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+
+    try:
+        # Prefer the spatially indexed artifacts over the GeoJSON hand-off
+        data_file = available_artifact()
+        if data_file is None:
             # Fall back to original file if processed doesn't exist
             data_file = Path("karnataka.geojson")
         
         if not data_file.exists():
             raise HTTPException(status_code=404, detail="Karnataka GeoJSON data not found")
         
-        with open(data_file, 'r', encoding='utf-8') as f:
-            geojson_data = json.load(f)
-        
-        return JSONResponse(content=geojson_data)
+        return Response(content=feature_collection(bounds, columns, data_file), media_type="application/json")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,15 +1,23 @@
 from fastapi import APIRouter, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
+import asyncio
+import json
 import os
 from utils.progress_monitor import ProgressMonitor
+from utils.request_metrics import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 # Set up templates directory
 templates_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templates')
 templates = Jinja2Templates(directory=templates_dir)
 
+# How often the stream checks the status file for changes
+STREAM_POLL_INTERVAL = float(os.getenv("MONITOR_STREAM_POLL_INTERVAL", "0.5"))
+# Comment line sent when nothing changed, keeps proxies from closing the stream
+STREAM_KEEPALIVE_INTERVAL = 15.0
+
 @router.get("/monitor", response_class=HTMLResponse)
 async def monitor_page(request: Request):
     """Render the monitoring dashboard"""
@@ -22,3 +30,36 @@ async def monitor_page(request: Request):
 async def get_status():
     """Get current ingestion status"""
     return ProgressMonitor.get_current_status()
+
+async def _status_events(request: Request):
+    """Full status as the first event, then only the fields that changed"""
+    last_status = {}
+    last_mtime = object()
+    idle = 0.0
+    while not await request.is_disconnected():
+        mtime = ProgressMonitor.status_mtime()
+        if mtime != last_mtime:
+            last_mtime = mtime
+            try:
+                status = ProgressMonitor.get_current_status()
+            except (OSError, ValueError):
+                status = last_status
+            delta = {key: value for key, value in status.items() if last_status.get(key) != value}
+            if delta:
+                last_status = status
+                idle = 0.0
+                yield f"data: {json.dumps(delta)}\n\n"
+        if idle >= STREAM_KEEPALIVE_INTERVAL:
+            idle = 0.0
+            yield ": keepalive\n\n"
+        await asyncio.sleep(STREAM_POLL_INTERVAL)
+        idle += STREAM_POLL_INTERVAL
+
+@router.get("/monitor/stream")
+async def stream_status(request: Request):
+    """Server-Sent Events stream of ingestion status deltas"""
+    return StreamingResponse(
+        _status_events(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
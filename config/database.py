@@ -1,9 +1,14 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from dotenv import load_dotenv
 import os
 
+from utils.request_metrics import instrument_sql_timing
+from utils.service_metrics import instrumented_pool
+
 # Load environment variables
 load_dotenv()
 
@@ -14,19 +19,53 @@ DB_NAME = os.getenv("DB_NAME", "karnataka_geodb")
 DB_USER = os.getenv("DB_USER", "postgres")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "postgres")
 
-# Create PostgreSQL URL
+# Connection budget: every API worker has a sync and an async pool, so the
+# connections this service may open (DB_MAX_CONNECTIONS, across all workers)
+# are split over 2 * workers pools unless the pool sizes are set explicitly.
+API_WORKERS = int(os.getenv("GUNICORN_WORKERS", "1"))
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "30"))
+_POOL_LIMIT = max(2, DB_MAX_CONNECTIONS // (2 * API_WORKERS))
+
+# Connection pool parameters (shared by the sync and async engines)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", str(_POOL_LIMIT // 2)))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", str(_POOL_LIMIT - DB_POOL_SIZE)))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))       # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))       # seconds before a connection is replaced
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "10"))   # seconds to establish a connection
+
+# Create PostgreSQL URL (psycopg 3 serves both the sync and asyncio engines)
 SQLALCHEMY_DATABASE_URL = f"postgresql+psycopg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+POOL_OPTIONS = dict(
+    pool_pre_ping=True,  # Enable automatic reconnection
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    connect_args={"connect_timeout": DB_CONNECT_TIMEOUT},
+)
+
 # Create SQLAlchemy engine
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
-    pool_pre_ping=True,  # Enable automatic reconnection
-    pool_size=5,         # Set connection pool size
-    max_overflow=10      # Maximum number of connections that can be created beyond pool_size
+    poolclass=instrumented_pool(QueuePool, "sync"),
+    **POOL_OPTIONS
 )
 
+# Async engine for the FastAPI read paths
+async_engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL,
+    poolclass=instrumented_pool(AsyncAdaptedQueuePool, "async"),
+    **POOL_OPTIONS
+)
+
+# Attribute SQL execution time to the API request that issued it
+instrument_sql_timing(engine)
+instrument_sql_timing(async_engine.sync_engine)
+
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 # Create Base class
 Base = declarative_base()
@@ -38,3 +77,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
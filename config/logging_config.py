@@ -1,6 +1,15 @@
+import atexit
+import copy
 import logging
 import os
+import queue
+import random
+import threading
+import time
+import weakref
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List
 
 # Create logs directory if it doesn't exist
 LOGS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs')
@@ -10,9 +19,228 @@ os.makedirs(LOGS_DIR, exist_ok=True)
 timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
 LOG_FILE = os.path.join(LOGS_DIR, f'geospatial_pipeline_{timestamp}.log')
 
+# Per-logger sampling and rate limits, e.g.
+#   LOG_SAMPLING="api.access=0.1,root=0.5"   keep 10% / 50% of INFO and DEBUG records
+#   LOG_RATE_LIMITS="api=200"                 at most 200 records per second
+LOG_SAMPLING = os.getenv("LOG_SAMPLING", "")
+LOG_RATE_LIMITS = os.getenv("LOG_RATE_LIMITS", "")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Seconds a WARNING+ record waits for queue space before being written inline
+LOG_QUEUE_BLOCK_TIMEOUT = float(os.getenv("LOG_QUEUE_BLOCK_TIMEOUT", "1"))
+
+
+def _parse_settings(value: str) -> Dict[str, float]:
+    settings = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, number = item.split("=", 1)
+            settings[name.strip()] = float(number)
+    return settings
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a random fraction of records below WARNING; always keep the rest"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+_rate_limiters: "weakref.WeakSet[RateLimitFilter]" = weakref.WeakSet()
+
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket over records below ERROR; the next kept record reports the drops"""
+
+    def __init__(self, per_second: float):
+        super().__init__()
+        self.per_second = per_second
+        self._tokens = per_second
+        self._last = time.monotonic()
+        self._dropped = 0
+        self._lock = threading.Lock()
+        _rate_limiters.add(self)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.per_second, self._tokens + (now - self._last) * self.per_second)
+            self._last = now
+            if self._tokens < 1:
+                self._dropped += 1
+                return False
+            self._tokens -= 1
+            if self._dropped:
+                record.dropped = self._dropped
+                self._dropped = 0
+        return True
+
+
+def apply_log_filters(logger: logging.Logger) -> None:
+    """Attach the sampling/rate-limit filters configured for this logger's name"""
+    name = logger.name
+    sample_rate = _parse_settings(LOG_SAMPLING).get(name)
+    if sample_rate is not None and sample_rate < 1:
+        logger.addFilter(SamplingFilter(sample_rate))
+    rate_limit = _parse_settings(LOG_RATE_LIMITS).get(name)
+    if rate_limit:
+        logger.addFilter(RateLimitFilter(rate_limit))
+
+
+class _DropCounter:
+    """Records below WARNING dropped because the queue was full"""
+
+    def __init__(self):
+        self.total = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def add(self) -> None:
+        with self._lock:
+            self.total += 1
+            self._pending += 1
+
+    def take(self) -> int:
+        """Drops not yet reported on a record"""
+        with self._lock:
+            pending, self._pending = self._pending, 0
+            return pending
+
+    def restore(self, count: int) -> None:
+        with self._lock:
+            self._pending += count
+
+
+_drops = _DropCounter()
+
+
+def dropped_records() -> int:
+    """Records dropped because the background writer fell behind"""
+    return _drops.total
+
+
+class _RoutedQueueHandler(QueueHandler):
+    """Enqueues records tagged with the handler set the writer thread should use.
+
+    In a process forked from the one running the writer thread (pool workers)
+    nothing drains the inherited queue, so records are written inline there.
+    """
+
+    def __init__(self, log_queue: queue.Queue, route: str):
+        super().__init__(log_queue)
+        self.route = route
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if os.getpid() != _writer_pid:
+            _dispatcher.dispatch(self.route, record)
+            return
+        super().emit(record)
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if record.levelno >= logging.WARNING:
+            # Never lose warnings and errors: wait for space, else write inline
+            try:
+                self.queue.put(record, timeout=LOG_QUEUE_BLOCK_TIMEOUT)
+            except queue.Full:
+                _dispatcher.dispatch(self.route, record)
+            return
+        # Never block the caller for routine records: drop and count them
+        dropped = _drops.take()
+        if dropped:
+            record.queue_dropped = dropped
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _drops.restore(dropped)
+            _drops.add()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only merge the message in the calling thread; formatting happens in
+        # the writer thread. Tracebacks are rendered here since the frames
+        # must not outlive the call.
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.route = self.route
+        return record
+
+
+class _Dispatcher(logging.Handler):
+    """Runs in the writer thread and hands each record to its route's handlers"""
+
+    def __init__(self):
+        super().__init__()
+        self.routes: Dict[str, List[logging.Handler]] = {}
+
+    def dispatch(self, route: str, record: logging.LogRecord) -> None:
+        for handler in self.routes.get(route, ()):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        self.dispatch(record.route, record)
+        return True
+
+
+_queue: queue.Queue = queue.Queue(LOG_QUEUE_SIZE)
+_dispatcher = _Dispatcher()
+_listener = None
+_listener_lock = threading.Lock()
+_writer_pid = None
+
+
+def _after_fork_in_child() -> None:
+    """The writer thread does not survive fork; locks held by other threads at
+    fork time would never be released in the child"""
+    global _listener_lock
+    _listener_lock = threading.Lock()
+    for limiter in list(_rate_limiters):
+        limiter._lock = threading.Lock()
+    _drops._lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def _stop_listener() -> None:
+    global _listener
+    with _listener_lock:
+        # A forked child inherits the listener object but not its thread
+        if _listener is not None and os.getpid() == _writer_pid:
+            _listener.stop()
+            _listener = None
+        for handlers in _dispatcher.routes.values():
+            for handler in handlers:
+                handler.close()
+
+
+def queue_handler(route: str, handlers: List[logging.Handler]) -> logging.Handler:
+    """Handler that forwards records to `handlers` on the background writer thread"""
+    global _listener, _writer_pid
+    with _listener_lock:
+        _dispatcher.routes[route] = handlers
+        if _listener is None:
+            _listener = QueueListener(_queue, _dispatcher)
+            _listener.start()
+            _writer_pid = os.getpid()
+            atexit.register(_stop_listener)
+    return _RoutedQueueHandler(_queue, route)
+
+
 def setup_logging():
     """Configure logging with both file and console handlers"""
-    
+    root_logger = logging.getLogger()
+    if any(isinstance(handler, _RoutedQueueHandler) for handler in root_logger.handlers):
+        return root_logger
+
     # Create formatters
     file_formatter = logging.Formatter(
         '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -31,10 +259,9 @@ def setup_logging():
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(console_formatter)
 
-    # Root logger
-    root_logger = logging.getLogger()
+    # Root logger; the handlers run on the background writer thread
     root_logger.setLevel(logging.DEBUG)
-    root_logger.addHandler(file_handler)
-    root_logger.addHandler(console_handler)
+    root_logger.addHandler(queue_handler("root", [file_handler, console_handler]))
+    apply_log_filters(root_logger)
 
     return root_logger
@@ -0,0 +1,41 @@
+"""Prometheus multiprocess mode for programs that run worker processes.
+
+prometheus_client decides where samples are kept when it is first imported:
+in process memory, or, with ``PROMETHEUS_MULTIPROC_DIR`` set, in per-process
+files that any process can aggregate at scrape time. Scripts whose process
+pools record metrics call :func:`enable_multiprocess_metrics` before anything
+imports prometheus_client (i.e. before importing ``config.database`` or
+``utils.metrics``); pool initializers call :func:`register_metrics_worker`.
+Gunicorn sets the directory itself (``gunicorn.conf.py``).
+"""
+import multiprocessing.util
+import os
+import shutil
+import sys
+import tempfile
+
+DEFAULT_MULTIPROC_DIR = os.path.join(tempfile.gettempdir(), "prometheus_multiproc")
+
+
+def enable_multiprocess_metrics(directory: str = DEFAULT_MULTIPROC_DIR) -> str:
+    """Point this process and its workers at an emptied samples directory"""
+    if "prometheus_client" in sys.modules and not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        raise RuntimeError("enable_multiprocess_metrics() must run before prometheus_client is imported")
+    directory = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", directory)
+    # Samples left over from a previous run would be added to the new totals
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def _mark_dead(pid: int) -> None:
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(pid)
+
+
+def register_metrics_worker() -> None:
+    """In a pool worker: drop its live gauges from the aggregate when it exits"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Finalizers run on a worker's normal exit, unlike atexit handlers
+        multiprocessing.util.Finalize(None, _mark_dead, args=(os.getpid(),), exitpriority=0)
@@ -0,0 +1,43 @@
+"""Gunicorn settings for the API with multiprocess Prometheus metrics.
+
+    gunicorn -c gunicorn.conf.py api.main:app
+
+Multiprocess metrics are always on here, so /metrics reports the totals of
+every worker whatever GUNICORN_WORKERS is.
+
+One worker by default, because some API state lives in process memory:
+
+* upload jobs (``/geospatial/upload/{id}`` is answered by the worker that
+  runs the job),
+* captured request profiles (``/debug/profiles``),
+* the ingestion progress pushed to the SSE monitor.
+
+With several workers a client polling one of these may land on a worker that
+has never seen it. The district index and the versioned caches are also per
+process, but they check the data version, so they only cost memory. Raise
+GUNICORN_WORKERS when those endpoints are not used, or with sticky routing.
+"""
+import os
+import shutil
+
+# prometheus_client picks its value storage when first imported, and workers
+# inherit this process's modules, so the directory is set before importing it.
+# It is only set here: the uvicorn and scheduler processes keep in-process metrics.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus_multiproc")
+
+from prometheus_client import multiprocess  # noqa: E402
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("GUNICORN_WORKERS", "1"))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+
+def on_starting(server):
+    # Samples left over from a previous run would be added to the new totals
+    directory = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+
+
+def child_exit(server, worker):
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,11 +1,14 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.exc import SQLAlchemyError
 from geoalchemy2.exceptions import ArgumentError
 from shapely.errors import ShapelyError
-from database import engine, Base
-from routers import districts, geospatial
+from database import engine, Base, SessionLocal
+from routers import debug, districts, geospatial
 from utils.logger import LoggerMiddleware, api_logger
+from utils.request_metrics import MetricsMiddleware, TimedRoute, metrics_endpoint
+from utils.profiling import DEBUG_ENDPOINTS, ProfilingMiddleware
+from utils.district_index import district_index
 from utils.error_handlers import (
     database_exception_handler,
     spatial_exception_handler,
@@ -21,6 +24,7 @@ app = FastAPI(
     description="API for managing Karnataka district geospatial data",
     version="1.0.0"
 )
+app.router.route_class = TimedRoute
 
 # Configure CORS
 app.add_middleware(
@@ -34,6 +38,13 @@ app.add_middleware(
 # Add logging middleware
 app.add_middleware(LoggerMiddleware)
 
+# Per-route latency metrics, scraped from /metrics
+app.add_middleware(MetricsMiddleware)
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
+# Opt-in request profiling (PROFILE_REQUEST_FRACTION; PROFILE_HEADER with DEBUG_ENDPOINTS)
+app.add_middleware(ProfilingMiddleware)
+
 # Register error handlers
 app.add_exception_handler(SQLAlchemyError, database_exception_handler)
 app.add_exception_handler(ArgumentError, spatial_exception_handler)
@@ -43,6 +54,17 @@ app.add_exception_handler(APIException, api_exception_handler)
 # Include routers
 app.include_router(districts.router, prefix="/api/v1")
 app.include_router(geospatial.router, prefix="/api/v1")
+if DEBUG_ENDPOINTS:
+    app.include_router(debug.router)
+
+@app.on_event("startup")
+def startup_district_index():
+    try:
+        with SessionLocal() as db:
+            district_index.load(db)
+    except SQLAlchemyError as e:
+        # Lookups load the index lazily once the database is reachable
+        api_logger.error(f"Could not preload district index: {str(e)}")
 
 @app.get("/")
 async def read_root():
@@ -53,8 +75,3 @@ async def read_root():
         "redoc_url": "/redoc"
     }
 
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    api_logger.info(f"Request path: {request.url.path}")
-    response = await call_next(request)
-    return response
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, JSON, DateTime
+from sqlalchemy import Column, Index, Integer, String, DateTime
+from sqlalchemy.dialects.postgresql import JSONB
 from geoalchemy2 import Geometry
 from datetime import datetime
 from database import Base
@@ -8,10 +9,15 @@ class District(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
-    geometry = Column(Geometry('MULTIPOLYGON', srid=4326))
-    properties = Column(JSON)
+    geometry = Column(Geometry('MULTIPOLYGON', srid=4326, spatial_index=True))
+    properties = Column(JSONB)  # GIN-indexed for @> containment filters
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_districts_properties", properties, postgresql_using="gin",
+              postgresql_ops={"properties": "jsonb_path_ops"}),
+    )
+
     class Config:
         orm_mode = True
@@ -0,0 +1,18 @@
+from sqlalchemy import BigInteger, Column, DateTime, Float, String
+from sqlalchemy.sql import func
+from config.database import Base
+
+class FeatureStats(Base):
+    """Running feature counts/areas per table, type and source.
+
+    Maintained by statement-level triggers (see utils.feature_stats), so reads
+    never scan the feature tables.
+    """
+    __tablename__ = "feature_stats"
+
+    layer = Column(String, primary_key=True)          # source table name
+    feature_type = Column(String, primary_key=True)
+    source = Column(String, primary_key=True)
+    feature_count = Column(BigInteger, nullable=False, default=0)
+    total_area_m2 = Column(Float, nullable=False, default=0.0)
+    last_updated = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON
+from sqlalchemy import DDL, Column, Index, Integer, String, DateTime, UniqueConstraint, event
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from geoalchemy2 import Geometry
 from config.database import Base
@@ -9,6 +10,42 @@ class GeospatialData(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String)
     data_type = Column(String)
+    source = Column(String, index=True)  # upload filename or loader name
+    properties = Column(JSONB)  # source attributes, GIN-indexed for @> filters
     geometry = Column(Geometry('GEOMETRY', srid=4326))  # PostGIS geometry column
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_geospatial_data_properties", properties, postgresql_using="gin",
+              postgresql_ops={"properties": "jsonb_path_ops"}),
+    )
+
+GEO_FEATURES_DEFAULT_SOURCE = "default"
+
+class GeoFeature(Base):
+    """List-partitioned by source; layers are replaced by partition swap (utils.partitions)"""
+    __tablename__ = "geo_features"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    source = Column(String, primary_key=True, server_default=GEO_FEATURES_DEFAULT_SOURCE)  # partition key
+    feature_id = Column(String)
+    feature_type = Column(String, index=True)
+    properties = Column(JSONB)
+    geometry = Column(Geometry('GEOMETRY', srid=4326))
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("source", "feature_id", name="uq_geo_features_source_feature_id"),
+        Index("ix_geo_features_properties", properties, postgresql_using="gin",
+              postgresql_ops={"properties": "jsonb_path_ops"}),
+        {"postgresql_partition_by": "LIST (source)"},
+    )
+
+# Rows whose source has no partition of its own
+event.listen(
+    GeoFeature.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS geo_features_default PARTITION OF geo_features DEFAULT"),
+)
@@ -0,0 +1,24 @@
+from sqlalchemy import BigInteger, Column, DateTime, Float, Integer, String, JSON
+from sqlalchemy.sql import func
+from config.database import Base
+
+class PipelineRun(Base):
+    """Performance summary of one ingestion or sync run (see utils.run_report)"""
+    __tablename__ = "pipeline_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    run_type = Column(String, index=True, nullable=False)
+    status = Column(String, nullable=False)
+    started_at = Column(DateTime(timezone=True), index=True, nullable=False)
+    finished_at = Column(DateTime(timezone=True), nullable=False)
+    duration_seconds = Column(Float, nullable=False)
+    features_processed = Column(Integer, nullable=False, default=0)
+    features_failed = Column(Integer, nullable=False, default=0)
+    features_per_second = Column(Float, nullable=False, default=0.0)
+    peak_rss_bytes = Column(BigInteger)
+    avg_cpu_percent = Column(Float)
+    max_threads = Column(Integer)
+    io_read_bytes = Column(BigInteger)
+    io_write_bytes = Column(BigInteger)
+    stage_percentages = Column(JSON)   # stage -> share of traced stage time
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
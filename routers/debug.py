@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from utils.profiling import debug_token_valid, profile_store
+from utils.request_metrics import TimedRoute
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+def require_debug_token(credentials: HTTPAuthorizationCredentials = Depends(_bearer)):
+    """Only callers presenting DEBUG_TOKEN may read profiles"""
+    if credentials is None or not debug_token_valid(credentials.credentials):
+        raise HTTPException(status_code=401, detail="Not authenticated",
+                            headers={"WWW-Authenticate": "Bearer"})
+
+
+# Mounted only when DEBUG_ENDPOINTS is enabled (see utils.profiling)
+router = APIRouter(
+    prefix="/debug",
+    tags=["debug"],
+    route_class=TimedRoute,
+    dependencies=[Depends(require_debug_token)]
+)
+
+@router.get("/profiles")
+def list_profiles():
+    """Slowest profiled requests, slowest first"""
+    return profile_store.summaries()
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+def get_profile(profile_id: int):
+    """Folded stacks of one profiled request (for flamegraph.pl or speedscope)"""
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(profile["collapsed"])
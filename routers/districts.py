@@ -1,15 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional
 from database import get_db
+from config.database import get_async_db
 from models.district import District as DistrictModel
-from schemas.district import District, DistrictCreate, DistrictUpdate
-from shapely.geometry import shape, mapping
+from schemas.district import (
+    District, DistrictCreate, DistrictUpdate, DistrictLookup, PointBatch, PointBatchLookup,
+    DistrictBulkUpdate, BulkItemResult, BulkResult, DistrictMeasures
+)
+import shapely
+from shapely.errors import ShapelyError
+from shapely.geometry import MultiPolygon, Polygon, shape, mapping
 from geoalchemy2.shape import from_shape
 import json
+import orjson
+from datetime import datetime
 from utils.sync_manager import run_sync
+from utils import spatial_queries
+from utils.district_index import district_index
+from utils.cache import district_cache, district_version_stmt, format_version
+from utils.topojson import encode_topology
+from utils.district_aggregates import district_measures, state_outline
+from utils.serialization import GeoJSONResponse, json_select, row_to_dict, rows_to_list
+from utils.streaming import iter_json_array, iter_ndjson
+from utils.export import EXPORT_FORMATS, filter_clauses, stream_export
+from utils.request_metrics import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
+
+# Rows written per transaction by the bulk endpoints
+BULK_BATCH_SIZE = 500
 
 @router.post("/districts/", response_model=District, tags=["districts"])
 def create_district(district: DistrictCreate, db: Session = Depends(get_db)):
@@ -23,26 +49,277 @@ def create_district(district: DistrictCreate, db: Session = Depends(get_db)):
     )
     db.add(db_district)
     db.commit()
-    db.refresh(db_district)
-    return db_district
+    district_index.invalidate()
+    return _district_response(db, db_district.id)
 
 @router.get("/districts/", response_model=List[District], tags=["districts"])
-def read_districts(
+async def read_districts(
+    request: Request,
     skip: int = Query(0, description="Skip first N items"),
     limit: int = Query(100, description="Limit the number of items returned"),
+    format: str = Query("json", pattern="^(json|topojson)$", description="Response format"),
+    quantization: int = Query(10000, ge=2, le=10**8, description="TopoJSON quantization grid size"),
+    bbox: Optional[str] = Query(None, description="min_lon,min_lat,max_lon,max_lat"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get districts with pagination (optionally filtered by bbox and prop.<key>=<value>)"""
+    try:
+        clauses = filter_clauses(DistrictModel, bbox, request.query_params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if format == "topojson":
+        if clauses:
+            raise HTTPException(status_code=400, detail="TopoJSON output does not support filters")
+        return await _topojson_response(db, skip, limit, quantization)
+    stmt = json_select(DistrictModel).where(*clauses).order_by(DistrictModel.id).offset(skip).limit(limit)
+    return GeoJSONResponse(rows_to_list(await db.execute(stmt)))
+
+def _district_stmt(district_id: int):
+    return json_select(DistrictModel).where(DistrictModel.id == district_id)
+
+def _row_response(row) -> GeoJSONResponse:
+    """Single district serialized straight from PostGIS"""
+    if row is None:
+        raise HTTPException(status_code=404, detail="District not found")
+    return GeoJSONResponse(row_to_dict(row))
+
+def _district_response(db: Session, district_id: int) -> GeoJSONResponse:
+    return _row_response(db.execute(_district_stmt(district_id)).first())
+
+async def _topojson_response(db: AsyncSession, skip: int, limit: Optional[int], quantization: int) -> Response:
+    """District page encoded as TopoJSON, cached per data version"""
+    version = format_version((await db.execute(district_version_stmt())).one())
+    key = ("topojson", skip, limit, quantization)
+    content = district_cache.get(key, version)
+    if content is None:
+        rows = (await db.execute(
+            select(
+                DistrictModel.id,
+                DistrictModel.name,
+                DistrictModel.properties,
+                func.ST_AsBinary(DistrictModel.geometry)
+            )
+            .where(DistrictModel.geometry.isnot(None))
+            .order_by(DistrictModel.id)
+            .offset(skip)
+            .limit(limit)
+        )).all()
+        content = await run_in_threadpool(_encode_topojson, rows, quantization)
+        district_cache.put(key, version, content)
+    return Response(content=content, media_type="application/json")
+
+def _encode_topojson(rows, quantization: int) -> bytes:
+    features = [
+        {
+            "id": row.id,
+            "properties": {**(row.properties or {}), "name": row.name},
+            "geometry": shapely.from_wkb(bytes(row[3]))
+        }
+        for row in rows
+    ]
+    return orjson.dumps(encode_topology(features, quantization=quantization))
+
+@router.get("/districts/aggregates", response_model=List[DistrictMeasures], tags=["spatial"])
+async def get_district_aggregates(db: AsyncSession = Depends(get_async_db)):
+    """Equal-area area, geodesic perimeter and centroid of every district (cached per data version)"""
+    return Response(content=await district_measures(db), media_type="application/json")
+
+@router.get("/districts/outline", tags=["spatial"])
+async def get_state_outline(db: AsyncSession = Depends(get_async_db)):
+    """All districts dissolved into the state outline, with its area and perimeter"""
+    return Response(content=await state_outline(db), media_type="application/geo+json")
+
+@router.get("/districts/export", tags=["districts"])
+async def export_districts(
+    request: Request,
+    format: str = Query("geojson", pattern="^(geojson|ndjson|csv|parquet|fgb|topojson)$",
+                        description="Export format"),
+    bbox: Optional[str] = Query(None, description="min_lon,min_lat,max_lon,max_lat"),
+    quantization: int = Query(10000, ge=2, le=10**8, description="TopoJSON quantization grid size"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Stream every district (optionally filtered by bbox and prop.<key>=<value>)"""
+    try:
+        clauses = filter_clauses(DistrictModel, bbox, request.query_params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if format == "topojson":
+        if clauses:
+            raise HTTPException(status_code=400, detail="TopoJSON export does not support filters")
+        return await _topojson_response(db, 0, None, quantization)
+    export_format = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        stream_export(DistrictModel, format, clauses),
+        media_type=export_format.media_type,
+        headers={"Content-Disposition": f'attachment; filename="districts.{export_format.extension}"'}
+    )
+
+@router.get("/districts/lookup", response_model=DistrictLookup, tags=["spatial"])
+def lookup_district(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude"),
     db: Session = Depends(get_db)
 ):
-    """Get all districts with pagination"""
-    districts = db.query(DistrictModel).offset(skip).limit(limit).all()
-    return districts
+    """Find the district containing a point using the in-memory index"""
+    district_index.ensure_current(db)
+    match = district_index.lookup(lon, lat)
+    if match is None:
+        return DistrictLookup(lon=lon, lat=lat)
+    return DistrictLookup(lon=lon, lat=lat, district_id=match[0], name=match[1])
+
+@router.post("/districts/lookup", response_model=PointBatchLookup, tags=["spatial"])
+def lookup_districts_batch(points: PointBatch, db: Session = Depends(get_db)):
+    """Resolve many points to districts in a single vectorized call"""
+    if len(points.lons) != len(points.lats):
+        raise HTTPException(status_code=400, detail="lons and lats must have the same length")
+    district_index.ensure_current(db)
+    ids, names = district_index.lookup_many(points.lons, points.lats)
+    return PointBatchLookup(
+        district_ids=[i if i >= 0 else None for i in ids.tolist()],
+        names=names,
+        matched=int((ids >= 0).sum())
+    )
+
+def _multipolygon(geometry: dict):
+    """District geometry column is MULTIPOLYGON; promote single polygons"""
+    geom = shape(geometry)
+    if isinstance(geom, Polygon):
+        geom = MultiPolygon([geom])
+    if not isinstance(geom, MultiPolygon):
+        raise ValueError(f"Expected a Polygon or MultiPolygon, got {geom.geom_type}")
+    return from_shape(geom, srid=4326)
+
+def _bulk_items(request: Request):
+    """Parse the body incrementally as NDJSON or a JSON array"""
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        return iter_ndjson(request.stream())
+    return iter_json_array(request.stream())
+
+async def _aenumerate(iterator):
+    index = 0
+    async for item in iterator:
+        yield index, item
+        index += 1
+
+def _bulk_result(results: List[BulkItemResult]) -> BulkResult:
+    results.sort(key=lambda r: r.index)
+    failed = sum(1 for r in results if r.status == "error")
+    return BulkResult(succeeded=len(results) - failed, failed=failed, items=results)
+
+async def _insert_batch(db: AsyncSession, batch: list, results: List[BulkItemResult]):
+    """Insert one batch of districts in a single transaction"""
+    if not batch:
+        return
+    try:
+        ids = (await db.execute(
+            insert(DistrictModel).returning(DistrictModel.id, sort_by_parameter_order=True),
+            [values for _, values in batch]
+        )).scalars().all()
+        await db.commit()
+        district_index.invalidate()
+        results.extend(BulkItemResult(index=i, status="created", id=id_) for (i, _), id_ in zip(batch, ids))
+    except SQLAlchemyError as e:
+        await db.rollback()
+        results.extend(BulkItemResult(index=i, status="error", detail=str(getattr(e, "orig", None) or e)) for i, _ in batch)
+    batch.clear()
+
+async def _update_batch(db: AsyncSession, batch: list, results: List[BulkItemResult]):
+    """Apply one batch of updates in a single transaction"""
+    if not batch:
+        return
+    try:
+        ids = [values["id"] for _, values in batch]
+        existing = set((await db.execute(
+            select(DistrictModel.id).where(DistrictModel.id.in_(ids))
+        )).scalars().all())
+        found = [(i, values) for i, values in batch if values["id"] in existing]
+        results.extend(
+            BulkItemResult(index=i, status="error", id=values["id"], detail="District not found")
+            for i, values in batch if values["id"] not in existing
+        )
+        # Bulk UPDATE by primary key needs the same columns in every parameter set
+        groups = {}
+        for i, values in found:
+            groups.setdefault(frozenset(values), []).append(values)
+        for params in groups.values():
+            await db.execute(update(DistrictModel), params)
+        await db.commit()
+        district_index.invalidate()
+        results.extend(BulkItemResult(index=i, status="updated", id=values["id"]) for i, values in found)
+    except SQLAlchemyError as e:
+        await db.rollback()
+        results.extend(BulkItemResult(index=i, status="error", detail=str(getattr(e, "orig", None) or e)) for i, _ in batch)
+    batch.clear()
+
+@router.post("/districts/bulk", response_model=BulkResult, tags=["districts"])
+async def bulk_create_districts(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Create many districts from a JSON array or an NDJSON stream"""
+    results: List[BulkItemResult] = []
+    batch = []
+    index = -1
+    try:
+        async for index, (item, error) in _aenumerate(_bulk_items(request)):
+            if error is None:
+                try:
+                    district = DistrictCreate(**item)
+                    now = datetime.utcnow()
+                    batch.append((index, {
+                        "name": district.name,
+                        "geometry": _multipolygon(district.geometry),
+                        "properties": district.properties,
+                        "created_at": now,
+                        "updated_at": now,
+                    }))
+                except (ValidationError, ShapelyError, ValueError, TypeError, KeyError) as e:
+                    error = str(e)
+            if error is not None:
+                results.append(BulkItemResult(index=index, status="error", detail=error))
+            if len(batch) >= BULK_BATCH_SIZE:
+                await _insert_batch(db, batch, results)
+    except ValueError as e:
+        await _insert_batch(db, batch, results)
+        raise HTTPException(status_code=400, detail={"message": str(e), "after_index": index,
+                                                     "result": _bulk_result(results).dict()})
+    await _insert_batch(db, batch, results)
+    return _bulk_result(results)
+
+@router.put("/districts/bulk", response_model=BulkResult, tags=["districts"])
+async def bulk_update_districts(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Update many districts by id from a JSON array or an NDJSON stream"""
+    results: List[BulkItemResult] = []
+    batch = []
+    index = -1
+    try:
+        async for index, (item, error) in _aenumerate(_bulk_items(request)):
+            if error is None:
+                try:
+                    district = DistrictBulkUpdate(**item)
+                    values = {"id": district.id, "updated_at": datetime.utcnow()}
+                    if district.name is not None:
+                        values["name"] = district.name
+                    if district.properties is not None:
+                        values["properties"] = district.properties
+                    if district.geometry is not None:
+                        values["geometry"] = _multipolygon(district.geometry)
+                    batch.append((index, values))
+                except (ValidationError, ShapelyError, ValueError, TypeError, KeyError) as e:
+                    error = str(e)
+            if error is not None:
+                results.append(BulkItemResult(index=index, status="error", detail=error))
+            if len(batch) >= BULK_BATCH_SIZE:
+                await _update_batch(db, batch, results)
+    except ValueError as e:
+        await _update_batch(db, batch, results)
+        raise HTTPException(status_code=400, detail={"message": str(e), "after_index": index,
+                                                     "result": _bulk_result(results).dict()})
+    await _update_batch(db, batch, results)
+    return _bulk_result(results)
 
 @router.get("/districts/{district_id}", response_model=District, tags=["districts"])
-def read_district(district_id: int, db: Session = Depends(get_db)):
+async def read_district(district_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get a specific district by ID"""
-    district = db.query(DistrictModel).filter(DistrictModel.id == district_id).first()
-    if district is None:
-        raise HTTPException(status_code=404, detail="District not found")
-    return district
+    return _row_response((await db.execute(_district_stmt(district_id))).first())
 
 @router.put("/districts/{district_id}", response_model=District, tags=["districts"])
 def update_district(
@@ -62,8 +339,8 @@ def update_district(
         db_district.properties = district_update.properties
     
     db.commit()
-    db.refresh(db_district)
-    return db_district
+    district_index.invalidate()
+    return _district_response(db, district_id)
 
 @router.delete("/districts/{district_id}", tags=["districts"])
 def delete_district(district_id: int, db: Session = Depends(get_db)):
@@ -74,23 +351,81 @@ def delete_district(district_id: int, db: Session = Depends(get_db)):
     
     db.delete(district)
     db.commit()
+    district_index.invalidate()
     return {"message": f"District {district_id} deleted successfully"}
 
 # Spatial Queries
 @router.get("/districts/within/bbox", response_model=List[District], tags=["spatial"])
-def get_districts_within_bbox(
+async def get_districts_within_bbox(
     min_lon: float = Query(..., description="Minimum longitude"),
     min_lat: float = Query(..., description="Minimum latitude"),
     max_lon: float = Query(..., description="Maximum longitude"),
     max_lat: float = Query(..., description="Maximum latitude"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all districts within a bounding box"""
-    bbox = f'POLYGON(({min_lon} {min_lat}, {max_lon} {min_lat}, {max_lon} {max_lat}, {min_lon} {max_lat}, {min_lon} {min_lat}))'
-    districts = db.query(DistrictModel).filter(
-        DistrictModel.geometry.ST_Within(f'ST_SetSRID(ST_GeomFromText(\'{bbox}\'), 4326)')
-    ).all()
-    return districts
+    try:
+        clause = spatial_queries.within_bbox(DistrictModel.geometry, min_lon, min_lat, max_lon, max_lat)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    stmt = json_select(DistrictModel).where(clause)
+    return GeoJSONResponse(rows_to_list(await db.execute(stmt)))
+
+@router.get("/districts/intersects/bbox", response_model=List[District], tags=["spatial"])
+async def get_districts_intersecting_bbox(
+    min_lon: float = Query(..., description="Minimum longitude"),
+    min_lat: float = Query(..., description="Minimum latitude"),
+    max_lon: float = Query(..., description="Maximum longitude"),
+    max_lat: float = Query(..., description="Maximum latitude"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get all districts intersecting a bounding box"""
+    try:
+        clause = spatial_queries.intersects_bbox(DistrictModel.geometry, min_lon, min_lat, max_lon, max_lat)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    stmt = json_select(DistrictModel).where(clause)
+    return GeoJSONResponse(rows_to_list(await db.execute(stmt)))
+
+@router.get("/districts/contains/point", response_model=List[District], tags=["spatial"])
+async def get_districts_containing_point(
+    lon: float = Query(..., description="Longitude"),
+    lat: float = Query(..., description="Latitude"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get the districts containing a point"""
+    stmt = json_select(DistrictModel).where(
+        spatial_queries.contains_point(DistrictModel.geometry, lon, lat)
+    )
+    return GeoJSONResponse(rows_to_list(await db.execute(stmt)))
+
+@router.get("/districts/within/distance", response_model=List[District], tags=["spatial"])
+async def get_districts_within_distance(
+    lon: float = Query(..., description="Longitude"),
+    lat: float = Query(..., description="Latitude"),
+    meters: float = Query(..., ge=0, description="Search radius in metres"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get all districts within a distance of a point"""
+    stmt = json_select(DistrictModel).where(
+        spatial_queries.within_distance(DistrictModel.geometry, lon, lat, meters)
+    )
+    return GeoJSONResponse(rows_to_list(await db.execute(stmt)))
+
+@router.get("/districts/nearest/point", response_model=List[District], tags=["spatial"])
+async def get_nearest_districts(
+    lon: float = Query(..., description="Longitude"),
+    lat: float = Query(..., description="Latitude"),
+    n: int = Query(1, ge=1, le=100, description="Number of districts to return"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get the N districts nearest to a point (KNN index scan)"""
+    stmt = (
+        json_select(DistrictModel)
+        .order_by(spatial_queries.nearest_order(DistrictModel.geometry, lon, lat))
+        .limit(n)
+    )
+    return GeoJSONResponse(rows_to_list(await db.execute(stmt)))
 
 @router.post("/sync", tags=["sync"])
 def sync_data():
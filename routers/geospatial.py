@@ -1,70 +1,91 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from sqlalchemy.orm import Session
-from typing import List
-import geopandas as gpd
-from shapely.geometry import shape
-import json
-from models.database import get_db
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from config.database import get_async_db
 from models.geospatial import GeospatialData
-from schemas.geospatial import GeospatialResponse, GeospatialStats
+from models.feature_stats import FeatureStats
+from schemas.geospatial import GeospatialStats, UploadAccepted, UploadStatus
 from utils.logger import api_logger
+from utils.upload_jobs import upload_manager
+from utils.export import EXPORT_FORMATS, filter_clauses, stream_export
+from utils.feature_stats import summarize
+from utils.serialization import GeoJSONResponse, json_select, rows_to_list
+from utils.request_metrics import TimedRoute
 
 router = APIRouter(
     prefix="/geospatial",
-    tags=["Geospatial Operations"]
+    tags=["Geospatial Operations"],
+    route_class=TimedRoute
 )
 
-@router.post("/upload", response_model=GeospatialResponse)
-async def upload_geospatial_data(
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db)
-):
-    """Upload and process geospatial data"""
+@router.post("/upload", response_model=UploadAccepted, status_code=202)
+async def upload_geospatial_data(request: Request, file: UploadFile = File(...)):
+    """Upload geospatial data; features are stored by a background worker"""
+    if not file.filename.endswith('.geojson'):
+        raise HTTPException(status_code=400, detail="Only GeoJSON files are supported")
     try:
-        if not file.filename.endswith('.geojson'):
-            raise HTTPException(status_code=400, detail="Only GeoJSON files are supported")
-        
-        content = await file.read()
-        geojson_data = json.loads(content)
-        
-        # Convert to GeoDataFrame for processing
-        gdf = gpd.GeoDataFrame.from_features(geojson_data['features'])
-        
-        # Process and store each feature
-        processed_features = []
-        for _, row in gdf.iterrows():
-            geom = shape(row.geometry)
-            feature = GeospatialData(
-                name=row.get('name', 'Unknown'),
-                geometry=f'SRID=4326;{geom.wkt}',
-                properties=row.to_dict()
-            )
-            db.add(feature)
-            processed_features.append(feature)
-        
-        db.commit()
-        api_logger.info(f"Successfully processed {len(processed_features)} features")
-        
-        return GeospatialResponse(
-            message="Data uploaded successfully",
-            feature_count=len(processed_features)
-        )
-    
+        job = await upload_manager.start(file)
     except Exception as e:
-        api_logger.error(f"Error processing geospatial data: {str(e)}")
+        api_logger.error(f"Error spooling geospatial upload: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+    return UploadAccepted(
+        upload_id=job.id,
+        status=job.status,
+        status_url=str(request.url_for("get_upload_status", upload_id=job.id))
+    )
+
+@router.get("/upload/{upload_id}", response_model=UploadStatus)
+async def get_upload_status(upload_id: str):
+    """Poll the progress of a background upload"""
+    job = upload_manager.get(upload_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return UploadStatus(**job.to_dict())
 
 @router.get("/stats", response_model=GeospatialStats)
-async def get_geospatial_stats(db: Session = Depends(get_db)):
+async def get_geospatial_stats(db: AsyncSession = Depends(get_async_db)):
     """Get statistics about the stored geospatial data"""
     try:
-        total_features = db.query(GeospatialData).count()
-        return GeospatialStats(
-            total_features=total_features,
-            last_updated=db.query(GeospatialData).order_by(
-                GeospatialData.created_at.desc()
-            ).first().created_at if total_features > 0 else None
-        )
+        rows = (await db.execute(
+            select(FeatureStats).where(FeatureStats.layer == GeospatialData.__tablename__)
+        )).scalars().all()
+        return GeospatialStats(**summarize(rows))
     except Exception as e:
         api_logger.error(f"Error fetching geospatial stats: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/features")
+async def query_features(
+    request: Request,
+    skip: int = Query(0, ge=0, description="Skip first N items"),
+    limit: int = Query(100, ge=1, le=10000, description="Limit the number of items returned"),
+    bbox: Optional[str] = Query(None, description="min_lon,min_lat,max_lon,max_lat"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Stored features filtered by bbox, prop.<key>=<value> and prop=<json containment>"""
+    try:
+        clauses = filter_clauses(GeospatialData, bbox, request.query_params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    stmt = json_select(GeospatialData).where(*clauses).order_by(GeospatialData.id).offset(skip).limit(limit)
+    return GeoJSONResponse(rows_to_list(await db.execute(stmt)))
+
+@router.get("/export")
+async def export_geospatial_data(
+    request: Request,
+    format: str = Query("geojson", pattern="^(geojson|ndjson|csv|parquet|fgb)$", description="Export format"),
+    bbox: Optional[str] = Query(None, description="min_lon,min_lat,max_lon,max_lat")
+):
+    """Stream stored features (optionally filtered by bbox and property filters)"""
+    try:
+        clauses = filter_clauses(GeospatialData, bbox, request.query_params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    export_format = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        stream_export(GeospatialData, format, clauses),
+        media_type=export_format.media_type,
+        headers={"Content-Disposition": f'attachment; filename="features.{export_format.extension}"'}
+    )
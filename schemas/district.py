@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 
 class DistrictBase(BaseModel):
@@ -21,3 +21,43 @@ class District(DistrictBase):
 
     class Config:
         orm_mode = True
+
+class DistrictLookup(BaseModel):
+    lon: float
+    lat: float
+    district_id: Optional[int] = None
+    name: Optional[str] = None
+
+class DistrictMeasures(BaseModel):
+    id: int
+    name: str
+    area_km2: float
+    perimeter_km: float
+    centroid_lon: float
+    centroid_lat: float
+
+class PointBatch(BaseModel):
+    lons: List[float]
+    lats: List[float]
+
+class PointBatchLookup(BaseModel):
+    district_ids: List[Optional[int]]
+    names: List[Optional[str]]
+    matched: int
+
+class DistrictBulkUpdate(BaseModel):
+    id: int
+    name: Optional[str] = None
+    geometry: Optional[Dict[str, Any]] = None
+    properties: Optional[Dict[str, Any]] = None
+
+class BulkItemResult(BaseModel):
+    index: int
+    status: str
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+class BulkResult(BaseModel):
+    succeeded: int
+    failed: int
+    items: List[BulkItemResult]
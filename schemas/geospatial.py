@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Optional
 
 class GeospatialResponse(BaseModel):
     message: str
@@ -8,7 +8,27 @@ class GeospatialResponse(BaseModel):
 
 class GeospatialStats(BaseModel):
     total_features: int
+    total_area_m2: float = 0.0
+    by_type: Dict[str, int] = {}
+    by_source: Dict[str, int] = {}
     last_updated: Optional[datetime] = None
 
     class Config:
         from_attributes = True
+
+class UploadAccepted(BaseModel):
+    upload_id: str
+    status: str
+    status_url: str
+
+class UploadStatus(BaseModel):
+    upload_id: str
+    filename: str
+    status: str
+    total_features: Optional[int] = None
+    processed_features: int
+    failed_features: int
+    progress_percentage: Optional[float] = None
+    error: Optional[str] = None
+    created_at: float
+    finished_at: Optional[float] = None
@@ -1,15 +1,29 @@
 import logging
 import os
+import re
+from collections import Counter
 from datetime import datetime
+from importlib.util import find_spec
 from pathlib import Path
 import geopandas as gpd
 import json
-from shapely.geometry import shape
+import shapely
 import sys
 import smtplib
 from email.message import EmailMessage
 from dotenv import load_dotenv
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import artifacts
+from utils.artifacts import PROCESSED_FGB, PROCESSED_PARQUET, write_artifacts
+from utils.stage_cache import Stage, StagePipeline
+
+# pyogrio reads through Arrow in bulk; fiona is the fallback
+IO_ENGINE = "pyogrio" if find_spec("pyogrio") else "fiona"
+TARGET_CRS = "EPSG:4326"
+# Coordinates in GEOS validity reasons, e.g. "Self-intersection[77.5 12.9]"
+_REASON_LOCATION = re.compile(r"\[.*\]$")
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -24,68 +38,122 @@ class GeospatialPipeline:
     def __init__(self):
         self.data_dir = Path("data")
         self.data_dir.mkdir(exist_ok=True)
+        self.source_file = Path("karnataka.geojson")
         self.raw_file = self.data_dir / "karnataka_raw.geojson"
+        self.prepared_file = self.data_dir / "karnataka_prepared.parquet"
         self.processed_file = self.data_dir / "karnataka_processed.geojson"
+        self.parquet_file = PROCESSED_PARQUET
+        self.fgb_file = PROCESSED_FGB
+        self.validation_report_file = self.data_dir / "karnataka_validation.json"
+        self.summary_file = self.data_dir / "pipeline_summary.json"
+        self.cache_manifest = self.data_dir / ".automated_pipeline_cache.json"
         self.error_count = 0
         self.logger = logging.getLogger(__name__)
 
-    def validate_geojson(self, data):
-        """Validate GeoJSON data structure and geometry"""
-        try:
-            if not isinstance(data, dict):
-                raise ValueError("Data is not a valid GeoJSON object")
-            
-            if "type" not in data or data["type"] != "FeatureCollection":
-                raise ValueError("Data is not a FeatureCollection")
-            
-            if "features" not in data or not isinstance(data["features"], list):
-                raise ValueError("No features array found")
-            
-            for feature in data["features"]:
-                if "geometry" not in feature:
-                    raise ValueError("Feature missing geometry")
-                if "properties" not in feature:
-                    raise ValueError("Feature missing properties")
-                
-                # Validate geometry
-                geom = shape(feature["geometry"])
-                if not geom.is_valid:
-                    raise ValueError(f"Invalid geometry found: {geom.wkt}")
-                
-            return True
-        except Exception as e:
-            self.logger.error(f"Validation error: {str(e)}")
-            return False
-
-    def process_data(self):
-        """Process and validate the Karnataka GeoJSON data"""
+    def validation_report(self, gdf, sample_size=20):
+        """Validity of every geometry, checked in one vectorized call"""
+        geometries = gdf.geometry.values
+        missing = shapely.is_missing(geometries)
+        reasons = shapely.is_valid_reason(geometries)
+        invalid = ~missing & (reasons != "Valid Geometry")
+        by_reason = Counter(_REASON_LOCATION.sub("", reason) for reason in reasons[invalid])
+        # Null or absent "properties" leave every attribute column empty
+        attributes = gdf.drop(columns=gdf.geometry.name)
+        no_properties = int(attributes.isna().all(axis=1).sum()) if len(attributes.columns) else len(gdf)
+        return {
+            "total_features": len(gdf),
+            "missing_properties": no_properties,
+            "missing_geometries": int(missing.sum()),
+            "invalid_geometries": int(invalid.sum()),
+            "invalid_by_reason": dict(by_reason.most_common()),
+            "invalid_samples": [
+                {"index": int(i), "reason": reasons[i]} for i in invalid.nonzero()[0][:sample_size]
+            ],
+        }
+
+    def prepare_source(self, inputs, outputs, target_crs):
+        """Stage: read the source once, validate it and normalize the CRS"""
+        source, = inputs
+        prepared, report_file = outputs
+        self.logger.info(f"Reading source data ({IO_ENGINE})")
+        gdf = gpd.read_file(source, engine=IO_ENGINE)
+
+        # Validate all geometries and report every problem, not just the first
+        report = self.validation_report(gdf)
+        with open(report_file, "w") as f:
+            json.dump(report, f, indent=2)
+        if report["missing_geometries"] or report["invalid_geometries"]:
+            self.logger.error(
+                f"Validation failed: {report['invalid_geometries']} invalid and "
+                f"{report['missing_geometries']} missing geometries out of "
+                f"{report['total_features']} ({report['invalid_by_reason']}); "
+                f"see {report_file}"
+            )
+            raise ValueError("Source data validation failed")
+        if report["missing_properties"]:
+            self.logger.warning(f"{report['missing_properties']} features have no properties")
+
+        # Ensure CRS is WGS84 (GeoJSON without a CRS is WGS84 by definition)
+        if gdf.crs is None:
+            gdf = gdf.set_crs(target_crs)
+        elif not gdf.crs.equals(target_crs):
+            self.logger.info(f"Reprojecting from {gdf.crs.to_string()} to {target_crs}")
+            gdf = gdf.to_crs(target_crs)
+        gdf.to_parquet(prepared)
+
+    def export_geojson(self, inputs, outputs):
+        """Stage: write the prepared data as GeoJSON"""
+        prepared, = inputs
+        processed, = outputs
+        self.logger.info("Saving processed data")
+        gpd.read_parquet(prepared).to_file(processed, driver="GeoJSON", engine=IO_ENGINE)
+
+    def export_artifacts(self, inputs, outputs):
+        """Stage: write the spatially indexed GeoParquet and FlatGeobuf artifacts"""
+        prepared, = inputs
+        parquet_file, fgb_file = outputs
+        self.logger.info("Saving GeoParquet and FlatGeobuf artifacts")
+        write_artifacts(gpd.read_parquet(prepared), parquet_file, fgb_file, engine=IO_ENGINE)
+
+    def build_stages(self):
+        pipeline = StagePipeline(self.cache_manifest)
+        pipeline.add(Stage(
+            "prepare", self.prepare_source,
+            inputs=[self.source_file],
+            outputs=[self.prepared_file, self.validation_report_file],
+            params={"target_crs": TARGET_CRS},
+            depends_on=[self.validation_report],
+        ))
+        pipeline.add(Stage(
+            "export_geojson", self.export_geojson,
+            inputs=[self.prepared_file],
+            outputs=[self.processed_file],
+        ))
+        pipeline.add(Stage(
+            "export_artifacts", self.export_artifacts,
+            inputs=[self.prepared_file],
+            outputs=[self.parquet_file, self.fgb_file],
+            depends_on=[artifacts],
+        ))
+        return pipeline
+
+    def process_data(self, force=False):
+        """Process and validate the Karnataka GeoJSON data, skipping unchanged stages"""
         try:
             self.logger.info("Starting data processing pipeline")
             
             # Check if source file exists
-            if not Path("karnataka.geojson").exists():
+            if not self.source_file.exists():
                 raise FileNotFoundError("Source Karnataka GeoJSON file not found")
 
-            # Read and validate source data
-            self.logger.info("Reading source data")
-            with open("karnataka.geojson", 'r', encoding='utf-8') as f:
-                source_data = json.load(f)
-
-            if not self.validate_geojson(source_data):
-                raise ValueError("Source data validation failed")
-
-            # Process with GeoPandas
-            self.logger.info("Processing with GeoPandas")
-            gdf = gpd.read_file("karnataka.geojson")
-            
-            # Ensure CRS is WGS84
-            gdf = gdf.to_crs("EPSG:4326")
-            
-            # Save processed data
-            self.logger.info("Saving processed data")
-            gdf.to_file(self.processed_file, driver="GeoJSON")
-            
-            self.logger.info("Data processing completed successfully")
+            summary = self.build_stages().run(force=force)
+            summary["finished_at"] = datetime.now().isoformat()
+            with open(self.summary_file, "w") as f:
+                json.dump(summary, f, indent=2)
+            self.logger.info(
+                f"Data processing completed successfully in {summary['duration_seconds']:.2f}s "
+                f"({summary['cache_hits']} cached, {summary['cache_misses']} run)"
+            )
             return True
 
         except Exception as e:
@@ -133,9 +201,9 @@ class GeospatialPipeline:
         except Exception as e:
             self.logger.error(f"Failed to send error notification: {str(e)}")
 
-def run_pipeline():
+def run_pipeline(force=False):
     pipeline = GeospatialPipeline()
-    if pipeline.process_data():
+    if pipeline.process_data(force=force):
         logging.info("Pipeline executed successfully")
         return 0
     else:
@@ -143,4 +211,4 @@ def run_pipeline():
         return 1
 
 if __name__ == "__main__":
-    sys.exit(run_pipeline())
+    sys.exit(run_pipeline(force="--force" in sys.argv[1:]))
@@ -5,6 +5,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import declarative_base, scoped_session
 from sqlalchemy.orm.session import sessionmaker
 from config.database import DATABASE_URL
+from models.geospatial import GEO_FEATURES_DEFAULT_SOURCE
 from models.geospatial_model import GeoFeature, Session
 from shapely.geometry import shape
 import logging
@@ -20,9 +21,13 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 import multiprocessing
 import queue
+from utils.tracing import span, start_run_trace, stop_trace
+from utils.profiling import PROFILE_INGESTION, profile_stage, start_run_profiling, stop_run_profiling
+import argparse
+from utils.run_report import RunTracker
 from utils.metrics import (
-    metrics_collector, 
-    performance_monitor, 
+    get_metrics_collector,
+    start_metrics_server,
     with_metrics, 
     PROCESSING_TIME, 
     CHUNK_PROCESSING_TIME
@@ -40,6 +45,7 @@ logger = logging.getLogger(__name__)
 MAX_RETRIES = 3
 BACKUP_DIR = "data_backups"
 CHUNK_SIZE = 100
+LAYER = GEO_FEATURES_DEFAULT_SOURCE  # geo_features source (partition key) of these rows
 MAX_WORKERS = max(1, multiprocessing.cpu_count() - 1)  # Leave one CPU free
 PROGRESS_QUEUE = queue.Queue()
 
@@ -50,33 +56,35 @@ class DataIngestionError(Exception):
 @with_metrics("fetch_geojson")
 def fetch_geojson_data(url: str) -> Dict:
     """Fetch GeoJSON data from the provided URL with retry logic"""
+    metrics_collector = get_metrics_collector()
     start_time = time.time()
     total_bytes = 0
     
     try:
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
-        
-        # Create backup directory if it doesn't exist
-        os.makedirs(BACKUP_DIR, exist_ok=True)
-        
-        # Save a backup of the raw data with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_path = os.path.join(BACKUP_DIR, f"geojson_backup_{timestamp}.json")
-        
-        # Stream the response to a temporary file first
-        with tempfile.NamedTemporaryFile(mode='wb', delete=False) as temp_file:
-            with tqdm(desc="Downloading data", unit='B', unit_scale=True) as pbar:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        chunk_size = len(chunk)
-                        total_bytes += chunk_size
-                        temp_file.write(chunk)
-                        pbar.update(chunk_size)
-                        
-                        # Update download speed metric
-                        elapsed = time.time() - start_time
-                        metrics_collector.update_download_speed(total_bytes, elapsed)
+        with span("fetch", url=url):
+            response = requests.get(url, stream=True)
+            response.raise_for_status()
+            
+            # Create backup directory if it doesn't exist
+            os.makedirs(BACKUP_DIR, exist_ok=True)
+            
+            # Save a backup of the raw data with timestamp
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            backup_path = os.path.join(BACKUP_DIR, f"geojson_backup_{timestamp}.json")
+            
+            # Stream the response to a temporary file first
+            with tempfile.NamedTemporaryFile(mode='wb', delete=False) as temp_file:
+                with tqdm(desc="Downloading data", unit='B', unit_scale=True) as pbar:
+                    for chunk in response.iter_content(chunk_size=8192):
+                        if chunk:
+                            chunk_size = len(chunk)
+                            total_bytes += chunk_size
+                            temp_file.write(chunk)
+                            pbar.update(chunk_size)
+                            
+                            # Update download speed metric
+                            elapsed = time.time() - start_time
+                            metrics_collector.update_download_speed(total_bytes, elapsed)
         
         # Verify the downloaded file
         with open(temp_file.name, 'rb') as f:
@@ -88,7 +96,7 @@ def fetch_geojson_data(url: str) -> Dict:
         logger.info(f"Backup created at {backup_path} with checksum {checksum}")
         
         # Parse and return the JSON data
-        with open(backup_path, 'r') as f:
+        with span("parse"), open(backup_path, 'r') as f:
             return json.load(f)
             
     except requests.exceptions.RequestException as e:
@@ -106,6 +114,7 @@ def fetch_geojson_data(url: str) -> Dict:
 @with_metrics("process_feature")
 def process_feature(feature: Dict, session) -> Tuple[bool, str]:
     """Process a single feature with error handling"""
+    metrics_collector = get_metrics_collector()
     try:
         # Validate feature structure
         if not all(k in feature for k in ['geometry', 'properties']):
@@ -116,33 +125,45 @@ def process_feature(feature: Dict, session) -> Tuple[bool, str]:
         feature_id = feature.get('id', str(uuid.uuid4()))
 
         # Validate and transform geometry
-        geom = shape(feature['geometry'])
-        if not geom.is_valid:
-            geom = geom.buffer(0)
+        with span("validate"):
+            geom = shape(feature['geometry'])
+            is_valid = geom.is_valid
+        if not is_valid:
+            with span("repair"):
+                geom = geom.buffer(0)
 
         # Convert to EPSG:4326 if needed
         if geom.has_z:
-            geom = wkt.loads(wkb.dumps(geom, output_dimension=2))
-            geom = shape(geom)
+            with span("reproject"):
+                geom = wkt.loads(wkb.dumps(geom, output_dimension=2))
+                geom = shape(geom)
+
+        with span("serialize"):
+            ewkt = f'SRID=4326;{geom.wkt}'
+            properties = feature.get('properties') or {}
 
         # Check if feature already exists
-        existing_feature = session.query(GeoFeature).filter_by(feature_id=feature_id).first()
-        if existing_feature:
-            # Update existing feature
-            metrics_collector.track_db_operation("update")
-            existing_feature.geometry = f'SRID=4326;{geom.wkt}'
-            existing_feature.properties = json.dumps(feature.get('properties', {}))
-            existing_feature.last_updated = datetime.utcnow()
-        else:
-            # Create new feature
-            metrics_collector.track_db_operation("insert")
-            db_feature = GeoFeature(
-                feature_id=feature_id,
-                geometry=f'SRID=4326;{geom.wkt}',
-                properties=json.dumps(feature.get('properties', {})),
-                last_updated=datetime.utcnow()
-            )
-            session.add(db_feature)
+        with span("db_lookup"):
+            # feature_id is only unique within a layer
+            existing_feature = session.query(GeoFeature).filter_by(source=LAYER, feature_id=feature_id).first()
+        with span("db_write"):
+            if existing_feature:
+                # Update existing feature
+                metrics_collector.track_db_operation("update")
+                existing_feature.geometry = ewkt
+                existing_feature.properties = properties
+                existing_feature.updated_at = datetime.utcnow()
+            else:
+                # Create new feature
+                metrics_collector.track_db_operation("insert")
+                db_feature = GeoFeature(
+                    source=LAYER,
+                    feature_id=feature_id,
+                    geometry=ewkt,
+                    properties=properties,
+                    updated_at=datetime.utcnow()
+                )
+                session.add(db_feature)
 
         metrics_collector.track_feature_processing(success=True)
         return True, feature_id
@@ -154,6 +175,7 @@ def process_feature(feature: Dict, session) -> Tuple[bool, str]:
 @with_metrics("process_chunk")
 def process_chunk_parallel(chunk: List[Dict], engine) -> int:
     """Process a chunk of features in parallel"""
+    metrics_collector = get_metrics_collector()
     successful_features = 0
     session = Session(engine)
     
@@ -177,7 +199,8 @@ def process_chunk_parallel(chunk: List[Dict], engine) -> int:
         
         # Commit all successful features
         metrics_collector.track_db_operation("commit")
-        session.commit()
+        with span("db_commit", features=len(chunk)):
+            session.commit()
         PROGRESS_QUEUE.put(len(chunk))
         return successful_features
         
@@ -190,14 +213,14 @@ def process_chunk_parallel(chunk: List[Dict], engine) -> int:
         metrics_collector.update_worker_count(0)
         session.close()
 
-def process_and_store_data(geojson_data: Dict) -> None:
-    """Process GeoJSON data and store it in PostgreSQL with parallel processing"""
+def process_and_store_data(geojson_data: Dict) -> Tuple[int, int]:
+    """Process GeoJSON data and store it in PostgreSQL with parallel processing.
+
+    Returns (successful_features, total_features).
+    """
     try:
         engine = create_engine(DATABASE_URL)
         
-        # Start performance monitoring
-        performance_monitor.start_monitoring()
-        
         # Validate GeoJSON structure
         if not isinstance(geojson_data, dict) or 'features' not in geojson_data:
             raise DataIngestionError("Invalid GeoJSON format: missing 'features' array")
@@ -230,13 +253,11 @@ def process_and_store_data(geojson_data: Dict) -> None:
         
         if successful_features < total_features:
             logger.warning(f"Some features were not processed: {total_features - successful_features} failures")
+        return successful_features, total_features
 
     except Exception as e:
         logger.error(f"Error in process_and_store_data: {str(e)}")
         raise DataIngestionError(f"Data processing failed: {str(e)}")
-    finally:
-        # Stop performance monitoring
-        performance_monitor.stop_monitoring()
 
 def update_progress(future, pbar, progress_queue):
     """Callback function to update progress bar"""
@@ -247,7 +268,7 @@ def update_progress(future, pbar, progress_queue):
         except queue.Empty:
             break
 
-def main():
+def main(profile: bool = PROFILE_INGESTION):
     """Main function to run the data ingestion pipeline with parallel processing"""
     try:
         # URL for Karnataka GeoJSON data
@@ -256,14 +277,22 @@ def main():
         logger.info(f"Starting data ingestion from {geojson_url} with {MAX_WORKERS} workers")
         
         # Start metrics collection
-        metrics_collector.collect_system_metrics()
+        start_metrics_server()
+        start_run_trace("data_ingestion")
+        start_run_profiling("data_ingestion", enabled=profile)
+        get_metrics_collector().collect_system_metrics()
         
-        # Fetch data with retry logic
-        geojson_data = fetch_geojson_data(geojson_url)
-        logger.info("Successfully fetched GeoJSON data")
-        
-        # Process and store data with parallel processing
-        process_and_store_data(geojson_data)
+        with RunTracker("data_ingestion") as run:
+            # Fetch data with retry logic
+            with profile_stage("fetch"):
+                geojson_data = fetch_geojson_data(geojson_url)
+            logger.info("Successfully fetched GeoJSON data")
+            
+            # Process and store data with parallel processing
+            with profile_stage("process"):
+                successful, total = process_and_store_data(geojson_data)
+            run.features_processed = successful
+            run.features_failed = total - successful
         logger.info("Data ingestion completed successfully")
         
     except DataIngestionError as e:
@@ -272,6 +301,16 @@ def main():
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}")
         raise
+    finally:
+        trace_path = stop_trace()
+        if trace_path:
+            logger.info(f"Stage trace written to {trace_path}")
+        profile_dir = stop_run_profiling()
+        if profile_dir:
+            logger.info(f"Profiles written to {profile_dir}")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Ingest the Karnataka GeoJSON into PostGIS")
+    parser.add_argument("--profile", action="store_true", default=PROFILE_INGESTION,
+                        help="Write CPU and memory profiles under logs/profiles")
+    main(profile=parser.parse_args().profile)
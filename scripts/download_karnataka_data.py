@@ -1,9 +1,35 @@
 import geopandas as gpd
 import os
+import sys
 from pathlib import Path
 import shutil
 
-def process_karnataka_data():
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import artifacts
+from utils.artifacts import PROCESSED_FGB, PROCESSED_PARQUET, read_frame, write_artifacts
+from utils.stage_cache import Stage, StagePipeline
+
+def copy_source(inputs, outputs):
+    """Stage: copy the source file into the data directory"""
+    shutil.copy2(inputs[0], outputs[0])
+    print(f"Copied Karnataka data to {outputs[0]}")
+
+def process_raw(inputs, outputs, target_crs):
+    """Stage: reproject the raw data and save it as GeoJSON, GeoParquet and FlatGeobuf"""
+    print("Loading and processing the data...")
+    gdf = gpd.read_file(inputs[0])
+
+    # Basic data cleaning
+    if gdf.crs is None:
+        gdf = gdf.set_crs(target_crs)
+    elif not gdf.crs.equals(target_crs):
+        gdf = gdf.to_crs(target_crs)  # Ensure WGS84 coordinate system
+
+    geojson_path, parquet_path, fgb_path = outputs
+    gdf.to_file(geojson_path, driver="GeoJSON")
+    write_artifacts(gdf, parquet_path, fgb_path)
+
+def process_karnataka_data(force=False):
     # Create data directory if it doesn't exist
     data_dir = Path("data")
     data_dir.mkdir(exist_ok=True)
@@ -11,34 +37,30 @@ def process_karnataka_data():
     # Source file in main directory
     source_file = Path("karnataka.geojson")
     raw_file_path = data_dir / "karnataka_raw.geojson"
-    
+    processed_file_path = data_dir / "karnataka_processed.geojson"
+
     if not source_file.exists():
         print(f"Error: Karnataka GeoJSON file not found at {source_file}")
         return None
 
     try:
-        # Copy file to data directory
-        shutil.copy2(source_file, raw_file_path)
-        print(f"Copied Karnataka data to {raw_file_path}")
-
-        print("Loading and processing the data...")
-        # Load and process the data
-        gdf = gpd.read_file(raw_file_path)
-        
-        # Basic data cleaning
-        gdf = gdf.to_crs("EPSG:4326")  # Ensure WGS84 coordinate system
-        
-        # Save processed data
-        processed_file_path = data_dir / "karnataka_processed.geojson"
-        gdf.to_file(processed_file_path, driver="GeoJSON")
-        
+        # Stages are skipped while their inputs are unchanged
+        pipeline = StagePipeline(data_dir / ".download_karnataka_cache.json")
+        pipeline.add(Stage("copy_source", copy_source, inputs=[source_file], outputs=[raw_file_path]))
+        pipeline.add(Stage("process_raw", process_raw, inputs=[raw_file_path],
+                           outputs=[processed_file_path, PROCESSED_PARQUET, PROCESSED_FGB],
+                           params={"target_crs": "EPSG:4326"}, depends_on=[artifacts]))
+        summary = pipeline.run(force=force)
+        print(f"Stages: {summary['cache_hits']} cached, {summary['cache_misses']} run "
+              f"({summary['duration_seconds']:.2f}s)")
+
         print(f"Successfully processed data")
-        print(f"Processed data saved to: {processed_file_path}")
-        
-        return gdf
+        print(f"Processed data saved to: {processed_file_path}, {PROCESSED_PARQUET}, {PROCESSED_FGB}")
+
+        return read_frame(path=PROCESSED_PARQUET)
     except Exception as e:
         print(f"Error processing data: {str(e)}")
         return None
 
 if __name__ == "__main__":
-    process_karnataka_data()
+    process_karnataka_data(force="--force" in sys.argv[1:])
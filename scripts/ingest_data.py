@@ -1,7 +1,7 @@
 import requests
 import json
 import geopandas as gpd
-from shapely.geometry import shape
+from shapely.geometry import mapping, shape
 from sqlalchemy import create_engine
 from sqlalchemy.orm import Session
 from config.database import SessionLocal, engine
@@ -13,6 +13,10 @@ from dotenv import load_dotenv
 from pyproj import CRS, Transformer
 from config.logging_config import setup_logging
 from utils.progress_monitor import ProgressMonitor
+from utils.tracing import span, start_run_trace, stop_trace
+from utils.run_report import RunTracker
+from utils.profiling import PROFILE_INGESTION, profile_stage, start_run_profiling, stop_run_profiling
+import argparse
 
 # Initialize logging
 logger = setup_logging()
@@ -22,21 +26,23 @@ def download_geojson(url):
     """Download GeoJSON data with progress tracking"""
     try:
         logger.info(f"Downloading GeoJSON from {url}")
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
-        
-        # Get total file size if available
-        total_size = int(response.headers.get('content-length', 0))
-        
-        # Download and save the file
-        chunks = []
-        for chunk in response.iter_content(chunk_size=8192):
-            if chunk:
-                chunks.append(chunk)
-        
-        data = b''.join(chunks)
+        with span("fetch", url=url):
+            response = requests.get(url, stream=True)
+            response.raise_for_status()
+            
+            # Get total file size if available
+            total_size = int(response.headers.get('content-length', 0))
+            
+            # Download and save the file
+            chunks = []
+            for chunk in response.iter_content(chunk_size=8192):
+                if chunk:
+                    chunks.append(chunk)
+            
+            data = b''.join(chunks)
         logger.info(f"Successfully downloaded {len(data)} bytes")
-        return json.loads(data)
+        with span("parse", bytes=len(data)):
+            return json.loads(data)
     except Exception as e:
         logger.error(f"Error downloading GeoJSON: {str(e)}")
         return None
@@ -68,23 +74,37 @@ def transform_coordinates(geojson_geometry, source_crs="EPSG:4326", target_crs="
 def process_feature(feature):
     """Process and validate individual GeoJSON feature"""
     try:
-        if not feature.get('geometry'):
+        geometry = feature.get('geometry')
+        if not geometry:
             logger.warning("Feature missing geometry")
             return None
-            
+
+        # Validate the geometry and repair it if needed
+        with span("validate"):
+            geom = shape(geometry)
+            is_valid = geom.is_valid
+        if not is_valid:
+            with span("repair"):
+                geom = geom.buffer(0)
+            if geom.is_empty:
+                logger.warning("Feature geometry is invalid and could not be repaired")
+                return None
+            geometry = mapping(geom)
+
         # Transform coordinates to EPSG:4326 if needed
-        transformed_geometry = transform_coordinates(
-            feature['geometry'],
-            source_crs="EPSG:4326",
-            target_crs="EPSG:4326"
-        )
+        with span("reproject"):
+            transformed_geometry = transform_coordinates(
+                geometry,
+                source_crs="EPSG:4326",
+                target_crs="EPSG:4326"
+            )
         
         properties = feature.get('properties', {})
         # Add processing timestamp to properties
         properties['processed_at'] = datetime.utcnow().isoformat()
         
         return {
-            'feature_type': feature['geometry']['type'],
+            'feature_type': geometry['type'],
             'properties': properties,
             'geometry': transformed_geometry
         }
@@ -95,20 +115,24 @@ def process_feature(feature):
 def ingest_feature(db: Session, feature_data: dict):
     """Ingest processed feature into database"""
     try:
-        geo_feature = GeoFeature(
-            feature_type=feature_data['feature_type'],
-            properties=json.dumps(feature_data['properties']),
-            geometry=f"SRID=4326;{json.dumps(feature_data['geometry'])}"
-        )
-        db.add(geo_feature)
-        db.commit()
+        with span("serialize"):
+            properties = feature_data['properties']
+            geometry = f"SRID=4326;{json.dumps(feature_data['geometry'])}"
+        with span("db_write"):
+            geo_feature = GeoFeature(
+                feature_type=feature_data['feature_type'],
+                properties=properties,
+                geometry=geometry
+            )
+            db.add(geo_feature)
+            db.commit()
         return True
     except Exception as e:
         logger.error(f"Error ingesting feature: {str(e)}")
         db.rollback()
         return False
 
-def main():
+def main(profile: bool = PROFILE_INGESTION):
     # Get GeoJSON URL from environment variable
     geojson_url = os.getenv("GEOJSON_URL")
     if not geojson_url:
@@ -117,18 +141,34 @@ def main():
 
     # Initialize database
     init_db()
-    
+    start_run_trace("ingest_data")
+    start_run_profiling("ingest_data", enabled=profile)
+    try:
+        with RunTracker("ingest_data") as run:
+            run_ingestion(geojson_url)
+            run.features_processed = progress_monitor.successful_features
+            run.features_failed = progress_monitor.failed_features
+    finally:
+        trace_path = stop_trace()
+        if trace_path:
+            logger.info(f"Stage trace written to {trace_path}")
+        profile_dir = stop_run_profiling()
+        if profile_dir:
+            logger.info(f"Profiles written to {profile_dir}")
+
+def run_ingestion(geojson_url):
+    """Download the GeoJSON and ingest its features one by one"""
     # Download and process GeoJSON data
-    data = download_geojson(geojson_url)
+    with profile_stage("fetch"):
+        data = download_geojson(geojson_url)
+    # Raise rather than return, so the run is reported as failed
     if not data:
-        logger.error("Failed to download GeoJSON data")
-        return
+        raise RuntimeError(f"Failed to download GeoJSON data from {geojson_url}")
 
     # Extract features
     features = data.get('features', [])
     if not features:
-        logger.error("No features found in GeoJSON data")
-        return
+        raise RuntimeError("No features found in GeoJSON data")
 
     # Initialize progress monitoring
     progress_monitor.start_process(len(features))
@@ -136,28 +176,34 @@ def main():
 
     db = SessionLocal()
     try:
-        for idx, feature in enumerate(features, 1):
-            logger.info(f"Processing feature {idx}/{len(features)}")
-            
-            processed_feature = process_feature(feature)
-            if processed_feature:
-                success = ingest_feature(db, processed_feature)
-                progress_monitor.update_progress(success)
+        with profile_stage("process"):
+            for idx, feature in enumerate(features, 1):
+                logger.debug(f"Processing feature {idx}/{len(features)}")
                 
-                if success:
-                    logger.info(f"Successfully ingested feature {idx}")
+                processed_feature = process_feature(feature)
+                if processed_feature:
+                    success = ingest_feature(db, processed_feature)
+                    progress_monitor.update_progress(success)
+                    
+                    if success:
+                        logger.debug(f"Successfully ingested feature {idx}")
+                    else:
+                        logger.error(f"Failed to ingest feature {idx}")
                 else:
-                    logger.error(f"Failed to ingest feature {idx}")
-            else:
-                progress_monitor.update_progress(False)
-                logger.error(f"Failed to process feature {idx}")
+                    progress_monitor.update_progress(False)
+                    logger.error(f"Failed to process feature {idx}")
                     
         progress_monitor.complete_process()
         logger.info("Data ingestion completed")
     except Exception as e:
         logger.error(f"Error during ingestion process: {str(e)}")
+        progress_monitor.fail_process(str(e))
+        raise
     finally:
         db.close()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Ingest features from GEOJSON_URL into PostGIS")
+    parser.add_argument("--profile", action="store_true", default=PROFILE_INGESTION,
+                        help="Write CPU and memory profiles under logs/profiles")
+    main(profile=parser.parse_args().profile)
@@ -6,6 +6,7 @@ from shapely.geometry import mapping
 import json
 from pathlib import Path
 import logging
+from utils.artifacts import available_artifact, read_frame
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -45,19 +46,20 @@ def init_database():
         logger.info("Creating database tables...")
         Base.metadata.create_all(bind=engine)
         
-        # Load Karnataka data
-        data_file = Path("data/karnataka_processed.geojson")
+        # Load Karnataka data (GeoParquet/FlatGeobuf artifact when present)
+        data_file = available_artifact()
         
-        if not data_file.exists():
+        if data_file is None:
             logger.info("Karnataka data not found. Downloading...")
-            from scripts.download_karnataka_data import download_karnataka_data
-            gdf = download_karnataka_data()
+            from scripts.download_karnataka_data import process_karnataka_data
+            gdf = process_karnataka_data()
             if gdf is None:
                 logger.error("Failed to download data")
                 return
+            data_file = available_artifact()
         else:
-            logger.info("Loading existing Karnataka data...")
-            gdf = gpd.read_file(data_file)
+            logger.info(f"Loading existing Karnataka data from {data_file}...")
+            gdf = read_frame(path=data_file)
         
         # Create database session
         from sqlalchemy.orm import sessionmaker
@@ -68,12 +70,17 @@ def init_database():
             # Clear existing data
             session.query(GeospatialData).delete()
             
+            # Source attributes as JSON-safe dicts for the JSONB properties column
+            gdf = gdf.reset_index(drop=True)
+            attributes = json.loads(gdf.drop(columns=[gdf.geometry.name]).to_json(orient="records"))
+
             # Add each district as a feature
             for idx, row in gdf.iterrows():
-                geom_json = json.loads(row.geometry.json())
                 feature = GeospatialData(
                     name=row.get('DISTRICT', f'District_{idx}'),
                     data_type="district",
+                    source=data_file.name,
+                    properties=attributes[idx],
                     geometry=f"SRID=4326;{row.geometry.wkt}"  # Using WKT format with SRID
                 )
                 session.add(feature)
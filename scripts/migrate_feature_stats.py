@@ -0,0 +1,43 @@
+"""Install the feature_stats table and its maintenance triggers.
+
+Creates ``feature_stats``, (re)creates the statement-level triggers on every
+feature table that exists, and backfills layers that have no stats yet.
+Backfilling locks the table against writes (SHARE mode) while it is counted,
+so run this once per deployment, not from every API worker. Safe to re-run;
+pass ``--rebuild`` to recompute every layer from scratch.
+"""
+import argparse
+import os
+import sys
+import logging
+
+from sqlalchemy import inspect
+
+# Add parent directory to Python path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.database import engine
+from utils.feature_stats import STATS_LAYERS, ensure_feature_stats, rebuild_feature_stats
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Install feature_stats triggers")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute the stats of every layer")
+    args = parser.parse_args(argv)
+
+    ensure_feature_stats(engine)
+    if args.rebuild:
+        existing_tables = set(inspect(engine).get_table_names())
+        for layer in STATS_LAYERS:
+            if layer in existing_tables:
+                with engine.begin() as conn:
+                    rebuild_feature_stats(conn, layer)
+                logger.info(f"Rebuilt stats for {layer}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""Convert geo_features into a table list-partitioned by source.
+
+The existing table is renamed to ``geo_features_legacy``, the partitioned
+table (with its DEFAULT partition) is created from the model, and every
+source of the legacy rows is copied into its own partition via the same
+partition swap the loaders use. Legacy rows without a source are assigned
+their feature_type (e.g. ``karnataka_tile``), else ``default``.
+
+Run scripts/migrate_properties_jsonb.py first. Safe to re-run; pass
+``--drop-legacy`` to drop the old table once the copy has been checked, or
+``--copy-legacy`` to redo the copy after an interrupted run.
+"""
+import argparse
+import os
+import sys
+import logging
+
+from sqlalchemy import text
+
+# Add parent directory to Python path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.database import engine
+from models.geospatial import GEO_FEATURES_DEFAULT_SOURCE, GeoFeature
+from utils.feature_stats import ensure_feature_stats, rebuild_feature_stats
+from utils.partitions import ensure_default_partition, is_partitioned, replace_partition
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TABLE = GeoFeature.__tablename__
+LEGACY = f"{TABLE}_legacy"
+
+
+def table_exists(conn, table: str) -> bool:
+    return conn.execute(text("SELECT to_regclass(:table) IS NOT NULL"), {"table": table}).scalar()
+
+
+def legacy_columns(conn) -> list:
+    return conn.execute(
+        text("SELECT column_name FROM information_schema.columns "
+             "WHERE table_schema = current_schema() AND table_name = :table"),
+        {"table": LEGACY},
+    ).scalars().all()
+
+
+def rename_legacy(conn) -> None:
+    """Move the unpartitioned table, its indexes and sequence out of the way"""
+    conn.execute(text(f"ALTER TABLE {TABLE} RENAME TO {LEGACY}"))
+    indexes = conn.execute(
+        text("SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() AND tablename = :table"),
+        {"table": LEGACY},
+    ).scalars().all()
+    for index in indexes:
+        conn.execute(text(f'ALTER INDEX "{index}" RENAME TO "{index[:55]}_legacy"'))
+    conn.execute(text(f"ALTER SEQUENCE IF EXISTS {TABLE}_id_seq RENAME TO {LEGACY}_id_seq"))
+    logger.info(f"Renamed {TABLE} to {LEGACY} ({len(indexes)} indexes)")
+
+
+def copy_legacy(keep_columns: list) -> int:
+    """Copy each legacy source into its own partition; returns rows copied"""
+    candidates = [c for c in ("source", "feature_type") if c in keep_columns]
+    source_expr = f"coalesce({', '.join([*candidates, repr(GEO_FEATURES_DEFAULT_SOURCE)])})"
+    columns = [c.name for c in GeoFeature.__table__.columns if c.name in keep_columns and c.name != "source"]
+    select_list = [
+        "NULLIF(btrim(properties::text), '')::jsonb" if c == "properties" else c for c in columns
+    ]
+    with engine.connect() as conn:
+        sources = conn.execute(text(f"SELECT DISTINCT {source_expr} FROM {LEGACY}")).scalars().all()
+
+    total = 0
+    for source in sources:
+        with replace_partition(engine, GeoFeature.__table__, source) as (conn, staging):
+            result = conn.execute(
+                text(
+                    f'INSERT INTO "{staging.name}" (source, {", ".join(columns)}) '
+                    f'SELECT :source, {", ".join(select_list)} FROM {LEGACY} WHERE {source_expr} = :source'
+                ),
+                {"source": source},
+            )
+        logger.info(f"Copied {result.rowcount} rows of source {source!r}")
+        total += result.rowcount
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Partition geo_features by source")
+    parser.add_argument("--drop-legacy", action="store_true", help=f"Drop {LEGACY} after copying")
+    parser.add_argument("--copy-legacy", action="store_true",
+                        help=f"Copy {LEGACY} again (e.g. after an interrupted run); replaces those partitions")
+    args = parser.parse_args(argv)
+
+    with engine.begin() as conn:
+        if is_partitioned(conn, TABLE):
+            ensure_default_partition(conn, TABLE)
+            logger.info(f"{TABLE} is already partitioned")
+            migrate = False
+        else:
+            migrate = table_exists(conn, TABLE)
+            if migrate:
+                rename_legacy(conn)
+            GeoFeature.__table__.create(bind=conn)
+            logger.info(f"Created partitioned {TABLE}")
+
+    if migrate or args.copy_legacy:
+        with engine.connect() as conn:
+            columns = legacy_columns(conn)
+        total = copy_legacy(columns)
+        with engine.begin() as conn:
+            conn.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), "
+                f"(SELECT coalesce(max(id), 0) + 1 FROM {TABLE}), false)"
+            ))
+        logger.info(f"Copied {total} legacy rows into {TABLE} partitions")
+        if args.drop_legacy:
+            with engine.begin() as conn:
+                conn.execute(text(f"DROP TABLE {LEGACY}"))
+            logger.info(f"Dropped {LEGACY}")
+
+    # Stats triggers belong on the new parent table
+    ensure_feature_stats(engine)
+    with engine.begin() as conn:
+        rebuild_feature_stats(conn, TABLE)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
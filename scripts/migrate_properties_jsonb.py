@@ -0,0 +1,95 @@
+"""Migrate feature properties to JSONB with GIN indexes.
+
+* ``geo_features.properties``: text holding ``json.dumps`` output -> jsonb
+* ``districts.properties``: json -> jsonb
+* ``geospatial_data.properties``: added
+
+Each column gets a ``jsonb_path_ops`` GIN index (built concurrently), which
+serves the ``@>`` containment filters behind the ``prop.<key>=<value>``
+query parameters. Safe to re-run.
+"""
+import os
+import sys
+import logging
+
+from sqlalchemy import text
+
+# Add parent directory to Python path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.database import engine
+from utils import spatial_queries
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TABLES = ("geo_features", "districts", "geospatial_data")
+# Works for both text and json columns; empty strings become NULL
+CONVERSION = "NULLIF(btrim(properties::text), '')::jsonb"
+
+
+def column_type(conn, table: str):
+    return conn.execute(
+        text(
+            "SELECT data_type FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = :table AND column_name = 'properties'"
+        ),
+        {"table": table},
+    ).scalar()
+
+
+def table_exists(conn, table: str) -> bool:
+    return conn.execute(text("SELECT to_regclass(:table) IS NOT NULL"), {"table": table}).scalar()
+
+
+def migrate_column(conn, table: str) -> None:
+    current = column_type(conn, table)
+    if current == "jsonb":
+        logger.info(f"{table}.properties is already jsonb")
+    elif current is None:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN properties jsonb"))
+        logger.info(f"{table}.properties added as jsonb")
+    else:
+        conn.execute(text(
+            f"ALTER TABLE {table} ALTER COLUMN properties TYPE jsonb USING {CONVERSION}"
+        ))
+        logger.info(f"{table}.properties converted from {current} to jsonb")
+
+
+def create_index(table: str) -> str:
+    name = f"ix_{table}_properties"
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+            f"ON {table} USING gin (properties jsonb_path_ops)"
+        ))
+    logger.info(f"{name} ready")
+    return name
+
+
+def main():
+    """Convert the columns, build the indexes and check containment uses them"""
+    with engine.begin() as conn:
+        tables = [table for table in TABLES if table_exists(conn, table)]
+        for table in tables:
+            migrate_column(conn, table)
+
+    failures = []
+    for table in tables:
+        index = create_index(table)
+        with engine.connect() as conn:
+            conn.execute(text(f"ANALYZE {table}"))
+            stmt = text(f"""SELECT id FROM {table} WHERE properties @> '{{"DISTRICT": "Mysuru"}}'::jsonb""")
+            indexes = spatial_queries.explain_index_scans(conn, stmt)
+            conn.rollback()
+        if index in indexes:
+            logger.info(f"{table}: containment filters use {index}")
+        else:
+            logger.error(f"{table}: containment filters do not use {index} (plan indexes: {indexes})")
+            failures.append(table)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
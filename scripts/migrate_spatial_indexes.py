@@ -0,0 +1,34 @@
+"""Create a GIST index on every geometry column that lacks one.
+
+Tables created outside ``create_all`` (sync jobs, manual loads) do not get
+GeoAlchemy's automatic index. The indexes are built concurrently, so this can
+run against a live database; the API no longer creates them at startup.
+Safe to re-run. The EXPLAIN checks that the spatial predicates use these
+indexes live in tests/test_spatial_indexes.py.
+"""
+import os
+import sys
+import logging
+
+# Add parent directory to Python path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.database import engine
+from models.district import District
+from models.geospatial import GeospatialData
+from utils import spatial_queries
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    # districts is declared on the legacy `database` Base
+    metadatas = {District.metadata, GeospatialData.metadata}
+    created = spatial_queries.ensure_spatial_indexes(engine, metadatas)
+    logger.info(f"{len(created)} spatial indexes ready")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+"""Tag large point datasets with their Karnataka district.
+
+Streams a CSV or Parquet file of points in chunks, resolves every chunk
+against a district STRtree in a process pool and writes the joined rows to a
+Parquet file. Only a bounded number of chunks is in flight at any time, so
+memory stays flat regardless of input size.
+
+Usage:
+    python scripts/spatial_join.py points.csv points_tagged.parquet \\
+        --lon-col lon --lat-col lat --districts data/karnataka_processed.parquet
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Add parent directory to Python path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.district_index import DistrictIndex
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500_000
+DEFAULT_DISTRICTS = "db"
+JOIN_FIELDS = [pa.field("district_id", pa.int64()), pa.field("district", pa.string())]
+
+# Per-worker index, built once by the pool initializer
+_worker_index = None
+
+
+def load_districts(source: str):
+    """(ids, names, WKB geometries) from the database or a vector file"""
+    import shapely
+
+    if source == "db":
+        from sqlalchemy import func, select
+        from database import SessionLocal
+        from models.district import District
+
+        with SessionLocal() as db:
+            rows = db.execute(
+                select(District.id, District.name, func.ST_AsBinary(District.geometry))
+                .where(District.geometry.isnot(None))
+            ).all()
+        return [r[0] for r in rows], [r[1] for r in rows], [bytes(r[2]) for r in rows]
+
+    if source.endswith((".parquet", ".fgb")):
+        # Pipeline artifacts are already in EPSG:4326; read only the name columns
+        from utils.artifacts import read_frame
+
+        gdf = read_frame(columns=["DISTRICT", "district", "name"], path=Path(source))
+    else:
+        import geopandas as gpd
+
+        gdf = gpd.read_file(source)
+        if gdf.crs is not None and not gdf.crs.equals("EPSG:4326"):
+            gdf = gdf.to_crs("EPSG:4326")
+    name_col = next((c for c in ("DISTRICT", "district", "name") if c in gdf.columns), None)
+    names = gdf[name_col].tolist() if name_col else [None] * len(gdf)
+    return list(range(len(gdf))), names, shapely.to_wkb(gdf.geometry.values).tolist()
+
+
+def _init_worker(ids, names, wkbs):
+    import shapely
+
+    global _worker_index
+    _worker_index = DistrictIndex()
+    _worker_index.build(ids, names, shapely.from_wkb(wkbs))
+
+
+def _join_chunk(lons: np.ndarray, lats: np.ndarray) -> np.ndarray:
+    district_ids, _ = _worker_index.lookup_many(lons, lats)
+    return district_ids
+
+
+def iter_point_chunks(path: Path, chunk_size: int, lon_col: str, lat_col: str):
+    """Yield DataFrames of at most `chunk_size` rows from CSV or Parquet.
+
+    CSV carries no types, and inferring them per chunk gives different types
+    for the same column, so every CSV column except the coordinates is read
+    as text.
+    """
+    if path.suffix.lower() in (".parquet", ".pq"):
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        dtypes = defaultdict(lambda: "string", {lon_col: "float64", lat_col: "float64"})
+        yield from pd.read_csv(path, chunksize=chunk_size, dtype=dtypes)
+
+
+def output_schema(input_schema: pa.Schema) -> pa.Schema:
+    """Input columns plus the join columns, declared up front so every chunk
+    is written with the same types. Columns that are all-null in the sample
+    (type null) are written as strings."""
+    join_names = {field.name for field in JOIN_FIELDS}
+    fields = [
+        pa.field(field.name, pa.string()) if pa.types.is_null(field.type) else field
+        for field in input_schema
+        if field.name not in join_names
+    ]
+    return pa.schema(fields + JOIN_FIELDS)
+
+
+def spatial_join(input_path: Path, output_path: Path, lon_col: str, lat_col: str,
+                 districts: str = DEFAULT_DISTRICTS, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 workers: int = None) -> int:
+    """Tag every point with `district_id`/`district`; returns rows written"""
+    workers = workers or max(1, multiprocessing.cpu_count() - 1)
+    ids, names, wkbs = load_districts(districts)
+    name_by_id = dict(zip(ids, names))
+    logger.info(f"Loaded {len(ids)} districts from {districts}; joining with {workers} workers")
+
+    start = time.perf_counter()
+    total = 0
+    writer = None
+    schema = None
+    if input_path.suffix.lower() in (".parquet", ".pq"):
+        schema = output_schema(pq.ParquetFile(input_path).schema_arrow)
+    in_flight = deque()
+    max_in_flight = workers * 2
+
+    def write(chunk: pd.DataFrame, district_ids: np.ndarray):
+        nonlocal writer, schema, total
+        chunk["district_id"] = pd.array(np.where(district_ids >= 0, district_ids, None), dtype="Int64")
+        chunk["district"] = chunk["district_id"].map(name_by_id)
+        if schema is None:
+            # CSV: text columns plus the coordinates, the same for every chunk
+            schema = output_schema(pa.Schema.from_pandas(chunk, preserve_index=False))
+        table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(output_path, schema, compression="zstd")
+        writer.write_table(table)
+        total += len(chunk)
+        elapsed = time.perf_counter() - start
+        logger.info(f"{total} points joined ({total / elapsed:,.0f} points/sec)")
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(ids, names, wkbs)) as executor:
+            for chunk in iter_point_chunks(input_path, chunk_size, lon_col, lat_col):
+                lons = chunk[lon_col].to_numpy(dtype=np.float64)
+                lats = chunk[lat_col].to_numpy(dtype=np.float64)
+                in_flight.append((chunk, executor.submit(_join_chunk, lons, lats)))
+                # Backpressure: never hold more than a few chunks in memory
+                while len(in_flight) >= max_in_flight:
+                    done_chunk, future = in_flight.popleft()
+                    write(done_chunk, future.result())
+            while in_flight:
+                done_chunk, future = in_flight.popleft()
+                write(done_chunk, future.result())
+    finally:
+        if writer is not None:
+            writer.close()
+
+    elapsed = time.perf_counter() - start
+    rate = total / elapsed if elapsed > 0 else 0.0
+    logger.info(f"Joined {total} points in {elapsed:.1f}s ({rate:,.0f} points/sec) -> {output_path}")
+    return total
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Tag point data with Karnataka districts")
+    parser.add_argument("input", type=Path, help="CSV or Parquet file of points")
+    parser.add_argument("output", type=Path, help="Parquet file to write")
+    parser.add_argument("--lon-col", default="lon", help="Longitude column name")
+    parser.add_argument("--lat-col", default="lat", help="Latitude column name")
+    parser.add_argument("--districts", default=DEFAULT_DISTRICTS,
+                        help="'db' for the districts table, or a path such as "
+                             "data/karnataka_processed.parquet")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Points per chunk")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    spatial_join(args.input, args.output, args.lon_col, args.lat_col,
+                 args.districts, args.chunk_size, args.workers)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,21 @@
+"""Synchronize the districts table with the upstream GeoJSON.
+
+Same as ``POST /api/v1/sync``, but also stores a run report in
+``pipeline_runs`` (see utils.run_report), which the API route does not.
+"""
+import os
+import sys
+
+# Add parent directory to Python path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.sync_manager import run_sync
+
+
+def main():
+    run_sync(track_run=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""GeoParquet artifacts must be written in Hilbert order with a bbox
+covering column, and read back filtered by bbox and projected by column."""
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+import shapely
+
+from utils.artifacts import hilbert_order, read_table, write_geoparquet
+
+pytestmark = pytest.mark.unit
+
+
+def grid(n):
+    """n x n unit boxes, listed row by row"""
+    return np.array([shapely.box(x, y, x + 1, y + 1) for y in range(n) for x in range(n)], dtype=object)
+
+
+def test_hilbert_order_is_a_permutation():
+    bounds = shapely.bounds(grid(8))
+    order = hilbert_order(bounds)
+    assert sorted(order.tolist()) == list(range(64))
+
+
+def test_hilbert_order_keeps_clusters_together():
+    rng = np.random.default_rng(0)
+    west = rng.uniform(0, 1, (50, 2))
+    east = rng.uniform(100, 101, (50, 2))
+    points = np.vstack([west, east])[rng.permutation(100)]
+    order = hilbert_order(np.hstack([points, points]))
+    clusters = (points[order, 0] > 50).astype(int)
+    # One switch between the two clusters along the curve
+    assert np.count_nonzero(np.diff(clusters)) == 1
+
+
+def test_hilbert_order_degenerate_inputs():
+    assert hilbert_order(np.empty((0, 4))).tolist() == []
+    same = np.tile([1.0, 2.0, 1.0, 2.0], (3, 1))
+    assert sorted(hilbert_order(same).tolist()) == [0, 1, 2]
+    # Empty geometries have NaN bounds
+    with_empty = shapely.bounds(np.array([shapely.box(0, 0, 1, 1), shapely.Polygon()], dtype=object))
+    assert sorted(hilbert_order(with_empty).tolist()) == [0, 1]
+
+
+@pytest.fixture
+def parquet(tmp_path):
+    geometries = grid(10)
+    attributes = pd.DataFrame({"cell": range(100), "name": [f"c{i}" for i in range(100)]})
+    path = tmp_path / "cells.parquet"
+    write_geoparquet(geometries, attributes, path, row_group_size=10)
+    return path
+
+
+def test_geoparquet_metadata_and_row_groups(parquet):
+    metadata = pq.read_metadata(parquet)
+    assert metadata.num_row_groups == 10
+    geo = json.loads(metadata.metadata[b"geo"])
+    column = geo["columns"]["geometry"]
+    assert column["geometry_types"] == ["Polygon"]
+    assert column["bbox"] == [0.0, 0.0, 10.0, 10.0]
+    assert column["covering"]["bbox"]["xmin"] == ["bbox", "xmin"]
+
+
+def test_read_table_filters_by_bbox_and_projects_columns(parquet):
+    table = read_table(bbox=(2.5, 2.5, 3.5, 3.5), columns=["cell", "missing"], path=parquet)
+    assert table.column_names == ["cell", "geometry"]
+    # The four cells touching the query box
+    assert sorted(table.column("cell").to_pylist()) == [22, 23, 32, 33]
+    geometries = shapely.from_wkb(table.column("geometry").to_numpy(zero_copy_only=False))
+    assert shapely.intersects(geometries, shapely.box(2.5, 2.5, 3.5, 3.5)).all()
@@ -0,0 +1,63 @@
+"""Pool sizes must come out of the per-service connection budget, and the
+instrumented pools must export their usage."""
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy.pool import QueuePool
+
+from utils.service_metrics import instrumented_pool
+
+pytestmark = pytest.mark.unit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+POOL_ENV = ("GUNICORN_WORKERS", "DB_MAX_CONNECTIONS", "DB_POOL_SIZE", "DB_MAX_OVERFLOW")
+
+
+def pool_settings(**env):
+    """DB_POOL_SIZE and DB_MAX_OVERFLOW as config.database computes them at import"""
+    environ = {k: v for k, v in os.environ.items() if k not in POOL_ENV}
+    environ.update({k: str(v) for k, v in env.items()})
+    code = "import json, config.database as d; print(json.dumps([d.DB_POOL_SIZE, d.DB_MAX_OVERFLOW]))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=environ,
+                            capture_output=True, text=True, check=True)
+    return tuple(json.loads(result.stdout.strip().splitlines()[-1]))
+
+
+@pytest.mark.parametrize("workers, budget, expected", [
+    (1, 30, (7, 8)),      # 15 per pool
+    (4, 40, (2, 3)),      # 5 per pool
+    (16, 30, (1, 1)),     # never below 2 per pool
+])
+def test_pools_split_the_connection_budget(workers, budget, expected):
+    size, overflow = pool_settings(GUNICORN_WORKERS=workers, DB_MAX_CONNECTIONS=budget)
+    assert (size, overflow) == expected
+    # Sync and async pool in every worker stay within the budget where it allows 2 each
+    assert 2 * workers * (size + overflow) <= max(budget, 4 * workers)
+
+
+def test_explicit_pool_sizes_win():
+    assert pool_settings(DB_POOL_SIZE=10, DB_MAX_OVERFLOW=0) == (10, 0)
+
+
+def gauge(name, pool):
+    return REGISTRY.get_sample_value(name, {"pool": pool})
+
+
+def test_instrumented_pool_exports_usage():
+    pool = instrumented_pool(QueuePool, "test")(lambda: sqlite3.connect(":memory:"), pool_size=1, max_overflow=1)
+    assert gauge("db_pool_size", "test") == 1
+
+    first, second = pool.connect(), pool.connect()
+    assert gauge("db_pool_connections_in_use", "test") == 2
+    assert gauge("db_pool_overflow_connections", "test") == 1
+    assert gauge("db_pool_checkout_wait_seconds_count", "test") == 2
+
+    first.close()
+    second.close()
+    assert gauge("db_pool_connections_in_use", "test") == 0
+    pool.dispose()
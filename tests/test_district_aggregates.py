@@ -0,0 +1,73 @@
+"""District aggregates must be measured in an equal-area projection and
+recomputed only when the district data version changes."""
+import asyncio
+
+import orjson
+import pytest
+from sqlalchemy.dialects import postgresql
+
+# models.district imports the app-level `database` module
+district_aggregates = pytest.importorskip("utils.district_aggregates")
+VersionedCache = pytest.importorskip("utils.cache").VersionedCache
+
+pytestmark = pytest.mark.unit
+
+
+def sql(stmt):
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+def test_areas_use_the_equal_area_projection():
+    for stmt in (district_aggregates.district_measures_stmt(), district_aggregates.state_outline_stmt()):
+        text = sql(stmt)
+        assert "ST_Area(ST_Transform(" in text
+        assert "ST_Perimeter(CAST(" in text and "geography" in text
+
+
+class FakeResult:
+    def __init__(self, row):
+        self._row = row
+
+    def one(self):
+        return self._row
+
+
+class FakeSession:
+    """Answers every query with the district data version row"""
+
+    def __init__(self):
+        self.version = (3, 3, None)
+        self.computed = 0
+
+    async def execute(self, stmt):
+        return FakeResult(self.version)
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = VersionedCache()
+    monkeypatch.setattr(district_aggregates, "district_cache", cache)
+    return cache
+
+
+def cached(db, key="measures"):
+    async def compute():
+        db.computed += 1
+        return orjson.dumps({"computed": db.computed})
+    return asyncio.run(district_aggregates._cached(db, key, compute))
+
+
+def test_cached_until_the_version_changes(cache):
+    db = FakeSession()
+    assert cached(db) == cached(db) == b'{"computed":1}'
+    db.version = (4, 4, None)
+    assert cached(db) == b'{"computed":2}'
+    assert len(cache) == 1
+
+
+def test_keys_are_cached_separately(cache):
+    db = FakeSession()
+    cached(db, "measures")
+    cached(db, "outline")
+    assert db.computed == 2
+    assert len(cache) == 2
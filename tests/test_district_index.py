@@ -0,0 +1,90 @@
+"""In-memory district lookup and when it goes back to the database."""
+import pytest
+import shapely
+
+from utils.district_index import DistrictIndex
+
+pytestmark = pytest.mark.unit
+
+WEST = shapely.box(0, 0, 1, 1)
+EAST = shapely.box(1, 0, 2, 1)
+
+
+class FakeSource:
+    """Stands in for the database: a data version and the districts behind it"""
+
+    def __init__(self, index: DistrictIndex):
+        self.version = "v1"
+        self.districts = [(1, "West", WEST)]
+        self.version_checks = 0
+        self.loads = 0
+        index._data_version = self.data_version
+        index.load = self.load
+        self.index = index
+
+    def data_version(self, db):
+        self.version_checks += 1
+        return self.version
+
+    def load(self, db, version=None):
+        self.loads += 1
+        ids, names, geometries = zip(*self.districts)
+        self.index.build(ids, names, geometries, version or self.version)
+
+
+@pytest.fixture
+def index():
+    index = DistrictIndex(check_interval=60)
+    index.build([1, 2], ["West", "East"], [WEST, EAST], "v1")
+    return index
+
+
+def test_lookup(index):
+    assert index.lookup(0.5, 0.5) == (1, "West")
+    assert index.lookup(1.5, 0.5) == (2, "East")
+    assert index.lookup(5, 5) is None
+
+
+def test_lookup_many_resolves_border_points_once(index):
+    ids, names = index.lookup_many([0.5, 1.0, 1.5, 9.0], [0.5, 0.5, 0.5, 9.0])
+    assert ids.tolist() == [1, 1, 2, -1]
+    assert names == ["West", "West", "East", None]
+
+
+def test_empty_index_matches_nothing():
+    ids, names = DistrictIndex().lookup_many([0.5], [0.5])
+    assert ids.tolist() == [-1]
+    assert names == [None]
+
+
+def test_recent_index_skips_the_database(index):
+    source = FakeSource(index)
+    index.ensure_current(db=None)
+    assert source.version_checks == 0
+    assert source.loads == 0
+
+
+def test_rebuilds_after_a_local_write(index):
+    source = FakeSource(index)
+    source.districts = [(1, "West", WEST), (3, "North", shapely.box(0, 1, 1, 2))]
+    index.invalidate()
+    index.ensure_current(db=None)
+    assert source.loads == 1
+    assert index.lookup(0.5, 1.5) == (3, "North")
+    assert index.lookup(1.5, 0.5) is None
+
+    index.ensure_current(db=None)
+    assert source.loads == 1
+
+
+def test_picks_up_other_workers_writes_after_the_interval(index):
+    source = FakeSource(index)
+    index.check_interval = 0
+    index.ensure_current(db=None)
+    assert (source.version_checks, source.loads) == (1, 0)
+
+    source.version = "v2"
+    index.ensure_current(db=None)
+    assert source.loads == 1
+    assert index.version == "v2"
+    assert index.lookup(1.5, 0.5) is None
@@ -0,0 +1,112 @@
+"""Export encoders must produce valid documents from any partitioning of
+the rows, with types declared up front rather than inferred."""
+import asyncio
+import csv
+import io
+from collections import namedtuple
+
+import fiona
+import orjson
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+import shapely
+
+from models.geospatial import GeospatialData
+from utils import export
+
+pytestmark = pytest.mark.unit
+
+Feature = namedtuple("Feature", ["properties", "geometry"])
+Flat = namedtuple("Flat", ["id", "name", "created_at", "properties", "geometry"])
+
+
+async def _partitions(parts):
+    for rows in parts:
+        yield rows
+
+
+def encode(fmt, parts, columns=None):
+    encoder = export.EXPORT_FORMATS[fmt].encode
+
+    async def collect():
+        return b"".join([chunk async for chunk in encoder(_partitions(parts), columns)])
+    return asyncio.run(collect())
+
+
+def features(n, start=0):
+    return [Feature(orjson.dumps({"id": i}).decode(), f'{{"type":"Point","coordinates":[{i},0]}}')
+            for i in range(start, start + n)]
+
+
+@pytest.mark.parametrize("parts", [[], [[]], [features(2)], [[], features(1), [], features(2, 1)]])
+def test_geojson_is_one_valid_collection(parts):
+    document = orjson.loads(encode("geojson", parts))
+    expected = [row for rows in parts for row in rows]
+    assert document["type"] == "FeatureCollection"
+    assert [f["properties"]["id"] for f in document["features"]] == [orjson.loads(r.properties)["id"] for r in expected]
+
+
+def test_ndjson_one_feature_per_line():
+    lines = encode("ndjson", [features(2), [], features(1, 2)]).splitlines()
+    assert [orjson.loads(line)["geometry"]["coordinates"][0] for line in lines] == [0, 1, 2]
+
+
+def test_null_geometry_is_null():
+    (line,) = encode("ndjson", [[Feature("{}", None)]]).splitlines()
+    assert orjson.loads(line)["geometry"] is None
+
+
+def flat_rows(start, n, name=True):
+    return [Flat(i, f"n{i}" if name else None, None, "{}", shapely.to_wkb(shapely.Point(i, i)))
+            for i in range(start, start + n)]
+
+
+def test_csv_writes_the_header_once():
+    rows = [[Flat(1, "a", None, "{}", "POINT (1 1)")], [Flat(2, "b", None, "{}", "POINT (2 2)")]]
+    table = list(csv.reader(io.StringIO(encode("csv", rows).decode())))
+    assert table[0] == ["id", "name", "created_at", "properties", "wkt"]
+    assert [r[0] for r in table[1:]] == ["1", "2"]
+
+
+def parquet_columns():
+    return export.EXPORT_FORMATS["parquet"].columns(GeospatialData)
+
+
+def test_arrow_schema_follows_the_sql_types():
+    schema = export._arrow_schema(parquet_columns())
+    assert schema.field("id").type == pa.int64()
+    assert schema.field("name").type == pa.string()
+    assert schema.field("created_at").type == pa.timestamp("us", tz="UTC")
+    assert schema.field("geometry").type == pa.binary()
+    assert b"geo" in schema.metadata
+
+
+def test_parquet_column_null_in_the_first_partition():
+    columns = [c for c in parquet_columns() if c.name in Flat._fields]
+    body = encode("parquet", [flat_rows(0, 2, name=False), [], flat_rows(2, 3)], columns)
+    table = pq.read_table(pa.BufferReader(body))
+    assert table.num_rows == 5
+    assert table.column("name").to_pylist() == [None, None, "n2", "n3", "n4"]
+    assert shapely.equals(shapely.from_wkb(table.column("geometry").to_pylist()[4]), shapely.Point(4, 4))
+
+
+def test_flatgeobuf_round_trip(tmp_path):
+    body = encode("fgb", [flat_rows(0, 2), flat_rows(2, 1)])
+    path = tmp_path / "export.fgb"
+    path.write_bytes(body)
+    with fiona.open(path) as source:
+        records = list(source)
+    assert [r["properties"]["name"] for r in records] == ["n0", "n1", "n2"]
+    assert records[2]["geometry"]["coordinates"] == (2.0, 2.0)
+
+
+def test_flatgeobuf_without_rows_is_empty():
+    assert encode("fgb", [[]]) == b""
+
+
+def test_filter_clauses():
+    assert export.filter_clauses(GeospatialData, None, {}) == []
+    assert len(export.filter_clauses(GeospatialData, "1,2,3,4", {"prop.name": "a"})) == 2
+    with pytest.raises(ValueError):
+        export.filter_clauses(GeospatialData, "4,2,3,4", {})
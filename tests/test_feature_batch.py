@@ -0,0 +1,69 @@
+"""FeatureBatchBuilder must reject malformed features without corrupting
+the features already collected in the batch."""
+import pytest
+import shapely
+
+from utils.feature_batch import FeatureBatchBuilder, build_batches
+
+pytestmark = pytest.mark.unit
+
+SQUARE = [[[0, 0], [1, 0], [1, 1], [0, 1], [0, 0]]]
+
+
+def polygon(coordinates, **properties):
+    return {"type": "Feature", "properties": properties,
+            "geometry": {"type": "Polygon", "coordinates": coordinates}}
+
+
+def test_malformed_feature_leaves_batch_intact():
+    builder = FeatureBatchBuilder()
+    builder.append(polygon(SQUARE, name="a"))
+    # The first ring is valid, the second fails half way through
+    with pytest.raises(TypeError):
+        builder.append(polygon([SQUARE[0], [[0, 0], "x"]], name="bad"))
+    builder.append(polygon(SQUARE, name="b"))
+
+    (batch,) = builder.build()
+    assert len(batch) == 2
+    assert [p["name"] for p in batch.property_dicts()] == ["a", "b"]
+    geometries = batch.to_geometries()
+    assert shapely.equals(geometries, shapely.MultiPolygon([shapely.Polygon(SQUARE[0])])).all()
+
+
+@pytest.mark.parametrize("ring", [
+    [[0, 0], [1]],
+    [[0, 0], [1, 0], [1, 1, 5], [0, 0]],
+    [[0, 0, 0], [1]],
+])
+def test_positions_with_wrong_arity_are_rejected(ring):
+    builder = FeatureBatchBuilder()
+    with pytest.raises(ValueError):
+        builder.append(polygon([ring]))
+    builder.append(polygon(SQUARE))
+    (batch,) = builder.build()
+    assert len(batch) == 1
+    assert batch.coords.shape == (5, 2)
+
+
+def test_build_batches_counts_skipped_features():
+    features = [polygon(SQUARE), polygon([[[0, 0], [1]]]), polygon(SQUARE)]
+    batches, skipped = build_batches(features)
+    assert sum(skipped.values()) == 1
+    assert sum(len(batch) for batch in batches) == 2
+
+
+def test_build_batches_reports_skip_reasons():
+    collection = {
+        "type": "Feature",
+        "properties": {},
+        "geometry": {"type": "GeometryCollection", "geometries": []},
+    }
+    features = [collection, {"type": "Feature", "properties": {}, "geometry": None},
+                {"type": "Feature", "geometry": {"coordinates": []}}, polygon(SQUARE)]
+    batches, skipped = build_batches(features)
+    assert skipped == {
+        "Unsupported geometry type: GeometryCollection": 1,
+        "Feature missing geometry": 1,
+        "Malformed feature": 1,
+    }
+    assert sum(len(batch) for batch in batches) == 1
@@ -0,0 +1,47 @@
+"""Feature stats must fold trigger-maintained rows into the /stats payload,
+and the trigger SQL must aggregate every layer with its own expressions."""
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from schemas.geospatial import GeospatialStats
+from utils.feature_stats import STATS_LAYERS, _upsert, summarize
+
+pytestmark = pytest.mark.unit
+
+
+def stats(feature_type, source, count, area, day):
+    return SimpleNamespace(feature_type=feature_type, source=source, feature_count=count,
+                           total_area_m2=area, last_updated=datetime(2024, 1, day, tzinfo=timezone.utc))
+
+
+def test_summarize_groups_by_type_and_source():
+    rows = [
+        stats("Polygon", "a.geojson", 3, 10.0, 2),
+        stats("Point", "a.geojson", 5, 0.0, 5),
+        stats("Polygon", "b.geojson", 2, 4.5, 1),
+    ]
+    summary = summarize(rows)
+    assert summary["total_features"] == 10
+    assert summary["total_area_m2"] == 14.5
+    assert summary["by_type"] == {"Polygon": 5, "Point": 5}
+    assert summary["by_source"] == {"a.geojson": 8, "b.geojson": 2}
+    assert summary["last_updated"].day == 5
+    assert GeospatialStats(**summary).total_features == 10
+
+
+def test_summarize_without_rows():
+    summary = summarize([])
+    assert summary["total_features"] == 0
+    assert summary["last_updated"] is None
+    assert GeospatialStats(**summary).by_type == {}
+
+
+@pytest.mark.parametrize("layer", sorted(STATS_LAYERS))
+def test_upsert_uses_the_layer_expressions(layer):
+    type_expr, source_expr = STATS_LAYERS[layer]
+    sql = _upsert(layer, "old_rows", "-")
+    assert f"SELECT '{layer}', {type_expr}, {source_expr}, - count(*)" in sql
+    assert "FROM old_rows GROUP BY 2, 3" in sql
+    assert "ON CONFLICT (layer, feature_type, source) DO UPDATE" in sql
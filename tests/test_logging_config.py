@@ -0,0 +1,103 @@
+"""The background log writer must never block callers on routine records,
+never lose warnings, and report every record it drops."""
+import logging
+import os
+import queue
+import sys
+
+import pytest
+
+from config import logging_config
+from config.logging_config import RateLimitFilter, SamplingFilter
+
+pytestmark = pytest.mark.unit
+
+
+def record(level=logging.INFO, msg="message %s", args=("x",)):
+    return logging.LogRecord("test", level, __file__, 1, msg, args, None)
+
+
+class Capture(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def test_sampling_keeps_warnings():
+    sampling = SamplingFilter(0.0)
+    assert not sampling.filter(record(logging.INFO))
+    assert sampling.filter(record(logging.WARNING))
+    assert SamplingFilter(1.0).filter(record(logging.DEBUG))
+
+
+def test_rate_limit_reports_drops_on_the_next_kept_record(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(logging_config.time, "monotonic", lambda: now[0])
+    limiter = RateLimitFilter(2)
+    assert [limiter.filter(record()) for _ in range(5)] == [True, True, False, False, False]
+    # Errors are never rate limited
+    assert limiter.filter(record(logging.ERROR))
+
+    now[0] += 1
+    kept = record()
+    assert limiter.filter(kept)
+    assert kept.dropped == 3
+
+
+@pytest.fixture
+def handler(monkeypatch):
+    """Queue handler on a one-slot queue that nothing drains"""
+    capture = Capture()
+    monkeypatch.setattr(logging_config, "_writer_pid", os.getpid())
+    monkeypatch.setattr(logging_config, "_drops", logging_config._DropCounter())
+    monkeypatch.setattr(logging_config, "LOG_QUEUE_BLOCK_TIMEOUT", 0.01)
+    monkeypatch.setitem(logging_config._dispatcher.routes, "test", [capture])
+    log_queue = queue.Queue(1)
+    return logging_config._RoutedQueueHandler(log_queue, "test"), log_queue, capture
+
+
+def test_full_queue_drops_and_counts_routine_records(handler):
+    queue_handler, log_queue, capture = handler
+    for _ in range(4):
+        queue_handler.handle(record())
+    assert log_queue.qsize() == 1
+    assert logging_config.dropped_records() == 3
+    assert capture.records == []
+
+    # Once there is room, the next record carries the drop count
+    log_queue.get_nowait()
+    queue_handler.handle(record())
+    assert log_queue.get_nowait().queue_dropped == 3
+
+
+def test_full_queue_writes_warnings_inline(handler):
+    queue_handler, log_queue, capture = handler
+    queue_handler.handle(record())
+    queue_handler.handle(record(logging.ERROR, "disk %s", ("full",)))
+    assert [r.getMessage() for r in capture.records] == ["disk full"]
+    assert logging_config.dropped_records() == 0
+
+
+def test_records_are_prepared_in_the_calling_thread(handler):
+    queue_handler, log_queue, _ = handler
+    try:
+        raise ValueError("bad geometry")
+    except ValueError:
+        failing = logging.LogRecord("test", logging.INFO, __file__, 1, "%s failed", ("feature",),
+                                    exc_info=sys.exc_info())
+    queue_handler.handle(failing)
+    queued = log_queue.get_nowait()
+    assert queued.msg == "feature failed" and queued.args is None
+    assert queued.exc_info is None and "ValueError: bad geometry" in queued.exc_text
+    assert queued.route == "test"
+
+
+def test_forked_children_write_inline(handler, monkeypatch):
+    queue_handler, log_queue, capture = handler
+    monkeypatch.setattr(logging_config, "_writer_pid", -1)
+    queue_handler.handle(record())
+    assert log_queue.empty()
+    assert len(capture.records) == 1
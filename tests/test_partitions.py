@@ -0,0 +1,44 @@
+"""Partition names must be stable, valid PostgreSQL identifiers that never
+collide between layers."""
+import re
+
+import pytest
+
+from utils.partitions import default_partition_name, partition_name
+
+pytestmark = pytest.mark.unit
+
+IDENTIFIER = re.compile(r"[a-z_][a-z0-9_]{0,62}")
+
+
+@pytest.mark.parametrize("key", [
+    "karnataka_tile",
+    "Karnataka Tile",
+    "ಕರ್ನಾಟಕ",
+    "",
+    "x" * 200,
+    "a/b\\c;DROP TABLE geo_features",
+])
+def test_names_are_valid_identifiers(key):
+    name = partition_name("geo_features", key)
+    assert IDENTIFIER.fullmatch(name), name
+    assert name.startswith("geo_features_")
+
+
+def test_names_are_stable():
+    assert partition_name("geo_features", "karnataka_tile") == partition_name("geo_features", "karnataka_tile")
+
+
+def test_keys_with_the_same_slug_do_not_collide():
+    keys = ["Mysuru", "mysuru", "mysuru!", "MYSURU ", "x" * 100 + "a", "x" * 100 + "b"]
+    names = {partition_name("geo_features", key) for key in keys}
+    assert len(names) == len(keys)
+
+
+def test_non_ascii_key_gets_a_placeholder_slug():
+    assert re.fullmatch(r"geo_features_layer_[0-9a-f]{8}", partition_name("geo_features", "ಕರ್ನಾಟಕ"))
+
+
+def test_default_partition_does_not_clash_with_layers():
+    assert default_partition_name("geo_features") == "geo_features_default"
+    assert partition_name("geo_features", "default") != "geo_features_default"
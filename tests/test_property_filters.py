@@ -0,0 +1,72 @@
+"""Property filters must parse `prop.<key>` and `prop` query parameters and
+compile every filter to a JSONB containment predicate."""
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Table
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import JSONB
+
+from utils.property_filters import PropertyFilters, parse_property_filters, property_clauses
+
+pytestmark = pytest.mark.unit
+
+features = Table("features", MetaData(), Column("id", Integer), Column("properties", JSONB))
+
+
+def compiled(clause):
+    compiled = clause.compile(dialect=postgresql.dialect())
+    return str(compiled), list(compiled.params.values())
+
+
+def test_parse_values_and_document():
+    filters = parse_property_filters({
+        "prop.DISTRICT": "Mysuru",
+        "prop": '{"zone": {"name": "south"}}',
+        "prop.": "ignored",
+        "bbox": "1,2,3,4",
+    })
+    assert filters.values == {"DISTRICT": "Mysuru"}
+    assert filters.document == {"zone": {"name": "south"}}
+
+
+def test_no_filters_is_falsy():
+    assert not parse_property_filters({"skip": "0"})
+    assert property_clauses(features.c.properties, PropertyFilters()) == []
+
+
+@pytest.mark.parametrize("document", ['{"a": 1', "[1, 2]", '"text"'])
+def test_document_must_be_a_json_object(document):
+    with pytest.raises(ValueError, match="JSON object"):
+        parse_property_filters({"prop": document})
+
+
+def test_key_given_both_ways_is_rejected():
+    with pytest.raises(ValueError, match="conflicts"):
+        parse_property_filters({"prop": '{"code": 8}', "prop.code": "7"})
+
+
+def test_text_values_and_document_share_one_containment():
+    filters = PropertyFilters(document={"zone": "south"}, values={"DISTRICT": "Mysuru"})
+    (clause,) = property_clauses(features.c.properties, filters)
+    sql, params = compiled(clause)
+    assert "@>" in sql
+    assert params == [{"zone": "south", "DISTRICT": "Mysuru"}]
+
+
+@pytest.mark.parametrize("value, typed", [("7", 7), ("1.5", 1.5), ("true", True), ("null", None)])
+def test_typed_values_match_text_or_json(value, typed):
+    (clause,) = property_clauses(features.c.properties, PropertyFilters(values={"code": value}))
+    sql, params = compiled(clause)
+    assert " OR " in sql
+    assert params == [{"code": value}, {"code": typed}]
+
+
+def test_document_values_are_not_widened():
+    (clause,) = property_clauses(features.c.properties, PropertyFilters(document={"code": 7}))
+    sql, params = compiled(clause)
+    assert " OR " not in sql
+    assert params == [{"code": 7}]
+
+
+def test_quoted_json_strings_stay_text():
+    (clause,) = property_clauses(features.c.properties, PropertyFilters(values={"name": '"x"'}))
+    assert compiled(clause)[1] == [{"name": '"x"'}]
@@ -0,0 +1,112 @@
+"""Per-route metrics must be labelled by route template and split each
+request's time into SQL and response serialization."""
+import asyncio
+import time
+from typing import List
+
+import httpx
+import pytest
+from fastapi import APIRouter, FastAPI
+from prometheus_client import REGISTRY
+from pydantic import BaseModel
+from sqlalchemy import create_engine, text
+
+from utils.request_metrics import MetricsMiddleware, TimedRoute, instrument_sql_timing
+from utils.serialization import GeoJSONResponse
+
+pytestmark = pytest.mark.unit
+
+engine = create_engine("sqlite://")
+instrument_sql_timing(engine)
+
+
+class Item(BaseModel):
+    id: int
+    name: str
+
+
+def slow_items() -> List[dict]:
+    time.sleep(0.05)   # endpoint work, before serialization starts
+    return [{"id": i, "name": f"item {i}"} for i in range(3)]
+
+
+router = APIRouter(prefix="/metrics-test", route_class=TimedRoute)
+
+
+@router.get("/items/{item_id}", response_model=Item)
+def read_item(item_id: int):
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        conn.execute(text("SELECT 2"))
+    return {"id": item_id, "name": "one"}
+
+
+class SlowList(BaseModel):
+    items: List[Item]
+
+
+@router.get("/slow", response_model=SlowList)
+async def slow():
+    return {"items": slow_items()}
+
+
+@router.get("/geojson")
+async def geojson():
+    return GeoJSONResponse({"type": "FeatureCollection", "features": []})
+
+
+app = FastAPI()
+app.include_router(router)
+app.add_middleware(MetricsMiddleware)
+
+
+def get(path):
+    async def request():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path)
+    return asyncio.run(request())
+
+
+def sample(name, route, **labels):
+    return REGISTRY.get_sample_value(name, {"method": "GET", "route": route, **labels}) or 0.0
+
+
+def test_requests_are_labelled_by_route_template():
+    route = "/metrics-test/items/{item_id}"
+    before = sample("http_request_duration_seconds_count", route, status="200")
+    assert get("/metrics-test/items/1").status_code == 200
+    assert get("/metrics-test/items/2").status_code == 200
+    assert sample("http_request_duration_seconds_count", route, status="200") == before + 2
+
+
+def test_sql_statements_are_attributed_to_the_request():
+    route = "/metrics-test/items/{item_id}"
+    before = sample("http_request_db_queries_total", route)
+    get("/metrics-test/items/7")
+    assert sample("http_request_db_queries_total", route) == before + 2
+    assert sample("http_request_db_seconds_count", route) >= 1
+
+
+def test_unknown_paths_share_one_label():
+    before = sample("http_request_duration_seconds_count", "unmatched", status="404")
+    assert get("/metrics-test/nope/1").status_code == 404
+    assert sample("http_request_duration_seconds_count", "unmatched", status="404") == before + 1
+
+
+def test_response_rendering_counts_as_serialization():
+    before = sample("http_request_serialization_seconds_sum", "/metrics-test/geojson")
+    get("/metrics-test/geojson")
+    count = sample("http_request_serialization_seconds_count", "/metrics-test/geojson")
+    assert count >= 1
+    assert sample("http_request_serialization_seconds_sum", "/metrics-test/geojson") >= before
+
+
+def test_endpoint_time_is_not_serialization():
+    route = "/metrics-test/slow"
+    before = sample("http_request_serialization_seconds_sum", route)
+    response = get(route)
+    assert len(response.json()["items"]) == 3
+    # The endpoint sleeps; only the work after it returns counts
+    assert sample("http_request_serialization_seconds_sum", route) - before < 0.05
+    assert sample("http_request_duration_seconds_sum", route, status="200") >= 0.05
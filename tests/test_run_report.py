@@ -0,0 +1,55 @@
+"""Run reports must attribute traced time to stages and summarize resource
+samples for the whole run, whether it succeeds or fails."""
+import time
+
+import pytest
+
+from utils.metrics import PerformanceMonitor
+from utils.run_report import RunTracker, stage_percentages
+from utils.tracing import span
+
+pytestmark = pytest.mark.unit
+
+
+def test_stage_percentages():
+    assert stage_percentages({"parse": 1.0, "fetch": 3.0}) == {"fetch": 75.0, "parse": 25.0}
+    assert stage_percentages({"a": 1.0, "b": 1.0, "c": 1.0}) == {"a": 33.33, "b": 33.33, "c": 33.33}
+
+
+def test_stage_percentages_without_time():
+    assert stage_percentages({}) == {}
+    assert stage_percentages({"fetch": 0.0}) == {}
+
+
+def test_tracker_summarizes_stages_of_the_run():
+    with span("before_the_run"):
+        pass
+    with RunTracker("test", persist=False) as run:
+        with span("validate"):
+            time.sleep(0.01)
+        with span("db_write"):
+            time.sleep(0.03)
+        run.features_processed = 10
+    summary = run.summary
+    assert summary["status"] == "completed"
+    assert set(summary["stage_percentages"]) == {"validate", "db_write"}
+    assert summary["stage_percentages"]["db_write"] > summary["stage_percentages"]["validate"]
+    assert summary["features_per_second"] > 0
+    assert summary["peak_rss_bytes"] > 0
+
+
+def test_tracker_records_failed_runs():
+    with pytest.raises(RuntimeError):
+        with RunTracker("test", persist=False) as run:
+            raise RuntimeError("fetch returned nothing")
+    assert run.summary["status"] == "failed"
+    assert run.summary["features_per_second"] == 0.0
+
+
+def test_monitor_keeps_run_wide_peak_beyond_the_buffer():
+    monitor = PerformanceMonitor(capacity=2)
+    samples = [monitor.sample() for _ in range(5)]
+    assert len(monitor.samples()) == 2
+    summary = monitor.summary()
+    assert summary["samples"] == 5
+    assert summary["peak_rss_bytes"] == max(s.rss_bytes for s in samples)
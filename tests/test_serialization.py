@@ -0,0 +1,46 @@
+"""Rows serialized by PostGIS must be embedded in responses verbatim,
+never parsed and re-encoded."""
+from types import SimpleNamespace
+
+import orjson
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from models.geospatial import GeospatialData
+from utils.serialization import GeoJSONResponse, fragment, json_select, row_to_dict, rows_to_list
+
+pytestmark = pytest.mark.unit
+
+GEOMETRY = '{"type":"Point","coordinates":[77.590000001,12.97]}'
+PROPERTIES = '{"name": "Bengaluru",  "codes": [1, 2]}'
+
+
+def row(**values):
+    return SimpleNamespace(_mapping=values)
+
+
+def test_json_select_serializes_in_the_database():
+    sql = str(json_select(GeospatialData, geometry_precision=6).compile(dialect=postgresql.dialect()))
+    assert "ST_AsGeoJSON(geospatial_data.geometry" in sql
+    assert "CAST(geospatial_data.properties AS VARCHAR) AS properties" in sql
+    assert "geospatial_data.name" in sql
+
+
+def test_fragments_are_embedded_verbatim():
+    body = GeoJSONResponse(row_to_dict(row(id=1, geometry=GEOMETRY, properties=PROPERTIES))).body
+    # Precision and whitespace come straight from PostGIS/PostgreSQL
+    assert GEOMETRY.encode() in body
+    assert PROPERTIES.encode() in body
+    assert orjson.loads(body)["properties"] == {"name": "Bengaluru", "codes": [1, 2]}
+
+
+def test_null_geometry_and_properties():
+    data = row_to_dict(row(id=1, geometry=None, properties=None))
+    assert data["geometry"] is None and data["properties"] is None
+    assert fragment(None) is None
+
+
+def test_rows_to_list_renders_a_json_array():
+    rows = [row(id=i, geometry=GEOMETRY, properties="{}") for i in range(3)]
+    body = GeoJSONResponse(rows_to_list(rows)).body
+    assert [item["id"] for item in orjson.loads(body)] == [0, 1, 2]
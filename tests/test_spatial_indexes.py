@@ -0,0 +1,43 @@
+"""EXPLAIN every spatial predicate exposed by the districts API and check
+that PostgreSQL answers it from the districts GIST index."""
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+
+from utils import spatial_queries
+
+# models.district imports the app-level `database` module
+District = pytest.importorskip("models.district").District
+
+pytestmark = pytest.mark.integration
+
+# A box and a point inside Bengaluru Urban, far from the state border
+BBOX = (77.4, 12.8, 77.8, 13.1)
+LON, LAT = 77.59, 12.97
+INDEX = "idx_districts_geometry"
+
+geom = District.geometry
+PREDICATES = {
+    "intersects_bbox": select(District.id).where(spatial_queries.intersects_bbox(geom, *BBOX)),
+    "within_bbox": select(District.id).where(spatial_queries.within_bbox(geom, *BBOX)),
+    "contains_point": select(District.id).where(spatial_queries.contains_point(geom, LON, LAT)),
+    "within_distance": select(District.id).where(spatial_queries.within_distance(geom, LON, LAT, 5000)),
+    "nearest": select(District.id).order_by(spatial_queries.nearest_order(geom, LON, LAT)).limit(3),
+}
+
+
+@pytest.fixture
+def districts_table(engine):
+    try:
+        District.__table__.create(engine, checkfirst=True)
+    except OperationalError as e:
+        pytest.skip(f"PostgreSQL not reachable: {e.orig}")
+    yield
+    District.__table__.drop(engine, checkfirst=True)
+
+
+@pytest.mark.parametrize("name", sorted(PREDICATES))
+def test_predicate_uses_gist_index(districts_table, db_session, name):
+    conn = db_session.connection()
+    assert INDEX in spatial_queries.explain_index_scans(conn, PREDICATES[name])
+
@@ -0,0 +1,63 @@
+"""The chunked spatial join must write one schema for every chunk and tag
+each point with the district containing it."""
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+import shapely
+
+from scripts import spatial_join
+
+pytestmark = pytest.mark.unit
+
+
+def test_output_schema_appends_join_columns_once():
+    schema = spatial_join.output_schema(pa.schema([
+        ("lon", pa.float64()), ("lat", pa.float64()), ("note", pa.null()), ("district", pa.string()),
+    ]))
+    assert schema.names == ["lon", "lat", "note", "district_id", "district"]
+    assert schema.field("note").type == pa.string()
+    assert schema.field("district_id").type == pa.int64()
+
+
+@pytest.fixture
+def districts(monkeypatch):
+    west, east = shapely.box(74, 12, 76, 14), shapely.box(76, 12, 78, 14)
+    monkeypatch.setattr(spatial_join, "load_districts", lambda source: (
+        [1, 2], ["Dakshina Kannada", "Bengaluru Urban"], shapely.to_wkb([west, east]).tolist()
+    ))
+
+
+def test_csv_chunks_share_one_schema(tmp_path, districts):
+    source = tmp_path / "points.csv"
+    # `code` looks numeric in the first chunk only; `note` is empty in the first chunk
+    source.write_text(
+        "lon,lat,code,note\n"
+        "75.0,13.0,1,\n"
+        "77.5,13.0,2,\n"
+        "80.0,13.0,x3,outside\n"
+        "77.0,12.5,4,east\n"
+    )
+    output = tmp_path / "tagged.parquet"
+    total = spatial_join.spatial_join(source, output, "lon", "lat", chunk_size=2, workers=1)
+
+    assert total == 4
+    table = pq.read_table(output)
+    assert table.schema.field("code").type in (pa.string(), pa.large_string())
+    assert table.schema.field("note").type == table.schema.field("code").type
+    rows = table.to_pandas()
+    assert rows["code"].tolist() == ["1", "2", "x3", "4"]
+    assert rows["district_id"].tolist()[:2] == [1, 2]
+    assert pd.isna(rows["district_id"][2]) and pd.isna(rows["district"][2])
+    assert rows["district"].tolist()[3] == "Bengaluru Urban"
+
+
+def test_parquet_input_keeps_its_types(tmp_path, districts):
+    source = tmp_path / "points.parquet"
+    pq.write_table(pa.table({"lon": [75.0, 77.0], "lat": [13.0, 13.0], "count": [3, 4]}), source)
+    output = tmp_path / "tagged.parquet"
+    spatial_join.spatial_join(source, output, "lon", "lat", chunk_size=1, workers=1)
+
+    table = pq.read_table(output)
+    assert table.schema.field("count").type == pa.int64()
+    assert table.column("district").to_pylist() == ["Dakshina Kannada", "Bengaluru Urban"]
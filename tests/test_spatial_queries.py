@@ -0,0 +1,49 @@
+"""Validation and parameter binding of the spatial predicate helpers."""
+import math
+
+import pytest
+from geoalchemy2 import Geometry
+from sqlalchemy import Column, MetaData, Table, select
+from sqlalchemy.dialects import postgresql
+
+from utils import spatial_queries
+
+pytestmark = pytest.mark.unit
+
+features = Table("features", MetaData(), Column("geometry", Geometry("GEOMETRY", srid=4326)))
+
+
+def compiled(clause):
+    return select(features).where(clause).compile(dialect=postgresql.dialect())
+
+
+def test_parse_bbox():
+    assert spatial_queries.parse_bbox("77.4,12.8,77.8,13.1") == (77.4, 12.8, 77.8, 13.1)
+
+
+@pytest.mark.parametrize("value", ["77.4,13.1,77.8,12.8", "77.8,12.8,77.4,13.1", "1,2,3", "a,b,c,d"])
+def test_parse_bbox_rejects(value):
+    with pytest.raises(ValueError):
+        spatial_queries.parse_bbox(value)
+
+
+def test_inverted_envelope_is_rejected():
+    with pytest.raises(ValueError):
+        spatial_queries.envelope(77.8, 12.8, 77.4, 13.1)
+
+
+def test_bbox_values_are_bound_not_interpolated():
+    sql = compiled(spatial_queries.intersects_bbox(features.c.geometry, 77, 12, 78, 13))
+    assert "ST_MakeEnvelope" in str(sql)
+    assert "77" not in str(sql)
+    assert sorted(v for v in sql.params.values() if isinstance(v, float)) == [12.0, 13.0, 77.0, 78.0]
+
+
+@pytest.mark.parametrize("lat", [0.0, 12.97, 60.0, 80.0])
+def test_distance_prefilter_box_covers_the_radius(lat):
+    meters = 5000
+    sql = compiled(spatial_queries.within_distance(features.c.geometry, 77.59, lat, meters))
+    degrees = max(v for v in sql.params.values() if isinstance(v, float) and v < 1)
+    # One degree of longitude at `lat` is at most 111.32 km * cos(lat)
+    assert degrees * 111320 * max(math.cos(math.radians(lat)), 0.01) >= meters * 0.99
+    assert degrees * spatial_queries.METERS_PER_DEGREE >= meters
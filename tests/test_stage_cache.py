@@ -0,0 +1,132 @@
+"""StagePipeline must skip stages whose code, parameters and inputs are
+unchanged, and rerun exactly the stages an edit affects."""
+import json
+import os
+
+import pytest
+
+from utils.stage_cache import Stage, StagePipeline
+
+pytestmark = pytest.mark.unit
+
+calls = []
+
+
+def upper(inputs, outputs, suffix=""):
+    calls.append("upper")
+    text = inputs[0].read_text()
+    outputs[0].write_text(text.upper() + suffix)
+
+
+def count(inputs, outputs):
+    calls.append("count")
+    outputs[0].write_text(json.dumps({"chars": len(inputs[0].read_text())}))
+
+
+def helper():
+    return 1
+
+
+@pytest.fixture
+def paths(tmp_path):
+    calls.clear()
+    source = tmp_path / "source.txt"
+    source.write_text("karnataka")
+    return source, tmp_path / "out" / "upper.txt", tmp_path / "out" / "count.json", tmp_path / "manifest.json"
+
+
+def pipeline(paths, suffix="", depends_on=()):
+    source, upper_txt, count_json, manifest = paths
+    result = StagePipeline(manifest)
+    # Added out of order: the consumer runs after its producer regardless
+    result.add(Stage("count", count, inputs=[upper_txt], outputs=[count_json]))
+    result.add(Stage("upper", upper, inputs=[source], outputs=[upper_txt],
+                     params={"suffix": suffix}, depends_on=depends_on))
+    return result
+
+
+def test_second_run_is_cached(paths):
+    first = pipeline(paths).run()
+    assert calls == ["upper", "count"]
+    assert first["cache_misses"] == 2
+    assert paths[2].read_text() == '{"chars": 9}'
+
+    calls.clear()
+    second = pipeline(paths).run()
+    assert calls == []
+    assert second["cache_hits"] == 2
+    assert {s["status"] for s in second["stages"].values()} == {"cached"}
+
+
+def test_changed_input_reruns_dependents(paths):
+    pipeline(paths).run()
+    calls.clear()
+    paths[0].write_text("mysuru")
+    pipeline(paths).run()
+    assert calls == ["upper", "count"]
+    assert paths[1].read_text() == "MYSURU"
+
+
+def test_unchanged_output_content_keeps_consumer_cached(paths):
+    pipeline(paths).run()
+    calls.clear()
+    # Same content, new mtime: upper reruns, its output hashes the same
+    paths[0].write_text("Karnataka")
+    summary = pipeline(paths).run()
+    assert calls == ["upper"]
+    assert summary["stages"]["count"]["status"] == "cached"
+
+
+def test_changed_params_rerun_the_stage(paths):
+    pipeline(paths).run()
+    calls.clear()
+    pipeline(paths, suffix="!").run()
+    assert calls == ["upper", "count"]
+
+
+def test_changed_dependencies_rerun_the_stage(paths):
+    pipeline(paths).run()
+    calls.clear()
+    pipeline(paths, depends_on=[helper]).run()
+    assert calls == ["upper"]
+
+
+def test_modified_output_reruns_its_producer(paths):
+    pipeline(paths).run()
+    calls.clear()
+    paths[1].write_text("tampered")
+    os.utime(paths[1], ns=(0, 0))
+    pipeline(paths).run()
+    assert calls[0] == "upper"
+    assert paths[1].read_text() == "KARNATAKA"
+
+
+def test_force_runs_everything(paths):
+    pipeline(paths).run()
+    calls.clear()
+    summary = pipeline(paths).run(force=True)
+    assert calls == ["upper", "count"]
+    assert summary["cache_hits"] == 0
+
+
+def test_failed_stage_keeps_earlier_stages_cached(paths):
+    def broken(inputs, outputs):
+        raise RuntimeError("boom")
+
+    failing = pipeline(paths)
+    failing.stages[0].func = broken
+    with pytest.raises(RuntimeError):
+        failing.run()
+
+    calls.clear()
+    pipeline(paths).run()
+    assert calls == ["count"]
+
+
+def test_cycle_is_rejected(tmp_path):
+    a, b = tmp_path / "a", tmp_path / "b"
+    cyclic = StagePipeline(tmp_path / "manifest.json")
+    cyclic.add(Stage("one", upper, inputs=[a], outputs=[b]))
+    cyclic.add(Stage("two", upper, inputs=[b], outputs=[a]))
+    with pytest.raises(ValueError, match="cycle"):
+        cyclic.ordered()
@@ -0,0 +1,101 @@
+"""The streamed body parsers must give the same items wherever the body is
+split into chunks, and reject bad or oversized items."""
+import asyncio
+
+import pytest
+
+from utils.streaming import iter_json_array, iter_ndjson
+
+pytestmark = pytest.mark.unit
+
+ITEMS = [
+    {"name": "Bengaluru Urban", "code": 1},
+    {"name": "Mysuru", "area": -1.5e3, "urban": True, "note": None},
+    {"name": "Uttara Kannada ಉತ್ತರ", "escaped": "a\"b\\cé"},
+]
+ARRAY = b'[ {"name": "Bengaluru Urban", "code": 1},\n{"name": "Mysuru", "area": -1.5e3, "urban": true, "note": null} ,' \
+        + '{"name": "Uttara Kannada ಉತ್ತರ", "escaped": "a\\"b\\\\c\\u00e9"}]'.encode()
+NDJSON = b'{"name": "Bengaluru Urban", "code": 1}\n\n{"name": "Mysuru", "area": -1.5e3, "urban": true, "note": null}\r\n' \
+         + '{"name": "Uttara Kannada ಉತ್ತರ", "escaped": "a\\"b\\\\c\\u00e9"}'.encode()
+
+
+async def _chunks(parts):
+    for part in parts:
+        yield part
+
+
+def parse(parser, parts, **kwargs):
+    async def collect():
+        return [item async for item in parser(_chunks(parts), **kwargs)]
+    return asyncio.run(collect())
+
+
+def split_at(body: bytes, *cuts: int):
+    bounds = [0, *cuts, len(body)]
+    return [body[a:b] for a, b in zip(bounds, bounds[1:])]
+
+
+@pytest.mark.parametrize("parser, body", [(iter_json_array, ARRAY), (iter_ndjson, NDJSON)])
+def test_every_two_chunk_split_gives_the_same_items(parser, body):
+    # Cuts land inside strings, numbers, literals, escapes and multi-byte characters
+    for cut in range(len(body) + 1):
+        assert parse(parser, split_at(body, cut)) == [(item, None) for item in ITEMS], cut
+
+
+@pytest.mark.parametrize("parser, body", [(iter_json_array, ARRAY), (iter_ndjson, NDJSON)])
+def test_byte_at_a_time(parser, body):
+    parts = [body[i:i + 1] for i in range(len(body))]
+    assert parse(parser, parts) == [(item, None) for item in ITEMS]
+
+
+def test_empty_array():
+    assert parse(iter_json_array, [b" [", b" ] "]) == []
+
+
+@pytest.mark.parametrize("body, message", [
+    (b'{"a": 1}', "must be a JSON array"),
+    (b'[1, 2]', "must be objects"),
+    (b'[{"a": 1} {"b": 2}]', "Expected ','"),
+    (b'[{"a": 1}', "Truncated JSON array"),
+    (b'[{"a": 1', "Truncated or invalid"),
+    (b'[{"a": 1}] x', "Unexpected data"),
+])
+def test_array_errors(body, message):
+    with pytest.raises(ValueError, match=message):
+        parse(iter_json_array, split_at(body, len(body) // 2))
+
+
+def test_array_syntax_error_fails_before_the_body_ends():
+    seen = []
+
+    async def body():
+        yield b'[{"a": 1}, {"a": trux}, '
+        seen.append("rest")
+        yield b'{"a": 2}]'
+
+    async def collect():
+        return [item async for item in iter_json_array(body())]
+
+    with pytest.raises(ValueError, match="Invalid JSON array item"):
+        asyncio.run(collect())
+    assert seen == []
+
+
+def test_array_item_over_the_limit():
+    big = b'[{"a": "' + b"x" * 100 + b'"}]'
+    with pytest.raises(ValueError, match="exceeds 50 bytes"):
+        parse(iter_json_array, split_at(big, 60), max_item_bytes=50)
+
+
+def test_ndjson_bad_line_is_reported_and_skipped():
+    body = b'{"a": 1}\n{"a": \n{"a": 2}\n'
+    items = parse(iter_ndjson, split_at(body, 12))
+    assert items[0] == ({"a": 1}, None)
+    assert items[1][0] is None and items[1][1].startswith("Invalid JSON")
+    assert items[2] == ({"a": 2}, None)
+
+
+def test_ndjson_oversized_line_is_skipped_across_chunks():
+    body = b'{"a": 1}\n{"a": "' + b"x" * 40 + b'"}\n{"a": 2}'
+    items = parse(iter_ndjson, [body[i:i + 7] for i in range(0, len(body), 7)], max_line_bytes=20)
+    assert items == [({"a": 1}, None), (None, "Line exceeds 20 bytes"), ({"a": 2}, None)]
@@ -0,0 +1,86 @@
+"""TopoJSON encoding must store the edge shared by adjacent polygons once
+and still decode back to the input rings."""
+import numpy as np
+import pytest
+import shapely
+from shapely.geometry import MultiPolygon, Polygon, box
+
+from utils.topojson import encode_topology
+
+pytestmark = pytest.mark.unit
+
+
+def decode_arcs(topology):
+    """Absolute arc coordinates in source units"""
+    scale = np.asarray(topology["transform"]["scale"])
+    translate = np.asarray(topology["transform"]["translate"])
+    return [np.cumsum(np.asarray(arc), axis=0) * scale + translate for arc in topology["arcs"]]
+
+
+def decode_ring(arcs, indexes):
+    points = []
+    for index in indexes:
+        arc = arcs[index] if index >= 0 else arcs[~index][::-1]
+        # Consecutive arcs share their joining vertex
+        points.extend(arc if not points else arc[1:])
+    return Polygon(points)
+
+
+def encode(*geometries, quantization=1001):
+    features = [{"id": i, "geometry": g, "properties": {"n": i}} for i, g in enumerate(geometries)]
+    return encode_topology(features, quantization=quantization)
+
+
+def test_shared_edge_is_stored_once():
+    left, right = box(0, 0, 1, 1), box(1, 0, 2, 1)
+    topology = encode(left, right)
+    geometries = topology["objects"]["districts"]["geometries"]
+    left_arcs, right_arcs = (g["arcs"][0] for g in geometries)
+
+    shared = {i if i >= 0 else ~i for i in left_arcs} & {i if i >= 0 else ~i for i in right_arcs}
+    assert len(shared) == 1
+    # Each polygon walks the shared edge in the opposite direction
+    (index,) = shared
+    assert (index in left_arcs) != (index in right_arcs)
+    # Two outer arcs plus the shared edge
+    assert len(topology["arcs"]) == 3
+
+
+def test_rings_decode_to_input():
+    geometries = [box(0, 0, 1, 1), box(1, 0, 2, 1), box(0, 1, 2, 2)]
+    topology = encode(*geometries)
+    arcs = decode_arcs(topology)
+    for source, encoded in zip(geometries, topology["objects"]["districts"]["geometries"]):
+        decoded = decode_ring(arcs, encoded["arcs"][0])
+        assert shapely.equals(decoded, source)
+
+
+def test_isolated_ring_and_holes():
+    shell = [(0, 0), (4, 0), (4, 4), (0, 4), (0, 0)]
+    hole = [(1, 1), (2, 1), (2, 2), (1, 2), (1, 1)]
+    island = MultiPolygon([Polygon(shell, [hole]), box(10, 10, 11, 11)])
+    topology = encode(island, quantization=1101)  # grid step of 0.01
+    (encoded,) = topology["objects"]["districts"]["geometries"]
+    assert encoded["type"] == "MultiPolygon"
+    arcs = decode_arcs(topology)
+    outer, inner = (decode_ring(arcs, ring) for ring in encoded["arcs"][0])
+    assert shapely.equals(Polygon(outer.exterior, [inner.exterior.coords]), island.geoms[0])
+    assert shapely.equals(decode_ring(arcs, encoded["arcs"][1][0]), island.geoms[1])
+
+
+def test_properties_and_ids_are_kept():
+    topology = encode(box(0, 0, 1, 1))
+    (encoded,) = topology["objects"]["districts"]["geometries"]
+    assert encoded["id"] == 0
+    assert encoded["properties"] == {"n": 0}
+    assert topology["bbox"] == [0.0, 0.0, 1.0, 1.0]
+
+
+def test_non_polygonal_geometry_is_rejected():
+    with pytest.raises(ValueError):
+        encode(shapely.Point(0, 0))
+
+
+def test_quantization_must_be_at_least_two():
+    with pytest.raises(ValueError):
+        encode(box(0, 0, 1, 1), quantization=1)
@@ -0,0 +1,212 @@
+"""Spatially indexed artifacts of the processed Karnataka data.
+
+The pipeline writes the processed layer three ways:
+
+* ``karnataka_processed.parquet`` - GeoParquet 1.1 with a ``bbox`` covering
+  column. Rows are sorted along a Hilbert curve and written in small row
+  groups, so the row-group statistics of ``bbox`` prune most of the file for
+  a bounding-box query.
+* ``karnataka_processed.fgb`` - FlatGeobuf with a packed Hilbert R-tree, for
+  GDAL/QGIS consumers and as a fallback reader.
+* ``karnataka_processed.geojson`` - the original text hand-off, kept for
+  anything that still expects it.
+
+Readers prefer the GeoParquet file and only read the requested columns and
+the row groups intersecting the requested bbox.
+"""
+import json
+from importlib.util import find_spec
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import orjson
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import shapely
+
+DATA_DIR = Path("data")
+PROCESSED_PARQUET = DATA_DIR / "karnataka_processed.parquet"
+PROCESSED_FGB = DATA_DIR / "karnataka_processed.fgb"
+PROCESSED_GEOJSON = DATA_DIR / "karnataka_processed.geojson"
+
+GEOMETRY_COLUMN = "geometry"
+BBOX_COLUMN = "bbox"
+ROW_GROUP_SIZE = 2000
+_HILBERT_BITS = 16
+# Column projection for FlatGeobuf/GeoJSON needs pyogrio; fiona reads everything
+_PYOGRIO = find_spec("pyogrio") is not None
+
+BBox = Tuple[float, float, float, float]
+
+
+def hilbert_order(bounds: np.ndarray) -> np.ndarray:
+    """Permutation sorting features by the Hilbert index of their bbox centres"""
+    if len(bounds) == 0:
+        return np.arange(0)
+    centres = np.column_stack([(bounds[:, 0] + bounds[:, 2]) / 2, (bounds[:, 1] + bounds[:, 3]) / 2])
+    centres = np.nan_to_num(centres)
+    lo, hi = centres.min(axis=0), centres.max(axis=0)
+    span = np.where(hi > lo, hi - lo, 1.0)
+    side = (1 << _HILBERT_BITS) - 1
+    x, y = ((centres - lo) / span * side).astype(np.int64).T
+    d = np.zeros(len(x), dtype=np.int64)
+    s = 1 << (_HILBERT_BITS - 1)
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        d += s * s * ((3 * rx) ^ ry)
+        # Rotate the quadrant
+        flip = ~ry & rx
+        x = np.where(flip, side - x, x)
+        y = np.where(flip, side - y, y)
+        swap = ~ry
+        x, y = np.where(swap, y, x), np.where(swap, x, y)
+        s >>= 1
+    return np.argsort(d, kind="stable")
+
+
+def write_geoparquet(geometries: np.ndarray, attributes: pd.DataFrame, path: Path,
+                     row_group_size: int = ROW_GROUP_SIZE) -> None:
+    """GeoParquet with a bbox covering column, rows in Hilbert order"""
+    geometries = np.asarray(geometries, dtype=object)
+    bounds = shapely.bounds(geometries)
+    order = hilbert_order(bounds)
+    geometries, bounds = geometries[order], bounds[order]
+
+    table = pa.Table.from_pandas(attributes.iloc[order].reset_index(drop=True), preserve_index=False)
+    bbox = pa.StructArray.from_arrays(
+        [pa.array(bounds[:, i], type=pa.float64()) for i in range(4)],
+        names=["xmin", "ymin", "xmax", "ymax"],
+    )
+    table = table.append_column(BBOX_COLUMN, bbox)
+    table = table.append_column(GEOMETRY_COLUMN, pa.array(shapely.to_wkb(geometries), type=pa.binary()))
+
+    valid = ~np.isnan(bounds).any(axis=1)
+    geo = {
+        "version": "1.1.0",
+        "primary_column": GEOMETRY_COLUMN,
+        "columns": {
+            GEOMETRY_COLUMN: {
+                "encoding": "WKB",
+                "geometry_types": sorted({g.geom_type for g in geometries[valid]}),
+                "bbox": [
+                    float(bounds[valid, 0].min()), float(bounds[valid, 1].min()),
+                    float(bounds[valid, 2].max()), float(bounds[valid, 3].max()),
+                ] if valid.any() else [],
+                "covering": {
+                    "bbox": {key: [BBOX_COLUMN, key] for key in ("xmin", "ymin", "xmax", "ymax")},
+                },
+            }
+        },
+    }
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"geo": json.dumps(geo).encode()})
+    tmp = path.with_suffix(".parquet.tmp")
+    pq.write_table(table, tmp, row_group_size=row_group_size, compression="zstd")
+    tmp.replace(path)
+
+
+def write_flatgeobuf(gdf, path: Path, engine: Optional[str] = None) -> None:
+    """FlatGeobuf with a packed R-tree spatial index"""
+    kwargs = {"engine": engine} if engine else {}
+    gdf.to_file(path, driver="FlatGeobuf", SPATIAL_INDEX="YES", **kwargs)
+
+
+def write_artifacts(gdf, parquet_path: Path = PROCESSED_PARQUET, fgb_path: Path = PROCESSED_FGB,
+                    engine: Optional[str] = None) -> None:
+    geometry_name = gdf.geometry.name
+    attributes = pd.DataFrame(gdf.drop(columns=[geometry_name]))
+    write_geoparquet(np.asarray(gdf.geometry.values), attributes, parquet_path)
+    write_flatgeobuf(gdf, fgb_path, engine)
+
+
+def _bbox_filter(bbox: BBox):
+    minx, miny, maxx, maxy = bbox
+    return (
+        (pc.field(BBOX_COLUMN, "xmin") <= maxx) & (pc.field(BBOX_COLUMN, "xmax") >= minx)
+        & (pc.field(BBOX_COLUMN, "ymin") <= maxy) & (pc.field(BBOX_COLUMN, "ymax") >= miny)
+    )
+
+
+def parquet_columns(path: Path = PROCESSED_PARQUET) -> List[str]:
+    """Attribute columns of a GeoParquet artifact (without geometry/bbox)"""
+    return [n for n in pq.read_schema(path).names if n not in (GEOMETRY_COLUMN, BBOX_COLUMN)]
+
+
+def _project(columns: Optional[Sequence[str]], available: Sequence[str]) -> List[str]:
+    """Requested columns that exist (all of them when none are requested)"""
+    if columns is None:
+        return list(available)
+    return [c for c in columns if c in available]
+
+
+def read_table(bbox: Optional[BBox] = None, columns: Optional[Sequence[str]] = None,
+               path: Path = PROCESSED_PARQUET) -> pa.Table:
+    """Attribute columns plus WKB geometry of the features intersecting `bbox`"""
+    columns = _project(columns, parquet_columns(path))
+    return ds.dataset(path, format="parquet").to_table(
+        columns=[*columns, GEOMETRY_COLUMN],
+        filter=_bbox_filter(bbox) if bbox else None,
+    )
+
+
+def available_artifact() -> Optional[Path]:
+    """The best processed artifact on disk, if any"""
+    for path in (PROCESSED_PARQUET, PROCESSED_FGB, PROCESSED_GEOJSON):
+        if path.exists():
+            return path
+    return None
+
+
+def read_frame(bbox: Optional[BBox] = None, columns: Optional[Sequence[str]] = None,
+               path: Optional[Path] = None):
+    """GeoDataFrame of the processed layer, bbox-filtered and column-projected.
+
+    Requested columns missing from the artifact are left out.
+    """
+    import geopandas as gpd
+
+    path = Path(path) if path else available_artifact()
+    if path is None:
+        raise FileNotFoundError("No processed Karnataka artifact found")
+    if path.suffix == ".parquet":
+        table = read_table(bbox, columns, path)
+        geometry = shapely.from_wkb(table.column(GEOMETRY_COLUMN).to_numpy(zero_copy_only=False))
+        frame = table.drop_columns([GEOMETRY_COLUMN]).to_pandas()
+        return gpd.GeoDataFrame(frame, geometry=geometry, crs="EPSG:4326")
+    kwargs = {"bbox": bbox} if bbox else {}
+    if _PYOGRIO:
+        import pyogrio
+
+        fields = pyogrio.read_info(path)["fields"].tolist()
+        return gpd.read_file(path, engine="pyogrio", columns=_project(columns, fields), **kwargs)
+    gdf = gpd.read_file(path, **kwargs)
+    attributes = [c for c in gdf.columns if c != gdf.geometry.name]
+    return gdf[[*_project(columns, attributes), gdf.geometry.name]]
+
+
+def feature_collection(bbox: Optional[BBox] = None, columns: Optional[Sequence[str]] = None,
+                       path: Optional[Path] = None) -> bytes:
+    """GeoJSON FeatureCollection bytes, geometry encoded vectorized by shapely"""
+    path = Path(path) if path else available_artifact()
+    if path is None:
+        raise FileNotFoundError("No processed Karnataka artifact found")
+    if path.suffix == ".parquet":
+        table = read_table(bbox, columns, path)
+        geometries = shapely.to_geojson(
+            shapely.from_wkb(table.column(GEOMETRY_COLUMN).to_numpy(zero_copy_only=False))
+        )
+        properties = table.drop_columns([GEOMETRY_COLUMN]).to_pylist()
+    else:
+        gdf = read_frame(bbox, columns, path)
+        geometries = shapely.to_geojson(np.asarray(gdf.geometry.values))
+        properties = json.loads(pd.DataFrame(gdf.drop(columns=[gdf.geometry.name])).to_json(orient="records"))
+    features = [
+        {"type": "Feature", "properties": props, "geometry": orjson.Fragment(geom) if geom else None}
+        for props, geom in zip(properties, geometries)
+    ]
+    return orjson.dumps({"type": "FeatureCollection", "features": features},
+                        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
@@ -0,0 +1,83 @@
+"""Small in-process caches keyed by a data version.
+
+Expensive derived payloads (topologies, aggregates) are cached per data
+version: any write to the underlying table changes the version, so a stale
+entry is never served even across API workers that did not see the write.
+Keys include client-chosen parameters, so each cache keeps only its most
+recently used entries.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from models.district import District
+
+
+def district_version_stmt():
+    """Cheap fingerprint query for the districts table.
+
+    Row count, newest id and newest update: inserts always raise the newest id
+    (ids come from a sequence), deletes lower the count, updates bump updated_at.
+    """
+    return select(func.count(District.id), func.max(District.id), func.max(District.updated_at))
+
+
+def format_version(row) -> str:
+    count, last_id, last_update = row
+    return f"{count}:{last_id or 0}:{last_update.isoformat() if last_update else ''}"
+
+
+def district_data_version(db: Session) -> str:
+    return format_version(db.execute(district_version_stmt()).one())
+
+
+DEFAULT_MAX_ENTRIES = 64
+
+
+class VersionedCache:
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, version: str) -> Optional[Any]:
+        """Cached value for `key` if it was computed at `version`"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] != version:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Hashable, version: str, value: Any) -> None:
+        """Store `value`, evicting the least recently used entries over the cap"""
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, version: str, compute: Callable[[], Any]) -> Any:
+        """Return the cached value for `key` at `version`, computing it on a miss"""
+        value = self.get(key, version)
+        if value is None:
+            value = compute()
+            self.put(key, version, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Cache for encoded district collections; cleared on sync
+district_cache = VersionedCache()
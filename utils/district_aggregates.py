@@ -0,0 +1,93 @@
+"""District-level measurements and the dissolved state outline.
+
+Areas and centroids are computed in the equal-area EASE-Grid 2.0 projection
+(EPSG:6933), so areas are exact for any part of the state. Karnataka spans
+about 74-78.6°E, which crosses the UTM 42N/43N/44N zones, and UTM is
+conformal rather than equal-area. Perimeters are geodesic
+(``ST_Perimeter`` on geography). Results are computed by PostGIS once per
+district data version and kept in ``district_cache``; ``run_sync`` clears
+the cache.
+"""
+import os
+
+import orjson
+from geoalchemy2 import Geography
+from sqlalchemy import cast, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.district import District
+from utils.cache import district_cache, district_version_stmt, format_version
+from utils.serialization import fragment
+from utils.spatial_queries import WGS84_SRID
+
+EQUAL_AREA_SRID = int(os.getenv("DISTRICT_EQUAL_AREA_SRID", "6933"))   # EASE-Grid 2.0
+
+
+def _projected(column):
+    return func.ST_Transform(column, EQUAL_AREA_SRID)
+
+
+def _perimeter_km(column):
+    return func.ST_Perimeter(cast(column, Geography(srid=WGS84_SRID))) / 1e3
+
+
+def district_measures_stmt():
+    projected = _projected(District.geometry)
+    centroid = func.ST_Transform(func.ST_Centroid(projected), WGS84_SRID)
+    return (
+        select(
+            District.id,
+            District.name,
+            (func.ST_Area(projected) / 1e6).label("area_km2"),
+            _perimeter_km(District.geometry).label("perimeter_km"),
+            func.ST_X(centroid).label("centroid_lon"),
+            func.ST_Y(centroid).label("centroid_lat"),
+        )
+        .where(District.geometry.isnot(None))
+        .order_by(District.id)
+    )
+
+
+def state_outline_stmt():
+    dissolved = func.ST_Union(District.geometry).label("dissolved")
+    inner = select(func.count(District.id).label("district_count"), dissolved) \
+        .where(District.geometry.isnot(None)).subquery()
+    return select(
+        inner.c.district_count,
+        (func.ST_Area(_projected(inner.c.dissolved)) / 1e6).label("area_km2"),
+        _perimeter_km(inner.c.dissolved).label("perimeter_km"),
+        func.ST_AsGeoJSON(inner.c.dissolved).label("geometry"),
+    )
+
+
+async def _cached(db: AsyncSession, key: str, compute) -> bytes:
+    version = format_version((await db.execute(district_version_stmt())).one())
+    content = district_cache.get(key, version)
+    if content is None:
+        content = await compute()
+        district_cache.put(key, version, content)
+    return content
+
+
+async def district_measures(db: AsyncSession) -> bytes:
+    """JSON array of per-district area, perimeter and centroid"""
+    async def compute():
+        rows = (await db.execute(district_measures_stmt())).all()
+        return orjson.dumps([dict(row._mapping) for row in rows])
+    return await _cached(db, "measures", compute)
+
+
+async def state_outline(db: AsyncSession) -> bytes:
+    """GeoJSON Feature of all districts dissolved into one outline"""
+    async def compute():
+        row = (await db.execute(state_outline_stmt())).one()
+        return orjson.dumps({
+            "type": "Feature",
+            "geometry": fragment(row.geometry),
+            "properties": {
+                "district_count": row.district_count,
+                "area_km2": row.area_km2,
+                "perimeter_km": row.perimeter_km,
+            },
+        })
+    return await _cached(db, "outline", compute)
@@ -0,0 +1,157 @@
+"""In-process point-in-district index.
+
+District boundaries are loaded once into a Shapely STRtree over prepared
+geometries so "which district is this coordinate in?" is answered without a
+PostGIS round trip. The write paths of this process (CRUD, bulk, sync) call
+:meth:`DistrictIndex.invalidate`, so the next lookup rebuilds the tree. Writes
+made by other workers are noticed by comparing the districts data version
+(utils.cache.district_version_stmt), at most once every
+``DISTRICT_INDEX_CHECK_INTERVAL`` seconds.
+"""
+import os
+import threading
+import time
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import shapely
+from shapely import STRtree
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from utils.logger import spatial_logger
+
+# Seconds between checks for district writes made by other workers
+DISTRICT_INDEX_CHECK_INTERVAL = float(os.getenv("DISTRICT_INDEX_CHECK_INTERVAL", "5"))
+
+
+class _Snapshot:
+    """Immutable view of the index; swapped atomically on refresh"""
+
+    def __init__(self, ids: np.ndarray, names: List[Optional[str]], geometries: np.ndarray,
+                 version: Optional[str] = None):
+        self.version = version
+        self.ids = ids
+        self.names = names
+        self.geometries = geometries
+        shapely.prepare(self.geometries)
+        self.tree = STRtree(self.geometries)
+
+
+class DistrictIndex:
+    def __init__(self, check_interval: float = DISTRICT_INDEX_CHECK_INTERVAL):
+        self._snapshot: Optional[_Snapshot] = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.loaded_at: Optional[float] = None
+        self.check_interval = check_interval
+        self._checked_at = 0.0
+        self._stale = False
+
+    @property
+    def loaded(self) -> bool:
+        return self._snapshot is not None
+
+    def __len__(self) -> int:
+        return len(self._snapshot.ids) if self._snapshot else 0
+
+    @property
+    def version(self) -> Optional[str]:
+        snapshot = self._snapshot
+        return snapshot.version if snapshot else None
+
+    def build(self, ids: Sequence[int], names: Sequence[Optional[str]], geometries: Iterable,
+              version: Optional[str] = None) -> None:
+        """Replace the index contents with the given district geometries"""
+        geoms = np.asarray(list(geometries), dtype=object)
+        snapshot = _Snapshot(np.asarray(ids, dtype=np.int64), list(names), geoms, version)
+        with self._lock:
+            self._snapshot = snapshot
+            self.loaded_at = time.time()
+            self._checked_at = time.monotonic()
+            self._stale = False
+        spatial_logger.info(f"District index built with {len(geoms)} districts")
+
+    def load(self, db: Session, version: Optional[str] = None) -> None:
+        """Load every district boundary from the database"""
+        # Imported here so building from files (scripts/spatial_join.py) needs no database
+        from models.district import District
+
+        if version is None:
+            # Read before the rows: a concurrent write then only forces another reload
+            version = self._data_version(db)
+        rows = db.execute(
+            select(District.id, District.name, func.ST_AsBinary(District.geometry))
+            .where(District.geometry.isnot(None))
+        ).all()
+        ids = [row[0] for row in rows]
+        names = [row[1] for row in rows]
+        geoms = shapely.from_wkb([bytes(row[2]) for row in rows])
+        self.build(ids, names, geoms, version)
+
+    def invalidate(self) -> None:
+        """Districts were written by this process; rebuild on the next lookup"""
+        self._stale = True
+
+    def _data_version(self, db: Session) -> str:
+        from utils.cache import district_data_version
+
+        return district_data_version(db)
+
+    def ensure_current(self, db: Session) -> None:
+        """Rebuild the index if districts changed since it was loaded.
+
+        Only queries the database when the index was invalidated, or when
+        `check_interval` seconds have passed since the last version check.
+        """
+        if not self._stale and self._snapshot is not None \
+                and time.monotonic() - self._checked_at < self.check_interval:
+            return
+        with self._load_lock:
+            # Another request may have rebuilt or checked it while we waited
+            if not self._stale and self._snapshot is not None \
+                    and time.monotonic() - self._checked_at < self.check_interval:
+                return
+            version = self._data_version(db)
+            if self._stale or self.version != version:
+                self.load(db, version)
+            else:
+                self._checked_at = time.monotonic()
+
+    def lookup_many(self, lons: Sequence[float], lats: Sequence[float]) -> Tuple[np.ndarray, List[Optional[str]]]:
+        """Resolve coordinates to districts in one vectorized pass.
+
+        Returns the matching district ids (-1 when a point falls outside every
+        district) and their names (None likewise).
+        """
+        snapshot = self._snapshot
+        x = np.asarray(lons, dtype=np.float64)
+        y = np.asarray(lats, dtype=np.float64)
+        positions = np.full(len(x), -1, dtype=np.int64)
+        if snapshot is None or len(snapshot.ids) == 0 or len(x) == 0:
+            return positions, [None] * len(x)
+
+        # Envelope candidates from the tree, then exact tests on prepared polygons
+        point_idx, tree_idx = snapshot.tree.query(shapely.points(x, y))
+        hits = shapely.intersects_xy(snapshot.geometries[tree_idx], x[point_idx], y[point_idx])
+        point_idx, tree_idx = point_idx[hits], tree_idx[hits]
+
+        # Points on a shared border match twice; keep the first district
+        first_point, first = np.unique(point_idx, return_index=True)
+        positions[first_point] = tree_idx[first]
+
+        matched = positions >= 0
+        district_ids = np.where(matched, snapshot.ids[np.where(matched, positions, 0)], -1)
+        names = [snapshot.names[p] if p >= 0 else None for p in positions.tolist()]
+        return district_ids, names
+
+    def lookup(self, lon: float, lat: float) -> Optional[Tuple[int, Optional[str]]]:
+        """(id, name) of the district containing the coordinate, if any"""
+        ids, names = self.lookup_many([lon], [lat])
+        if ids[0] < 0:
+            return None
+        return int(ids[0]), names[0]
+
+
+# Shared index used by the API process
+district_index = DistrictIndex()
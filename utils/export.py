@@ -0,0 +1,287 @@
+"""Streaming exports of geometry tables.
+
+Rows are read from a server-side cursor in partitions of ``EXPORT_BATCH_SIZE``
+and encoded partition by partition, so a full-table export never
+materializes in memory. Encoders are async generators; the ASGI server only
+pulls the next partition once the client has drained the previous one.
+
+FlatGeobuf is the exception: it is buffered to a temporary file and sent
+only once the whole result is written, and it carries no spatial index.
+"""
+import csv
+import io
+import os
+import tempfile
+import time
+from typing import AsyncIterator, Callable, Dict, List, NamedTuple, Optional
+
+import fiona
+import orjson
+import pyarrow as pa
+import pyarrow.parquet as pq
+import shapely
+from sqlalchemy import Boolean, Date, DateTime, Integer, Numeric, String, Text, cast, func, literal, select
+from sqlalchemy.dialects.postgresql import JSONB
+from starlette.concurrency import run_in_threadpool
+
+from config.database import AsyncSessionLocal
+from utils import spatial_queries
+from utils.logger import api_logger
+from utils.property_filters import parse_property_filters, property_clauses
+from utils.service_metrics import EXPORT_DURATION, EXPORT_ROWS
+
+EXPORT_BATCH_SIZE = 1000
+FILE_CHUNK_SIZE = 1024 * 1024
+
+
+def _scalar_columns(model):
+    return [
+        column
+        for column in model.__table__.columns
+        if column.name not in ("geometry", "properties")
+    ]
+
+
+def properties_json(model):
+    """All non-geometry columns (plus the properties document) as one JSON text"""
+    pairs = []
+    for column in _scalar_columns(model):
+        pairs.extend([literal(column.name, String), column])
+    merged = func.jsonb_build_object(*pairs)
+    if "properties" in model.__table__.columns:
+        merged = func.coalesce(cast(model.properties, JSONB), cast(literal("{}", String), JSONB)).op("||")(merged)
+    return cast(merged, Text)
+
+
+def _feature_columns(model):
+    return [
+        properties_json(model).label("properties"),
+        func.ST_AsGeoJSON(model.geometry).label("geometry"),
+    ]
+
+
+def _flat_columns(geometry_fn: Callable):
+    def columns(model):
+        extra = [cast(model.properties, String).label("properties")] \
+            if "properties" in model.__table__.columns else []
+        return [*_scalar_columns(model), *extra, geometry_fn(model.geometry).label("geometry")]
+    return columns
+
+
+def _feature(row) -> bytes:
+    return orjson.dumps({
+        "type": "Feature",
+        "geometry": orjson.Fragment(row.geometry) if row.geometry else None,
+        "properties": orjson.Fragment(row.properties),
+    })
+
+
+async def _encode_geojson(partitions, columns) -> AsyncIterator[bytes]:
+    yield b'{"type":"FeatureCollection","features":['
+    first = True
+    async for rows in partitions:
+        body = b",".join(_feature(row) for row in rows)
+        if body:
+            yield body if first else b"," + body
+            first = False
+    yield b"]}"
+
+
+async def _encode_ndjson(partitions, columns) -> AsyncIterator[bytes]:
+    async for rows in partitions:
+        yield b"".join(_feature(row) + b"\n" for row in rows)
+
+
+async def _encode_csv(partitions, columns) -> AsyncIterator[bytes]:
+    header_written = False
+    async for rows in partitions:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if not header_written and rows:
+            writer.writerow(rows[0]._fields[:-1] + ("wkt",))
+            header_written = True
+        writer.writerows(tuple(row) for row in rows)
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object whose contents are drained after each write"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _geoparquet_metadata() -> Dict[bytes, bytes]:
+    geo = {
+        "version": "1.0.0",
+        "primary_column": "geometry",
+        "columns": {"geometry": {"encoding": "WKB", "geometry_types": []}},
+    }
+    return {b"geo": orjson.dumps(geo)}
+
+
+def _arrow_type(column) -> pa.DataType:
+    """Arrow type of a selected column, from its SQL type"""
+    sql_type = column.type
+    if column.name == "geometry":
+        return pa.binary()
+    if isinstance(sql_type, Boolean):
+        return pa.bool_()
+    if isinstance(sql_type, Integer):
+        return pa.int64()
+    if isinstance(sql_type, Numeric):
+        if sql_type.asdecimal:
+            return pa.decimal128(sql_type.precision or 38, sql_type.scale or 9)
+        return pa.float64()
+    if isinstance(sql_type, DateTime):
+        return pa.timestamp("us", tz="UTC" if sql_type.timezone else None)
+    if isinstance(sql_type, Date):
+        return pa.date32()
+    return pa.string()
+
+
+def _arrow_schema(columns) -> pa.Schema:
+    """Declared up front: inferring it from the first partition types a column
+    that is NULL throughout that partition as null, and later partitions fail"""
+    schema = pa.schema([pa.field(column.name, _arrow_type(column)) for column in columns])
+    return schema.with_metadata(_geoparquet_metadata())
+
+
+async def _encode_parquet(partitions, columns) -> AsyncIterator[bytes]:
+    sink = _ChunkSink()
+    schema = _arrow_schema(columns)
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    async for rows in partitions:
+        if not rows:
+            continue
+        data = {name: [getattr(row, name) for row in rows] for name in schema.names}
+        data["geometry"] = [bytes(g) if g is not None else None for g in data["geometry"]]
+        writer.write_table(pa.table(data, schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+async def _encode_flatgeobuf(partitions, columns) -> AsyncIterator[bytes]:
+    """FlatGeobuf export, buffered on disk and written without a spatial index.
+
+    The writer needs a seekable file for its header, so records are appended
+    to a temporary file partition by partition and the first byte is only
+    sent once the whole result is written; memory stays flat, time to first
+    byte grows with the export. The packed R-tree index would need every
+    feature before the first record, so ``SPATIAL_INDEX="NO"``: readers scan
+    the file rather than doing bbox lookups against it.
+    """
+    fd, path = tempfile.mkstemp(suffix=".fgb")
+    os.close(fd)
+    os.unlink(path)
+    sink = None
+    try:
+        async for rows in partitions:
+            if not rows:
+                continue
+            if sink is None:
+                fields = [f for f in rows[0]._fields if f != "geometry"]
+                schema = {"geometry": "Unknown", "properties": {f: "str" for f in fields}}
+                sink = fiona.open(path, "w", driver="FlatGeobuf", crs="EPSG:4326",
+                                  schema=schema, SPATIAL_INDEX="NO")
+            records = [
+                {
+                    "geometry": shapely.geometry.mapping(shapely.from_wkb(bytes(row.geometry))),
+                    "properties": {f: None if getattr(row, f) is None else str(getattr(row, f))
+                                   for f in row._fields if f != "geometry"},
+                }
+                for row in rows if row.geometry is not None
+            ]
+            await run_in_threadpool(sink.writerecords, records)
+        if sink is None:
+            return
+        await run_in_threadpool(sink.close)
+        sink = None
+        with open(path, "rb") as f:
+            while chunk := await run_in_threadpool(f.read, FILE_CHUNK_SIZE):
+                yield chunk
+    finally:
+        if sink is not None:
+            sink.close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def filter_clauses(model, bbox: Optional[str], query_params) -> list:
+    """WHERE clauses for a `bbox=` filter and `prop.<key>=<value>` filters"""
+    clauses = []
+    if bbox:
+        clauses.append(spatial_queries.intersects_bbox(model.geometry, *spatial_queries.parse_bbox(bbox)))
+    filters = parse_property_filters(query_params)
+    if filters:
+        if "properties" not in model.__table__.columns:
+            raise ValueError(f"{model.__tablename__} has no properties to filter on")
+        clauses.extend(property_clauses(model.properties, filters))
+    return clauses
+
+
+class ExportFormat(NamedTuple):
+    media_type: str
+    extension: str
+    columns: Callable
+    encode: Callable
+
+
+EXPORT_FORMATS: Dict[str, ExportFormat] = {
+    "geojson": ExportFormat("application/geo+json", "geojson", _feature_columns, _encode_geojson),
+    "ndjson": ExportFormat("application/x-ndjson", "ndjson", _feature_columns, _encode_ndjson),
+    "csv": ExportFormat("text/csv", "csv", _flat_columns(func.ST_AsText), _encode_csv),
+    "parquet": ExportFormat("application/vnd.apache.parquet", "parquet",
+                            _flat_columns(func.ST_AsBinary), _encode_parquet),
+    "fgb": ExportFormat("application/flatgeobuf", "fgb",
+                        _flat_columns(func.ST_AsBinary), _encode_flatgeobuf),
+}
+
+
+async def stream_export(model, fmt: str, clauses: list) -> AsyncIterator[bytes]:
+    """Encode every row of `model` matching `clauses` in the requested format"""
+    export_format = EXPORT_FORMATS[fmt]
+    columns = export_format.columns(model)
+    stmt = (
+        select(*columns)
+        .where(*clauses)
+        .order_by(model.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    start = time.perf_counter()
+    total = 0
+
+    async def partitions(result):
+        nonlocal total
+        async for rows in result.partitions():
+            total += len(rows)
+            yield rows
+
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(stmt)
+        async for chunk in export_format.encode(partitions(result), columns):
+            yield chunk
+
+    elapsed = time.perf_counter() - start
+    EXPORT_ROWS.labels(table=model.__tablename__, format=fmt).inc(total)
+    EXPORT_DURATION.labels(table=model.__tablename__, format=fmt).observe(elapsed)
+    rate = total / elapsed if elapsed > 0 else 0.0
+    api_logger.info(f"Exported {total} {model.__tablename__} rows as {fmt} in {elapsed:.2f}s ({rate:,.0f} rows/sec)")
@@ -0,0 +1,153 @@
+"""Incrementally maintained feature statistics.
+
+Statement-level triggers with transition tables fold every INSERT, UPDATE,
+DELETE and TRUNCATE on the feature tables into the small `feature_stats`
+table, whatever code path issued the write (API CRUD, uploads, sync, ingestion
+scripts). The stats endpoints then read a handful of rows instead of running
+``count(*)`` over the feature tables.
+
+The triggers are installed by scripts/migrate_feature_stats.py, not at API
+startup: installing them takes locks on the feature tables. They are not free
+either. Every write statement also groups its rows and computes
+``ST_Area(geometry::geography)`` for each of them, then upserts one
+``feature_stats`` row per (type, source). Concurrent writers to the same
+source serialize on that row until they commit. Bulk loads should use few
+large statements, or partition swaps (utils.partitions), which bypass the
+triggers.
+"""
+from typing import Any, Dict
+
+from sqlalchemy import func, inspect, select, text
+from sqlalchemy.engine import Engine
+
+from models.feature_stats import FeatureStats
+from utils.logger import db_logger
+
+# table -> (feature_type expression, source expression) evaluated per row
+STATS_LAYERS = {
+    "geospatial_data": ("coalesce(data_type, 'unknown')", "coalesce(source, 'unknown')"),
+    "districts": ("'district'", "'districts'"),
+    "geo_features": ("coalesce(GeometryType(geometry), 'unknown')", "coalesce(source, 'unknown')"),
+}
+
+_AGGREGATE = """
+    SELECT '{layer}', {type_expr}, {source_expr}, {sign} count(*),
+           {sign} coalesce(sum(ST_Area(geometry::geography)), 0), now()
+    FROM {rows} GROUP BY 2, 3
+"""
+
+_UPSERT = """
+    INSERT INTO feature_stats AS s
+        (layer, feature_type, source, feature_count, total_area_m2, last_updated)
+    {aggregate}
+    ON CONFLICT (layer, feature_type, source) DO UPDATE
+    SET feature_count = s.feature_count + EXCLUDED.feature_count,
+        total_area_m2 = s.total_area_m2 + EXCLUDED.total_area_m2,
+        last_updated = EXCLUDED.last_updated;
+"""
+
+_FUNCTION = """
+CREATE OR REPLACE FUNCTION feature_stats_{layer}() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        DELETE FROM feature_stats WHERE layer = '{layer}';
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        {subtract}
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        {add}
+    END IF;
+    DELETE FROM feature_stats WHERE layer = '{layer}' AND feature_count <= 0;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+_TRIGGERS = [
+    ("ins", "AFTER INSERT", "REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT"),
+    ("upd", "AFTER UPDATE", "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT"),
+    ("del", "AFTER DELETE", "REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT"),
+    ("trunc", "AFTER TRUNCATE", "FOR EACH STATEMENT"),
+]
+
+
+def _upsert(layer: str, rows: str, sign: str) -> str:
+    type_expr, source_expr = STATS_LAYERS[layer]
+    aggregate = _AGGREGATE.format(layer=layer, type_expr=type_expr, source_expr=source_expr,
+                                  sign=sign, rows=rows)
+    return _UPSERT.format(aggregate=aggregate)
+
+
+def rebuild_feature_stats(conn, layer: str) -> None:
+    """Recompute one layer's stats from scratch (used to backfill)"""
+    conn.execute(text(f'LOCK TABLE "{layer}" IN SHARE MODE'))
+    conn.execute(text("DELETE FROM feature_stats WHERE layer = :layer"), {"layer": layer})
+    conn.execute(text(_upsert(layer, f'"{layer}"', "")))
+
+
+def rebuild_source_stats(conn, layer: str, source: str) -> None:
+    """Recompute the stats of one source of a layer, e.g. after a partition swap"""
+    if not conn.execute(text("SELECT to_regclass('feature_stats') IS NOT NULL")).scalar():
+        return
+    params = {"layer": layer, "source": source}
+    conn.execute(text("DELETE FROM feature_stats WHERE layer = :layer AND source = :source"), params)
+    conn.execute(text(_upsert(layer, f'(SELECT * FROM "{layer}" WHERE source = :source) AS rows', "")), params)
+
+
+def ensure_feature_stats(engine: Engine) -> None:
+    """Create the stats table and triggers; backfill layers with no stats yet.
+
+    Run from a migration (scripts/migrate_feature_stats.py): it replaces the
+    triggers and locks each table that is backfilled.
+    """
+    FeatureStats.__table__.create(bind=engine, checkfirst=True)
+    existing_tables = set(inspect(engine).get_table_names())
+    with engine.begin() as conn:
+        if "geospatial_data" in existing_tables:
+            conn.execute(text("ALTER TABLE geospatial_data ADD COLUMN IF NOT EXISTS source VARCHAR"))
+        for layer in STATS_LAYERS:
+            if layer not in existing_tables:
+                continue
+            conn.execute(text(_FUNCTION.format(
+                layer=layer,
+                subtract=_upsert(layer, "old_rows", "-"),
+                add=_upsert(layer, "new_rows", ""),
+            )))
+            for suffix, timing, referencing in _TRIGGERS:
+                name = f"feature_stats_{layer}_{suffix}"
+                conn.execute(text(f'DROP TRIGGER IF EXISTS {name} ON "{layer}"'))
+                conn.execute(text(
+                    f'CREATE TRIGGER {name} {timing} ON "{layer}" {referencing} '
+                    f'EXECUTE FUNCTION feature_stats_{layer}()'
+                ))
+            has_stats = conn.execute(
+                select(func.count()).select_from(FeatureStats).where(FeatureStats.layer == layer)
+            ).scalar()
+            if not has_stats:
+                rebuild_feature_stats(conn, layer)
+    db_logger.info("Feature stats triggers ensured")
+
+
+def summarize(rows) -> Dict[str, Any]:
+    """Totals and per-type/per-source breakdowns from FeatureStats rows"""
+    by_type: Dict[str, int] = {}
+    by_source: Dict[str, int] = {}
+    total = 0
+    total_area = 0.0
+    last_updated = None
+    for row in rows:
+        total += row.feature_count
+        total_area += row.total_area_m2
+        by_type[row.feature_type] = by_type.get(row.feature_type, 0) + row.feature_count
+        by_source[row.source] = by_source.get(row.source, 0) + row.feature_count
+        if row.last_updated and (last_updated is None or row.last_updated > last_updated):
+            last_updated = row.last_updated
+    return {
+        "total_features": total,
+        "total_area_m2": total_area,
+        "by_type": by_type,
+        "by_source": by_source,
+        "last_updated": last_updated,
+    }
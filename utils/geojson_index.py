@@ -0,0 +1,204 @@
+"""Parallel parsing of large GeoJSON FeatureCollections on local disk.
+
+The file is memory-mapped and scanned once for the byte range of every
+feature in the top-level ``features`` array. The scan only stops at braces
+and string literals (a regex over the mapped buffer), so coordinate arrays
+are skipped at C speed. The offsets are cached next to the file as
+``<name>.fidx.npz`` and reused while the file's size and mtime match.
+
+Worker processes map the same file themselves and parse disjoint ranges of
+features; only the offsets travel to the workers, never the buffer.
+:func:`iter_feature_batches` has the workers return columnar
+:class:`~utils.feature_batch.FeatureBatch` objects instead of dicts.
+
+Used by the database loaders (scripts/ingest_karnataka.py). The file pipeline
+(scripts/automated_pipeline.py) reads its source with pyogrio instead: its
+validation report needs every feature in one GeoDataFrame, including missing
+geometries and GeometryCollections, which the batches leave out.
+"""
+import mmap
+import os
+import re
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import orjson
+
+from config.metrics_config import register_metrics_worker
+from utils.feature_batch import FeatureBatch, build_batches
+
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(os.cpu_count() or 1)))
+PARSE_CHUNK_SIZE = int(os.getenv("PARSE_CHUNK_SIZE", "2000"))   # features per worker task
+
+_STRING = rb'"[^"\\]*(?:\\.[^"\\]*)*"'
+# Every structural token, used until the features array is found
+_TOKENS = re.compile(_STRING + rb'|[{}\[\]]')
+# Inside features only object nesting matters
+_OBJECT_TOKENS = re.compile(_STRING + rb'|[{}]')
+_SEPARATOR = re.compile(rb'\s*([,\]])')
+_FEATURES_KEY = b'"features"'
+
+
+def index_path(path: str) -> str:
+    return f"{path}.fidx.npz"
+
+
+def _find_features_array(buf) -> int:
+    """Offset just past the '[' of the top-level "features" array"""
+    depth = 0
+    last_key = None
+    for match in _TOKENS.finditer(buf):
+        token = match.group()
+        if token[:1] == b'"':
+            if depth == 1:
+                last_key = token
+            continue
+        if token in (b"{", b"["):
+            if depth == 1 and token == b"[" and last_key == _FEATURES_KEY:
+                return match.end()
+            depth += 1
+        else:
+            depth -= 1
+    raise ValueError("No features array found")
+
+
+def scan_feature_offsets(buf) -> np.ndarray:
+    """(n, 2) array of [start, end) byte offsets of each feature object"""
+    pos = _find_features_array(buf)
+    starts, ends = [], []
+    size = len(buf)
+    while True:
+        # Next feature object, or the end of an empty array
+        while pos < size and buf[pos:pos + 1].isspace():
+            pos += 1
+        if buf[pos:pos + 1] == b"]":
+            break
+        if buf[pos:pos + 1] != b"{":
+            raise ValueError(f"Expected a feature object at byte {pos}")
+        depth = 0
+        for match in _OBJECT_TOKENS.finditer(buf, pos):
+            token = match.group()
+            if token == b"{":
+                depth += 1
+            elif token == b"}":
+                depth -= 1
+                if depth == 0:
+                    starts.append(pos)
+                    ends.append(match.end())
+                    pos = match.end()
+                    break
+        else:
+            raise ValueError("Truncated feature object")
+        separator = _SEPARATOR.match(buf, pos)
+        if separator is None:
+            raise ValueError(f"Expected ',' or ']' after feature at byte {pos}")
+        pos = separator.end()
+        if separator.group(1) == b"]":
+            break
+    return np.column_stack([np.asarray(starts, dtype=np.int64), np.asarray(ends, dtype=np.int64)]) \
+        if starts else np.empty((0, 2), dtype=np.int64)
+
+
+def load_feature_index(path: str) -> np.ndarray:
+    """Feature offsets for `path`, from the sidecar cache when it is current"""
+    stat = os.stat(path)
+    cache = index_path(path)
+    try:
+        with np.load(cache) as cached:
+            if int(cached["size"]) == stat.st_size and int(cached["mtime_ns"]) == stat.st_mtime_ns:
+                return cached["offsets"]
+    except (OSError, KeyError, ValueError):
+        pass
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        offsets = scan_feature_offsets(buf)
+    try:
+        tmp = f"{cache}.{os.getpid()}.tmp.npz"
+        np.savez(tmp, offsets=offsets, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        os.replace(tmp, cache)
+    except OSError:
+        pass  # read-only location; the index is just rebuilt next time
+    return offsets
+
+
+# Per-worker state set up by _init_worker
+_worker_buf = None
+_worker_func: Optional[Callable] = None
+
+
+def _init_worker(path: str, func: Optional[Callable]):
+    global _worker_buf, _worker_func
+    register_metrics_worker()
+    f = open(path, "rb")
+    _worker_buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    _worker_func = func
+
+
+def _parse_range(buf, func: Optional[Callable], offsets: np.ndarray) -> list:
+    results = []
+    for start, end in offsets:
+        feature = orjson.loads(buf[start:end])
+        results.append(func(feature) if func else feature)
+    return results
+
+
+def _batch_range(buf, func: Optional[Callable], offsets: np.ndarray) -> Tuple[List[FeatureBatch], int]:
+    return build_batches(orjson.loads(buf[start:end]) for start, end in offsets)
+
+
+def _in_worker(task: Callable, offsets: np.ndarray):
+    return task(_worker_buf, _worker_func, offsets)
+
+
+def _run_chunks(path: str, task: Callable, func: Optional[Callable], workers: int, chunk_size: int) -> Iterator:
+    offsets = load_feature_index(path)
+    chunks = [offsets[i:i + chunk_size] for i in range(0, len(offsets), chunk_size)]
+    if workers <= 1 or len(chunks) <= 1:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            for chunk in chunks:
+                yield task(buf, func, chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(path, func)) as pool:
+        # Bounded number of chunks in flight keeps memory flat on huge files
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_in_worker, task, chunk))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def map_features(
+    path: str,
+    func: Optional[Callable[[dict], Any]] = None,
+    workers: int = PARSE_WORKERS,
+    chunk_size: int = PARSE_CHUNK_SIZE,
+) -> Iterator[list]:
+    """Yield lists of ``func(feature)`` (or parsed features), in file order.
+
+    `func` runs in the worker processes and must be a module-level function;
+    returning compact values (e.g. WKB and properties) keeps the transfer
+    back to the parent cheap.
+    """
+    return _run_chunks(path, _parse_range, func, workers, chunk_size)
+
+
+def iter_feature_batches(
+    path: str,
+    workers: int = PARSE_WORKERS,
+    chunk_size: int = PARSE_CHUNK_SIZE,
+) -> Iterator[Tuple[List[FeatureBatch], Counter]]:
+    """Yield ``(batches, skipped)`` per chunk of features, in file order.
+
+    Each chunk gives one batch per geometry family present; `skipped` counts
+    features without a usable geometry by reason (see :func:`build_batches`).
+    """
+    return _run_chunks(path, _batch_range, None, workers, chunk_size)
+
+
+def feature_count(path: str) -> int:
+    return len(load_feature_index(path))
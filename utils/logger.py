@@ -3,9 +3,13 @@ import sys
 from pathlib import Path
 from logging.handlers import RotatingFileHandler
 import json
-from datetime import datetime
+import time
 from typing import Any
 
+import orjson
+
+from config.logging_config import apply_log_filters, queue_handler
+
 class CustomJSONFormatter(logging.Formatter):
     def format(self, record: logging.LogRecord) -> str:
         log_obj = {
@@ -19,16 +23,36 @@ class CustomJSONFormatter(logging.Formatter):
         
         if hasattr(record, 'request_id'):
             log_obj['request_id'] = record.request_id
+
+        # Structured fields passed as logger.info(..., extra={"fields": {...}})
+        if hasattr(record, 'fields'):
+            log_obj.update(record.fields)
+
+        if hasattr(record, 'dropped'):
+            log_obj['dropped_before'] = record.dropped
+
+        if hasattr(record, 'queue_dropped'):
+            log_obj['queue_dropped_before'] = record.queue_dropped
             
         if record.exc_info:
             log_obj['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            log_obj['exception'] = record.exc_text
             
-        return json.dumps(log_obj)
+        return orjson.dumps(log_obj, default=str).decode()
 
 def setup_logger(name: str, log_file: str = None, level: int = logging.INFO) -> logging.Logger:
-    """Set up logger with both file and console handlers"""
+    """Set up logger with both file and console handlers.
+
+    The handlers run on the shared background writer thread, so the calling
+    code only pays for enqueueing the record.
+    """
     logger = logging.getLogger(name)
     logger.setLevel(level)
+    if logger.handlers:
+        return logger
+
+    handlers = []
     
     # Create logs directory if it doesn't exist
     if log_file:
@@ -43,12 +67,15 @@ def setup_logger(name: str, log_file: str = None, level: int = logging.INFO) ->
             encoding='utf-8'
         )
         file_handler.setFormatter(CustomJSONFormatter())
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
     
     # Console handler
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(CustomJSONFormatter())
-    logger.addHandler(console_handler)
+    handlers.append(console_handler)
+
+    logger.addHandler(queue_handler(name, handlers))
+    apply_log_filters(logger)
     
     return logger
 
@@ -57,8 +84,13 @@ api_logger = setup_logger('api', 'api.log')
 db_logger = setup_logger('database', 'database.log')
 spatial_logger = setup_logger('spatial', 'spatial.log')
 
+# One line per request; propagates to the api handlers. Sample it with e.g.
+# LOG_SAMPLING="api.access=0.1" (4xx/5xx responses are always kept).
+access_logger = logging.getLogger('api.access')
+apply_log_filters(access_logger)
+
 class LoggerMiddleware:
-    """Middleware to log all API requests and responses"""
+    """Middleware that logs one line per API request"""
     
     def __init__(self, app):
         self.app = app
@@ -67,25 +99,13 @@ class LoggerMiddleware:
         if scope["type"] != "http":
             return await self.app(scope, receive, send)
             
-        start_time = datetime.now()
-        
-        # Log request
-        request = {
-            "method": scope.get("method", ""),
-            "path": scope.get("path", ""),
-            "query_string": scope.get("query_string", b"").decode(),
-        }
-        
-        api_logger.info(f"Incoming request: {json.dumps(request)}")
+        start_time = time.perf_counter()
+        status_code = 500
         
         async def wrapped_send(message):
+            nonlocal status_code
             if message["type"] == "http.response.start":
-                # Log response
-                response_status = message["status"]
-                api_logger.info(
-                    f"Response status: {response_status}, "
-                    f"Request duration: {(datetime.now() - start_time).total_seconds()}s"
-                )
+                status_code = message["status"]
             await send(message)
             
         try:
@@ -93,6 +113,16 @@ class LoggerMiddleware:
         except Exception as e:
             api_logger.error(f"Error processing request: {str(e)}", exc_info=True)
             raise
+        finally:
+            level = logging.INFO if status_code < 400 else logging.WARNING
+            if access_logger.isEnabledFor(level):
+                access_logger.log(level, "request", extra={"fields": {
+                    "method": scope.get("method", ""),
+                    "path": scope.get("path", ""),
+                    "query_string": scope.get("query_string", b"").decode(),
+                    "status": status_code,
+                    "duration_ms": round((time.perf_counter() - start_time) * 1000, 3),
+                }})
 
 def log_error(error: Exception, context: dict = None) -> None:
     """Centralized error logging function"""
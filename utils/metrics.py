@@ -1,14 +1,32 @@
+"""Ingestion metrics.
+
+Importing this module only defines the metrics. The scrape server and the
+system-metrics thread are started explicitly by the scripts that want them
+(``start_metrics_server``, ``get_performance_monitor().start_monitoring()``).
+With ``PROMETHEUS_MULTIPROC_DIR`` set, values from every process (gunicorn
+workers, ingestion process pools) are aggregated at scrape time.
+"""
+import os
 import time
 import psutil
 from prometheus_client import Counter, Gauge, Histogram, start_http_server
 import logging
+from collections import deque
 from functools import wraps
-from typing import Dict, Optional
+from typing import Any, Dict, List, NamedTuple, Optional
 import threading
 from datetime import datetime
 
+from utils.service_metrics import metrics_registry
+
 logger = logging.getLogger(__name__)
 
+# Port of the standalone scrape server used by scripts (the API serves /metrics itself)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+# Resource recorder resolution and ring buffer size (1 hour at 1s by default)
+RESOURCE_SAMPLE_INTERVAL = float(os.getenv("RESOURCE_SAMPLE_INTERVAL", "1.0"))
+RESOURCE_BUFFER_SIZE = int(os.getenv("RESOURCE_BUFFER_SIZE", "3600"))
+
 # Prometheus metrics
 FEATURE_COUNTER = Counter('processed_features_total', 'Total number of features processed')
 FAILED_FEATURES = Counter('failed_features_total', 'Total number of features that failed processing')
@@ -16,27 +34,49 @@ PROCESSING_TIME = Histogram('feature_processing_seconds', 'Time spent processing
                           buckets=(0.1, 0.5, 1.0, 2.0, 5.0, 10.0, float('inf')))
 CHUNK_PROCESSING_TIME = Histogram('chunk_processing_seconds', 'Time spent processing chunks',
                                 buckets=(1.0, 5.0, 10.0, 30.0, 60.0, float('inf')))
-MEMORY_USAGE = Gauge('memory_usage_bytes', 'Current memory usage')
-CPU_USAGE = Gauge('cpu_usage_percent', 'Current CPU usage')
-ACTIVE_WORKERS = Gauge('active_workers', 'Number of active worker threads')
+STAGE_DURATION = Histogram('ingestion_stage_seconds', 'Time spent in each ingestion stage (see utils.tracing)',
+                           ['stage'],
+                           buckets=(0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+                                    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                                    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float('inf')))
+MEMORY_USAGE = Gauge('memory_usage_bytes', 'Current memory usage', multiprocess_mode='livesum')
+CPU_USAGE = Gauge('cpu_usage_percent', 'Current CPU usage', multiprocess_mode='livesum')
+ACTIVE_WORKERS = Gauge('active_workers', 'Number of active worker threads', multiprocess_mode='livesum')
 DB_OPERATIONS = Counter('db_operations_total', 'Total number of database operations', ['operation'])
-DOWNLOAD_SPEED = Gauge('download_speed_bytes', 'Current download speed in bytes per second')
-PROCESSING_SPEED = Gauge('processing_speed_features', 'Features processed per second')
+DOWNLOAD_SPEED = Gauge('download_speed_bytes', 'Current download speed in bytes per second',
+                       multiprocess_mode='livesum')
+PROCESSING_SPEED = Gauge('processing_speed_features', 'Features processed per second',
+                         multiprocess_mode='livesum')
+LAST_RUN_THROUGHPUT = Gauge('pipeline_last_run_features_per_second', 'Throughput of the last completed run',
+                            ['run_type'], multiprocess_mode='mostrecent')
+LAST_RUN_PEAK_RSS = Gauge('pipeline_last_run_peak_rss_bytes', 'Peak RSS of the last completed run',
+                          ['run_type'], multiprocess_mode='mostrecent')
+LAST_RUN_DURATION = Gauge('pipeline_last_run_duration_seconds', 'Wall time of the last completed run',
+                          ['run_type'], multiprocess_mode='mostrecent')
+
+_server_lock = threading.Lock()
+_server_port: Optional[int] = None
+
+def start_metrics_server(port: Optional[int] = None) -> Optional[int]:
+    """Start the Prometheus scrape server once per process; returns its port"""
+    global _server_port
+    with _server_lock:
+        if _server_port is None:
+            port = port or METRICS_PORT
+            try:
+                start_http_server(port, registry=metrics_registry())
+                _server_port = port
+                logger.info(f"Metrics server started on port {port}")
+            except Exception as e:
+                logger.error(f"Failed to start metrics server: {e}")
+        return _server_port
 
 class MetricsCollector:
-    def __init__(self, metrics_port: int = 8000):
+    def __init__(self):
         self.start_time = time.time()
         self.features_processed = 0
         self.features_failed = 0
-        self.metrics_port = metrics_port
         self._lock = threading.Lock()
-        
-        # Start Prometheus metrics server
-        try:
-            start_http_server(metrics_port)
-            logger.info(f"Metrics server started on port {metrics_port}")
-        except Exception as e:
-            logger.error(f"Failed to start metrics server: {e}")
     
     def collect_system_metrics(self):
         """Collect system metrics"""
@@ -101,42 +141,80 @@ def with_metrics(name: Optional[str] = None):
         return wrapper
     return decorator
 
+class ResourceSample(NamedTuple):
+    timestamp: float
+    cpu_percent: float
+    rss_bytes: int
+    read_bytes: Optional[int]
+    write_bytes: Optional[int]
+    threads: int
+
 class PerformanceMonitor:
-    def __init__(self, interval: float = 1.0):
+    """Records CPU, RSS, I/O bytes and thread count into a ring buffer.
+
+    Only the last ``capacity`` samples are kept, but the run-wide peak RSS,
+    average CPU and I/O totals in :meth:`summary` cover the whole run.
+    """
+
+    def __init__(self, interval: float = RESOURCE_SAMPLE_INTERVAL, capacity: int = RESOURCE_BUFFER_SIZE):
         self.interval = interval
+        self._samples = deque(maxlen=capacity)
+        self._process = psutil.Process()
         self._stop_event = threading.Event()
         self._monitor_thread = None
-    
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._samples.clear()
+        self._peak_rss = 0
+        self._cpu_total = 0.0
+        self._sample_count = 0
+        self._max_threads = 0
+        self._io_start = self._io_counters()
+        self._started_at = time.time()
+
+    def _io_counters(self):
+        try:
+            return self._process.io_counters()
+        except (AttributeError, psutil.Error):  # not available on every platform
+            return None
+
+    def sample(self) -> ResourceSample:
+        """Take one sample and add it to the buffer"""
+        with self._process.oneshot():
+            cpu_percent = self._process.cpu_percent()
+            rss = self._process.memory_info().rss
+            threads = self._process.num_threads()
+            io = self._io_counters()
+        entry = ResourceSample(
+            time.time(), cpu_percent, rss,
+            io.read_bytes if io else None, io.write_bytes if io else None, threads
+        )
+        with self._lock:
+            self._samples.append(entry)
+            self._peak_rss = max(self._peak_rss, rss)
+            self._cpu_total += cpu_percent
+            self._sample_count += 1
+            self._max_threads = max(self._max_threads, threads)
+        CPU_USAGE.set(cpu_percent)
+        MEMORY_USAGE.set(rss)
+        return entry
+
     def start(self):
-        """Start performance monitoring"""
-        def monitor():
-            while not self._stop_event.is_set():
-                try:
-                    # Collect system metrics
-                    process = psutil.Process()
-                    cpu_percent = process.cpu_percent()
-                    memory_info = process.memory_info()
-                    
-                    # Update Prometheus metrics
-                    CPU_USAGE.set(cpu_percent)
-                    MEMORY_USAGE.set(memory_info.rss)
-                    
-                    # Log performance data
-                    logger.info(
-                        f"Performance Metrics - CPU: {cpu_percent}%, "
-                        f"Memory: {memory_info.rss / 1024 / 1024:.2f}MB, "
-                        f"Features Processed: {FEATURE_COUNTER._value.get()}, "
-                        f"Failed Features: {FAILED_FEATURES._value.get()}"
-                    )
-                    
-                except Exception as e:
-                    logger.error(f"Error in performance monitoring: {e}")
-                
-                self._stop_event.wait(self.interval)
-    
+        """Sampling loop (runs on the monitor thread)"""
+        self._process.cpu_percent()  # first call only primes the counter
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"Error in performance monitoring: {e}")
+
     def start_monitoring(self):
         """Start the monitoring thread"""
-        self._monitor_thread = threading.Thread(target=self.start, daemon=True)
+        self._stop_event.clear()
+        self._reset()
+        self._monitor_thread = threading.Thread(target=self.start, name="performance-monitor", daemon=True)
         self._monitor_thread.start()
     
     def stop_monitoring(self):
@@ -144,7 +222,40 @@ class PerformanceMonitor:
         self._stop_event.set()
         if self._monitor_thread:
             self._monitor_thread.join()
+            self._monitor_thread = None
+
+    def samples(self) -> List[ResourceSample]:
+        with self._lock:
+            return list(self._samples)
+
+    def summary(self) -> Dict[str, Any]:
+        """Run-wide resource usage since start_monitoring()"""
+        io_end = self._io_counters()
+        with self._lock:
+            return {
+                "peak_rss_bytes": self._peak_rss,
+                "avg_cpu_percent": self._cpu_total / self._sample_count if self._sample_count else 0.0,
+                "max_threads": self._max_threads,
+                "io_read_bytes": io_end.read_bytes - self._io_start.read_bytes if io_end and self._io_start else None,
+                "io_write_bytes": io_end.write_bytes - self._io_start.write_bytes if io_end and self._io_start else None,
+                "samples": self._sample_count,
+            }
+
+_metrics_collector: Optional[MetricsCollector] = None
+_performance_monitor: Optional[PerformanceMonitor] = None
+
+def get_metrics_collector() -> MetricsCollector:
+    """Process-wide collector, created on first use"""
+    global _metrics_collector
+    with _server_lock:
+        if _metrics_collector is None:
+            _metrics_collector = MetricsCollector()
+        return _metrics_collector
 
-# Initialize global metrics collector
-metrics_collector = MetricsCollector()
-performance_monitor = PerformanceMonitor()
+def get_performance_monitor() -> PerformanceMonitor:
+    """Process-wide system-metrics monitor, created on first use (not started)"""
+    global _performance_monitor
+    with _server_lock:
+        if _performance_monitor is None:
+            _performance_monitor = PerformanceMonitor()
+        return _performance_monitor
@@ -0,0 +1,157 @@
+"""Layer replacement by partition swap on list-partitioned feature tables.
+
+``geo_features`` is partitioned by ``LIST (source)``: every layer lives in its
+own partition, and rows without a layer of their own go to the ``DEFAULT``
+partition. Replacing a layer loads a fresh, standalone table and swaps it in:
+
+    with replace_partition(engine, GeoFeature.__table__, "karnataka_tile") as (conn, staging):
+        conn.execute(insert(staging), rows)
+
+Once the rows are loaded, the staging table gets a copy of every index and
+unique constraint of the parent, still before the parent is locked. Together
+with a ``CHECK (source = ...)`` constraint this leaves ATTACH nothing to build
+or validate: it only links the existing indexes to the parent's. DETACH and
+ATTACH hold ACCESS EXCLUSIVE on the parent until commit; in that window only
+catalog changes, the cleanup of the layer's rows in the ``DEFAULT`` partition
+and PostgreSQL's check of that partition run, so keep ``DEFAULT`` small.
+Readers see the old layer until commit and the new one afterwards, and no
+dead tuples are left behind, so no vacuum is needed.
+"""
+import hashlib
+import re
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+from sqlalchemy import MetaData, Table, literal, text
+from sqlalchemy.engine import Connection, Engine
+
+from utils.feature_stats import rebuild_source_stats
+from utils.logger import db_logger
+
+PARTITION_KEY = "source"
+DEFAULT_SUFFIX = "default"
+_MAX_IDENTIFIER = 63
+
+
+def partition_name(table: str, key: str) -> str:
+    """Stable, valid identifier for the partition holding `key`"""
+    slug = re.sub(r"[^a-z0-9]+", "_", key.lower()).strip("_") or "layer"
+    digest = hashlib.sha1(key.encode()).hexdigest()[:8]
+    prefix = f"{table}_"
+    slug = slug[:_MAX_IDENTIFIER - len(prefix) - len(digest) - 1]
+    return f"{prefix}{slug}_{digest}"
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_{DEFAULT_SUFFIX}"
+
+
+def _quote(conn: Connection, name: str) -> str:
+    return conn.dialect.identifier_preparer.quote(name)
+
+
+def _literal(conn: Connection, value: str) -> str:
+    return str(literal(value).compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+
+
+def _exists(conn: Connection, name: str) -> bool:
+    return conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar()
+
+
+def is_partitioned(conn: Connection, table: str) -> bool:
+    return bool(conn.execute(
+        text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:table)"), {"table": table}
+    ).scalar())
+
+
+def ensure_default_partition(conn: Connection, table: str) -> None:
+    """Catch-all partition for rows whose source has no partition of its own"""
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {_quote(conn, default_partition_name(table))} "
+        f"PARTITION OF {_quote(conn, table)} DEFAULT"
+    ))
+
+
+def _copy_indexes(conn: Connection, table: str, staging: str) -> None:
+    """Create the indexes and unique constraints of `table` on `staging`.
+
+    ATTACH PARTITION adopts an equivalent index (and constraint) instead of
+    building one; names are left for PostgreSQL to choose.
+    """
+    constraints = conn.execute(text(
+        "SELECT pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = to_regclass(:table) AND contype IN ('p', 'u')"
+    ), {"table": table}).scalars().all()
+    for definition in constraints:
+        conn.execute(text(f"ALTER TABLE {_quote(conn, staging)} ADD {definition}"))
+    indexes = conn.execute(text(
+        "SELECT i.indisunique, pg_get_indexdef(i.indexrelid) FROM pg_index i "
+        "WHERE i.indrelid = to_regclass(:table) "
+        "AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)"
+    ), {"table": table}).all()
+    for unique, definition in indexes:
+        method = definition[definition.index(" USING "):]
+        conn.execute(text(
+            f"CREATE {'UNIQUE ' if unique else ''}INDEX ON {_quote(conn, staging)}{method}"
+        ))
+
+
+@contextmanager
+def replace_partition(engine: Engine, table: Table, key: str,
+                      keep_old: bool = False) -> Iterator[Tuple[Connection, Table]]:
+    """Load the new contents of layer `key` into a staging table, then swap it in.
+
+    Yields the connection and a :class:`Table` for the staging table; insert
+    the layer's rows through them. On error the staging table is discarded
+    and the current partition is left untouched. With `keep_old` the previous
+    partition is kept, detached, as ``<partition>_old_<timestamp>``.
+    """
+    name = table.name
+    target = partition_name(name, key)
+    staging_name = f"{target[:_MAX_IDENTIFIER - 8]}_staging"
+    staging = table.to_metadata(MetaData(), name=staging_name)
+    start = time.perf_counter()
+
+    with engine.begin() as conn:
+        def q(identifier: str) -> str:
+            return _quote(conn, identifier)
+
+        value = _literal(conn, key)
+        conn.execute(text(f"DROP TABLE IF EXISTS {q(staging_name)}"))
+        conn.execute(text(
+            f"CREATE TABLE {q(staging_name)} (LIKE {q(name)} INCLUDING DEFAULTS INCLUDING GENERATED)"
+        ))
+        conn.execute(text(
+            f"ALTER TABLE {q(staging_name)} ALTER COLUMN {PARTITION_KEY} SET DEFAULT {value}, "
+            f"ADD CONSTRAINT {q(staging_name + '_key')} "
+            f"CHECK ({PARTITION_KEY} IS NOT NULL AND {PARTITION_KEY} = {value})"
+        ))
+
+        yield conn, staging
+        _copy_indexes(conn, name, staging_name)
+        loaded = time.perf_counter()
+
+        # Swap: DETACH/ATTACH lock the parent from here to commit
+        old: Optional[str] = None
+        if _exists(conn, target):
+            conn.execute(text(f"ALTER TABLE {q(name)} DETACH PARTITION {q(target)}"))
+            old = f"{target[:_MAX_IDENTIFIER - 20]}_old_{int(time.time())}"
+            conn.execute(text(f"ALTER TABLE {q(target)} RENAME TO {q(old)}"))
+        default = default_partition_name(name)
+        if _exists(conn, default):
+            # Rows of this layer loaded before it had its own partition
+            conn.execute(text(f"DELETE FROM {q(default)} WHERE {PARTITION_KEY} = {value}"))
+        conn.execute(text(f"ALTER TABLE {q(staging_name)} RENAME TO {q(target)}"))
+        conn.execute(text(f"ALTER TABLE {q(name)} ATTACH PARTITION {q(target)} FOR VALUES IN ({value})"))
+        conn.execute(text(f"ALTER TABLE {q(target)} DROP CONSTRAINT {q(staging_name + '_key')}"))
+        if old and not keep_old:
+            conn.execute(text(f"DROP TABLE {q(old)}"))
+        # ATTACH/DETACH bypass the stats triggers
+        rebuild_source_stats(conn, name, key)
+
+    db_logger.info(
+        f"Replaced partition {target} of {name} for {key!r}: "
+        f"load {loaded - start:.2f}s, swap {time.perf_counter() - loaded:.2f}s"
+        + (f", previous kept as {old}" if old and keep_old else "")
+    )
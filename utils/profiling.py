@@ -0,0 +1,274 @@
+"""Opt-in profiling for ingestion runs and API requests.
+
+Ingestion: enable with ``PROFILE_INGESTION=1`` (or the scripts' ``--profile``
+flag). A sampling CPU profiler runs for the whole run and tags every sample
+with the current stage; tracemalloc records each stage's growth and peak,
+plus one snapshot of live allocations when the stage ends. Artifacts are
+written to ``logs/profiles/<run>_<timestamp>/``:
+
+* ``cpu.collapsed`` - folded stacks (``flamegraph.pl``, speedscope)
+* ``memory_<stage>.txt`` - growth, peak and top live allocations for the stage
+
+API: ``ProfilingMiddleware`` samples a ``PROFILE_REQUEST_FRACTION`` of
+requests and keeps the ``PROFILE_KEEP`` slowest profiles in memory for the
+``/debug/profiles`` endpoints. Those endpoints, and profiling on demand via
+the ``PROFILE_HEADER`` header, exist only with ``DEBUG_ENDPOINTS=1`` and a
+``DEBUG_TOKEN``: the endpoints require ``Authorization: Bearer <token>``
+and the header must carry the token as its value.
+"""
+import heapq
+import hmac
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from config.logging_config import LOGS_DIR
+
+PROFILE_INGESTION = os.getenv("PROFILE_INGESTION", "").lower() in ("1", "true", "yes")
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))   # seconds
+PROFILE_REQUEST_FRACTION = float(os.getenv("PROFILE_REQUEST_FRACTION", "0"))
+PROFILE_HEADER = os.getenv("PROFILE_HEADER", "")          # e.g. "X-Debug-Profile"
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "20"))
+DEBUG_TOKEN = os.getenv("DEBUG_TOKEN", "")
+DEBUG_ENDPOINTS = os.getenv("DEBUG_ENDPOINTS", "").lower() in ("1", "true", "yes") and bool(DEBUG_TOKEN)
+PROFILES_DIR = os.path.join(LOGS_DIR, "profiles")
+
+# Leaf frames in these files mean the thread is idle, not consuming CPU
+_IDLE_FILES = ("threading.py", "selectors.py", "queue.py", "base_events.py")
+# Threadpool that sync endpoints and dependencies run on (anyio's worker name)
+_THREADPOOL_NAMES = ("AnyIO worker thread",)
+
+
+class StackSampler:
+    """Samples the Python stacks of running threads on a background thread.
+
+    Only threads in `thread_ids` or named in `thread_names` are sampled when
+    either is given; otherwise every thread is.
+    """
+
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL, thread_ids: Optional[set] = None,
+                 thread_names: Tuple[str, ...] = ()):
+        self.interval = interval
+        self.thread_ids = thread_ids
+        self.thread_names = thread_names
+        self.samples: Counter = Counter()
+        self.stage: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "StackSampler":
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _sampled_ids(self) -> Optional[set]:
+        if not self.thread_ids and not self.thread_names:
+            return None
+        ids = set(self.thread_ids or ())
+        if self.thread_names:
+            ids.update(t.ident for t in threading.enumerate() if t.name in self.thread_names)
+        return ids
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            sampled = self._sampled_ids()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or (sampled is not None and thread_id not in sampled):
+                    continue
+                if frame.f_code.co_filename.endswith(_IDLE_FILES):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                if self.stage:
+                    stack.append(f"stage:{self.stage}")
+                self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        """Samples in folded-stack format, one ``stack count`` line per stack"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+class RunProfiler:
+    """CPU samples and per-stage tracemalloc figures for one ingestion run"""
+
+    def __init__(self, run_name: str, output_dir: Optional[str] = None):
+        self.output_dir = output_dir or os.path.join(
+            PROFILES_DIR, f"{run_name}_{datetime.now():%Y%m%d_%H%M%S}"
+        )
+        self.sampler = StackSampler()
+
+    def start(self) -> "RunProfiler":
+        os.makedirs(self.output_dir, exist_ok=True)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+        self.sampler.start()
+        return self
+
+    @contextmanager
+    def stage(self, name: str):
+        previous = self.sampler.stage
+        self.sampler.stage = name
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            after, peak = tracemalloc.get_traced_memory()
+            # One snapshot per stage: snapshots walk every live allocation
+            top = tracemalloc.take_snapshot().statistics("lineno")[:25]
+            self.sampler.stage = previous
+            self._write_memory(name, elapsed, after - before, peak, top)
+
+    def _write_memory(self, stage: str, elapsed: float, growth: int, peak: int, top) -> None:
+        path = os.path.join(self.output_dir, f"memory_{stage}.txt")
+        with open(path, "w") as f:
+            f.write(f"stage: {stage}\nduration_seconds: {elapsed:.3f}\n"
+                    f"traced_growth_bytes: {growth}\npeak_traced_bytes: {peak}\n\n"
+                    f"top live allocations at stage end:\n")
+            for stat in top:
+                f.write(f"{stat}\n")
+
+    def stop(self) -> str:
+        """Stop sampling, write the CPU profile and return the artifact directory"""
+        self.sampler.stop()
+        tracemalloc.stop()
+        with open(os.path.join(self.output_dir, "cpu.collapsed"), "w") as f:
+            f.write(self.sampler.collapsed())
+        return self.output_dir
+
+
+_run_profiler: Optional[RunProfiler] = None
+
+
+def start_run_profiling(run_name: str, enabled: bool = PROFILE_INGESTION) -> Optional[RunProfiler]:
+    """Start profiling this run if enabled (env var or the caller's CLI flag)"""
+    global _run_profiler
+    if not enabled:
+        return None
+    _run_profiler = RunProfiler(run_name).start()
+    return _run_profiler
+
+
+def stop_run_profiling() -> Optional[str]:
+    global _run_profiler
+    if _run_profiler is None:
+        return None
+    output_dir = _run_profiler.stop()
+    _run_profiler = None
+    return output_dir
+
+
+@contextmanager
+def profile_stage(name: str):
+    """Per-stage memory snapshot and CPU tagging; a no-op unless profiling"""
+    if _run_profiler is None:
+        yield
+        return
+    with _run_profiler.stage(name):
+        yield
+
+
+def debug_token_valid(token: str) -> bool:
+    """Whether `token` grants access to the debug features"""
+    return DEBUG_ENDPOINTS and hmac.compare_digest(token.encode(), DEBUG_TOKEN.encode())
+
+
+class ProfileStore:
+    """The N slowest request profiles"""
+
+    def __init__(self, keep: int = PROFILE_KEEP):
+        self.keep = keep
+        self._heap: List[tuple] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add(self, duration: float, profile: Dict) -> None:
+        with self._lock:
+            profile["id"] = next(self._ids)
+            entry = (duration, profile["id"], profile)
+            if len(self._heap) < self.keep:
+                heapq.heappush(self._heap, entry)
+            elif duration > self._heap[0][0]:
+                heapq.heapreplace(self._heap, entry)
+
+    def summaries(self) -> List[Dict]:
+        with self._lock:
+            entries = sorted(self._heap, reverse=True)
+        return [{k: v for k, v in profile.items() if k != "collapsed"} for _, _, profile in entries]
+
+    def get(self, profile_id: int) -> Optional[Dict]:
+        with self._lock:
+            for _, _, profile in self._heap:
+                if profile["id"] == profile_id:
+                    return profile
+        return None
+
+
+profile_store = ProfileStore()
+
+
+class ProfilingMiddleware:
+    """Samples the stacks of a fraction of requests (or flagged ones)"""
+
+    def __init__(self, app, fraction: float = PROFILE_REQUEST_FRACTION, header: str = PROFILE_HEADER):
+        self.app = app
+        self.fraction = fraction
+        # On-demand profiling is a debug feature: off unless the debug token is configured
+        self.header = header.lower().encode() if DEBUG_ENDPOINTS else b""
+
+    def _wanted(self, scope) -> bool:
+        if self.header and any(name == self.header and debug_token_valid(value.decode("latin-1"))
+                               for name, value in scope.get("headers", [])):
+            return True
+        return self.fraction > 0 and random.random() < self.fraction
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            return await self.app(scope, receive, send)
+
+        # Only the threads that handle requests: this event loop thread and the
+        # threadpool running sync endpoints. Requests served concurrently on
+        # the same threads can still show up.
+        sampler = StackSampler(thread_ids={threading.get_ident()}, thread_names=_THREADPOOL_NAMES).start()
+        status_code = 500
+        start = time.perf_counter()
+
+        async def wrapped_send(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, wrapped_send)
+        finally:
+            duration = time.perf_counter() - start
+            sampler.stop()
+            profile_store.add(duration, {
+                "method": scope.get("method", ""),
+                "path": scope.get("path", ""),
+                "status": status_code,
+                "duration_ms": round(duration * 1000, 3),
+                "samples": sum(sampler.samples.values()),
+                "timestamp": datetime.now().isoformat(),
+                "collapsed": sampler.collapsed(),
+            })
@@ -1,12 +1,21 @@
 import time
 from datetime import datetime
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import json
 import os
 
+STATUS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'status')
+STATUS_FILE = os.path.join(STATUS_DIR, 'current_status.json')
+
+# Counters live in memory; the status file (read by the API in another
+# process) is rewritten at most once per FLUSH_INTERVAL and progress is logged
+# at most once per LOG_INTERVAL.
+FLUSH_INTERVAL = float(os.getenv("PROGRESS_FLUSH_INTERVAL", "0.5"))
+LOG_INTERVAL = float(os.getenv("PROGRESS_LOG_INTERVAL", "5"))
+
 class ProgressMonitor:
-    def __init__(self):
+    def __init__(self, flush_interval: float = FLUSH_INTERVAL, log_interval: float = LOG_INTERVAL):
         self.start_time = None
         self.total_features = 0
         self.processed_features = 0
@@ -14,11 +23,15 @@ class ProgressMonitor:
         self.failed_features = 0
         self.current_status = "Not Started"
         self.logger = logging.getLogger(__name__)
-        
+        self.flush_interval = flush_interval
+        self.log_interval = log_interval
+        self._last_flush = 0.0
+        self._last_log = 0.0
+
         # Create status directory if it doesn't exist
-        self.status_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'status')
+        self.status_dir = STATUS_DIR
         os.makedirs(self.status_dir, exist_ok=True)
-        
+
     def start_process(self, total_features: int):
         """Start monitoring process"""
         self.start_time = time.time()
@@ -26,23 +39,27 @@ class ProgressMonitor:
         self.current_status = "In Progress"
         self._save_status()
         self.logger.info(f"Starting process with {total_features} features to process")
-        
-    def update_progress(self, success: bool = True):
-        """Update progress counters"""
-        self.processed_features += 1
+
+    def update_progress(self, success: bool = True, count: int = 1):
+        """Update progress counters; the file and log are only touched on a throttle"""
+        self.processed_features += count
         if success:
-            self.successful_features += 1
+            self.successful_features += count
         else:
-            self.failed_features += 1
-        
-        self._save_status()
-        self._log_progress()
-        
+            self.failed_features += count
+
+        now = time.monotonic()
+        if now - self._last_flush >= self.flush_interval:
+            self._save_status()
+        if now - self._last_log >= self.log_interval:
+            self._last_log = now
+            self._log_progress()
+
     def complete_process(self):
         """Mark process as complete and log summary"""
         self.current_status = "Completed"
         duration = time.time() - self.start_time
-        
+
         summary = {
             "total_features": self.total_features,
             "successful_features": self.successful_features,
@@ -50,19 +67,27 @@ class ProgressMonitor:
             "duration_seconds": duration,
             "success_rate": (self.successful_features / self.total_features * 100) if self.total_features > 0 else 0
         }
-        
+
         self._save_status()
         self.logger.info("Process completed!")
-        self.logger.info(f"Summary: {json.dumps(summary, indent=2)}")
-        
+        self.logger.info(f"Summary: {json.dumps(summary)}")
+
+    def fail_process(self, error: str):
+        """Mark process as failed and flush the final counters"""
+        self.current_status = "Failed"
+        self._save_status()
+        self.logger.error(
+            f"Process failed after {self.processed_features}/{self.total_features} features: {error}"
+        )
+
     def _log_progress(self):
         """Log current progress"""
         progress = (self.processed_features / self.total_features * 100) if self.total_features > 0 else 0
         self.logger.info(f"Progress: {progress:.2f}% ({self.processed_features}/{self.total_features})")
-        
-    def _save_status(self):
-        """Save current status to file"""
-        status = {
+
+    def status(self) -> Dict[str, Any]:
+        """Current in-memory status"""
+        return {
             "timestamp": datetime.now().isoformat(),
             "status": self.current_status,
             "total_features": self.total_features,
@@ -71,16 +96,27 @@ class ProgressMonitor:
             "failed_features": self.failed_features,
             "progress_percentage": (self.processed_features / self.total_features * 100) if self.total_features > 0 else 0
         }
-        
-        status_file = os.path.join(self.status_dir, 'current_status.json')
-        with open(status_file, 'w') as f:
-            json.dump(status, f, indent=2)
-            
+
+    def _save_status(self):
+        """Atomically replace the status file with the current status"""
+        self._last_flush = time.monotonic()
+        tmp_file = f"{STATUS_FILE}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(self.status(), f)
+        os.replace(tmp_file, STATUS_FILE)
+
+    @staticmethod
+    def status_mtime() -> Optional[int]:
+        """Modification time of the status file in ns, or None if there is none"""
+        try:
+            return os.stat(STATUS_FILE).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
     @staticmethod
     def get_current_status() -> Dict[str, Any]:
         """Read current status from file"""
-        status_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'status', 'current_status.json')
-        if os.path.exists(status_file):
-            with open(status_file, 'r') as f:
+        if os.path.exists(STATUS_FILE):
+            with open(STATUS_FILE, 'r') as f:
                 return json.load(f)
         return {"status": "No status available"}
@@ -0,0 +1,81 @@
+"""Attribute filters on JSONB ``properties`` columns.
+
+* ``prop.<key>=<value>`` - the property equals `value`. Query values are
+  text, so a value that also parses as a JSON number/boolean/null matches
+  either form (``prop.code=7`` matches ``"7"`` and ``7``).
+* ``prop=<json object>`` - JSONB containment, e.g.
+  ``prop={"DISTRICT": "Mysuru", "zone": {"name": "south"}}``. Values are
+  typed JSON and match exactly (``"7"`` does not match ``7``).
+
+A key given both ways (``prop.code=7&prop={"code": 8}``) is rejected.
+
+Every filter compiles to ``properties @> '<json>'``, which the GIN
+(``jsonb_path_ops``) index on the column serves, and combines with the
+spatial predicates of the same query.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+import orjson
+from sqlalchemy import or_
+
+PROPERTY_PREFIX = "prop."
+CONTAINS_PARAM = "prop"
+_TEXT_ONLY = object()
+
+
+@dataclass
+class PropertyFilters:
+    document: Dict[str, Any] = field(default_factory=dict)   # from `prop`, matched exactly
+    values: Dict[str, str] = field(default_factory=dict)     # from `prop.<key>`, widened
+
+    def __bool__(self) -> bool:
+        return bool(self.document or self.values)
+
+
+def parse_property_filters(query_params) -> PropertyFilters:
+    """The `prop` document and every `prop.<key>` query parameter"""
+    filters = PropertyFilters()
+    document = query_params.get(CONTAINS_PARAM)
+    if document:
+        try:
+            filters.document = _as_object(orjson.loads(document))
+        except orjson.JSONDecodeError:
+            raise ValueError(f"{CONTAINS_PARAM} must be a JSON object")
+    for key, value in query_params.items():
+        if key.startswith(PROPERTY_PREFIX) and len(key) > len(PROPERTY_PREFIX):
+            name = key[len(PROPERTY_PREFIX):]
+            if name in filters.document:
+                raise ValueError(f"{key} conflicts with the {name!r} key of {CONTAINS_PARAM}")
+            filters.values[name] = value
+    return filters
+
+
+def _as_object(value) -> Dict[str, Any]:
+    if not isinstance(value, dict):
+        raise ValueError(f"{CONTAINS_PARAM} must be a JSON object")
+    return value
+
+
+def _typed(value: str):
+    """The JSON number/boolean/null a query string value also denotes, if any"""
+    try:
+        parsed = orjson.loads(value)
+    except orjson.JSONDecodeError:
+        return _TEXT_ONLY
+    return _TEXT_ONLY if isinstance(parsed, (str, dict, list)) else parsed
+
+
+def property_clauses(column, filters: PropertyFilters) -> List:
+    """Containment predicates (``@>``) for `filters`, one per ambiguous value plus one for the rest"""
+    exact: Dict[str, Any] = dict(filters.document)
+    clauses = []
+    for key, value in filters.values.items():
+        typed = _typed(value)
+        if typed is _TEXT_ONLY:
+            exact[key] = value
+        else:
+            clauses.append(or_(column.contains({key: value}), column.contains({key: typed})))
+    if exact:
+        clauses.insert(0, column.contains(exact))
+    return clauses
@@ -0,0 +1,170 @@
+"""Per-route API latency with a database vs. serialization breakdown.
+
+``MetricsMiddleware`` puts a :class:`RequestTimings` in a context variable for
+the duration of each request. SQLAlchemy cursor events and :class:`TimedRoute`
+add to it, so the histograms can tell whether a slow route is waiting on SQL
+or on serializing its response. Context variables follow the request into
+threadpool endpoints and into the async engine's greenlets.
+"""
+import asyncio
+import functools
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import Match
+
+from utils.service_metrics import (
+    HTTP_REQUEST_DB_DURATION,
+    HTTP_REQUEST_DB_QUERIES,
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUEST_SERIALIZATION_DURATION,
+    metrics_registry,
+)
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+@dataclass
+class RequestTimings:
+    db_seconds: float = 0.0
+    db_queries: int = 0
+    serialization_seconds: float = 0.0
+    endpoint_returned: Optional[float] = None
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def record_serialization(seconds: float) -> None:
+    timings = _current.get()
+    if timings is not None:
+        timings.serialization_seconds += seconds
+
+
+def instrument_sql_timing(engine: Engine) -> None:
+    """Attribute cursor execution time on `engine` to the current request"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+        timings = _current.get()
+        if timings is not None:
+            timings.db_seconds += elapsed
+            timings.db_queries += 1
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_start_time"):
+            connection.info["query_start_time"].pop()
+
+
+def _mark_endpoint_returned() -> None:
+    timings = _current.get()
+    if timings is not None:
+        timings.endpoint_returned = time.perf_counter()
+
+
+def _timed_endpoint(call: Callable) -> Callable:
+    """Wrap an endpoint so the moment it returns is recorded"""
+    if asyncio.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def timed(*args, **kwargs):
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                _mark_endpoint_returned()
+    else:
+        @functools.wraps(call)
+        def timed(*args, **kwargs):
+            try:
+                return call(*args, **kwargs)
+            finally:
+                _mark_endpoint_returned()
+    timed.timed_endpoint = True
+    return timed
+
+
+class TimedRoute(APIRoute):
+    """Route that reports serialization time: everything from the endpoint
+    returning to the response being ready, i.e. ``response_model``
+    validation, ``jsonable_encoder`` and rendering the body. Responses built
+    inside the endpoint report their own render time (``GeoJSONResponse``).
+    """
+
+    def get_route_handler(self) -> Callable:
+        if not getattr(self.dependant.call, "timed_endpoint", False):
+            self.dependant.call = _timed_endpoint(self.dependant.call)
+        handler = super().get_route_handler()
+
+        async def timed_handler(request: Request) -> Response:
+            response = await handler(request)
+            timings = _current.get()
+            if timings is not None and timings.endpoint_returned is not None:
+                record_serialization(time.perf_counter() - timings.endpoint_returned)
+                timings.endpoint_returned = None
+            return response
+
+        return timed_handler
+
+
+def _route_template(scope) -> str:
+    app = scope.get("app")
+    if app is None:
+        return UNMATCHED_ROUTE
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", UNMATCHED_ROUTE)
+    return UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """Records latency, SQL time and serialization time per route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def wrapped_send(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, wrapped_send)
+        finally:
+            duration = time.perf_counter() - start
+            _current.reset(token)
+            method = scope.get("method", "")
+            route = _route_template(scope)
+            HTTP_REQUEST_DURATION.labels(method=method, route=route, status=str(status_code)).observe(duration)
+            HTTP_REQUEST_DB_DURATION.labels(method=method, route=route).observe(timings.db_seconds)
+            HTTP_REQUEST_DB_QUERIES.labels(method=method, route=route).inc(timings.db_queries)
+            HTTP_REQUEST_SERIALIZATION_DURATION.labels(method=method, route=route) \
+                .observe(timings.serialization_seconds)
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    """Prometheus scrape endpoint"""
+    return Response(generate_latest(metrics_registry()), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,98 @@
+"""Per-run performance reports for ingestion and sync runs.
+
+    with RunTracker("ingestion") as run:
+        ...
+        run.features_processed = n
+
+records resources with a :class:`PerformanceMonitor` for the duration of the
+block, then logs a summary (peak RSS, average CPU, features/sec, share of
+time per traced stage) and stores it in the ``pipeline_runs`` table, so
+throughput can be compared across nightly runs.
+"""
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from config.database import SessionLocal, engine
+from models.pipeline_run import PipelineRun
+from utils.metrics import LAST_RUN_DURATION, LAST_RUN_PEAK_RSS, LAST_RUN_THROUGHPUT, PerformanceMonitor
+from utils.tracing import stage_totals
+
+logger = logging.getLogger(__name__)
+
+
+def stage_percentages(totals: Dict[str, float]) -> Dict[str, float]:
+    """Share of the total traced time spent in each stage, in percent"""
+    total = sum(totals.values())
+    if total <= 0:
+        return {}
+    return {stage: round(seconds / total * 100, 2) for stage, seconds in sorted(totals.items())}
+
+
+class RunTracker:
+    def __init__(self, run_type: str, persist: bool = True):
+        self.run_type = run_type
+        self.persist = persist
+        self.features_processed = 0
+        self.features_failed = 0
+        self.summary: Optional[Dict[str, Any]] = None
+        self._monitor = PerformanceMonitor()
+        self._started_at: Optional[datetime] = None
+        self._start = 0.0
+
+    def __enter__(self) -> "RunTracker":
+        stage_totals(reset=True)
+        self._started_at = datetime.now(timezone.utc)
+        self._start = time.perf_counter()
+        self._monitor.start_monitoring()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._start
+        self._monitor.stop_monitoring()
+        self._monitor.sample()   # short runs get at least one sample
+        resources = self._monitor.summary()
+        self.summary = {
+            "run_type": self.run_type,
+            "status": "failed" if exc_type else "completed",
+            "started_at": self._started_at,
+            "finished_at": datetime.now(timezone.utc),
+            "duration_seconds": duration,
+            "features_processed": self.features_processed,
+            "features_failed": self.features_failed,
+            "features_per_second": self.features_processed / duration if duration > 0 else 0.0,
+            "peak_rss_bytes": resources["peak_rss_bytes"],
+            "avg_cpu_percent": resources["avg_cpu_percent"],
+            "max_threads": resources["max_threads"],
+            "io_read_bytes": resources["io_read_bytes"],
+            "io_write_bytes": resources["io_write_bytes"],
+            "stage_percentages": stage_percentages(stage_totals(reset=True)),
+        }
+        LAST_RUN_THROUGHPUT.labels(run_type=self.run_type).set(self.summary["features_per_second"])
+        LAST_RUN_PEAK_RSS.labels(run_type=self.run_type).set(self.summary["peak_rss_bytes"])
+        LAST_RUN_DURATION.labels(run_type=self.run_type).set(duration)
+        logger.info(
+            f"Run summary ({self.run_type}, {self.summary['status']}): "
+            f"{self.features_processed} features in {duration:.1f}s "
+            f"({self.summary['features_per_second']:.1f}/s), "
+            f"peak RSS {resources['peak_rss_bytes'] / 1024 / 1024:.1f}MB, "
+            f"avg CPU {resources['avg_cpu_percent']:.1f}%, "
+            f"stages {self.summary['stage_percentages']}"
+        )
+        if self.persist:
+            persist_run(self.summary)
+        return False
+
+
+def persist_run(summary: Dict[str, Any]) -> None:
+    """Store a run summary; failures are logged, never raised"""
+    try:
+        PipelineRun.__table__.create(bind=engine, checkfirst=True)
+        with SessionLocal() as db:
+            db.add(PipelineRun(**summary))
+            db.commit()
+    except SQLAlchemyError as e:
+        logger.error(f"Could not store run summary: {str(e)}")
@@ -0,0 +1,62 @@
+"""Fast JSON responses for rows whose geometry is serialized by PostGIS.
+
+Geometry and JSON property columns are selected as text (``ST_AsGeoJSON``,
+``properties::text``) and embedded in the response as raw fragments, so they
+are never parsed, validated or re-encoded in Python.
+"""
+import time
+from typing import Any, Dict, Iterable, Optional
+
+import orjson
+from fastapi import Response
+from sqlalchemy import String, cast, func, select
+
+from utils.request_metrics import record_serialization
+
+
+class GeoJSONResponse(Response):
+    """JSON response rendered with orjson; honours orjson.Fragment values"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        start = time.perf_counter()
+        try:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        finally:
+            record_serialization(time.perf_counter() - start)
+
+
+def fragment(text: Optional[str]):
+    """Embed pre-serialized JSON text as-is, or null"""
+    return orjson.Fragment(text) if text is not None else None
+
+
+def json_columns(model, geometry_precision: int = 9):
+    """Columns of `model` with geometry/properties pre-serialized by the database"""
+    columns = [
+        column
+        for column in model.__table__.columns
+        if column.name not in ("geometry", "properties")
+    ]
+    return [
+        *columns,
+        cast(model.properties, String).label("properties"),
+        func.ST_AsGeoJSON(model.geometry, geometry_precision).label("geometry"),
+    ]
+
+
+def json_select(model, geometry_precision: int = 9):
+    """``select()`` over :func:`json_columns`, ready for `.where()`/`.order_by()`"""
+    return select(*json_columns(model, geometry_precision))
+
+
+def row_to_dict(row) -> Dict[str, Any]:
+    """Response dict for a :func:`json_select` row"""
+    data = dict(row._mapping)
+    data["geometry"] = fragment(data["geometry"])
+    data["properties"] = fragment(data["properties"])
+    return data
+
+
+def rows_to_list(rows: Iterable) -> list:
+    return [row_to_dict(row) for row in rows]
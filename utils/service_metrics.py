@@ -0,0 +1,112 @@
+"""Prometheus metrics for the API service.
+
+Importing this module only creates the multiprocess directory if one is
+configured, so it is safe to import from configuration modules such as
+``config.database``.
+
+Multiprocess mode: when ``PROMETHEUS_MULTIPROC_DIR`` is set before the first
+``prometheus_client`` import, every process writes its samples to that
+directory and :func:`metrics_registry` aggregates them at scrape time. The
+directory must be emptied before the server starts (see ``gunicorn.conf.py``
+and ``config.metrics_config``).
+"""
+import os
+import time
+
+# Samples are written as soon as the first metric is defined, so make sure the
+# directory exists in every process (API, scheduler, scripts, pool workers)
+if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, multiprocess
+
+
+def multiprocess_enabled() -> bool:
+    return bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def metrics_registry() -> CollectorRegistry:
+    """Registry to expose: this process's metrics, or all processes' in multiprocess mode"""
+    if not multiprocess_enabled():
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    'db_pool_checkout_wait_seconds',
+    'Time spent waiting to check a connection out of the pool',
+    ['pool'],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0, float('inf'))
+)
+DB_POOL_IN_USE = Gauge('db_pool_connections_in_use', 'Connections currently checked out', ['pool'],
+                       multiprocess_mode='livesum')
+DB_POOL_OVERFLOW = Gauge('db_pool_overflow_connections', 'Connections open beyond pool_size', ['pool'],
+                         multiprocess_mode='livesum')
+DB_POOL_SIZE = Gauge('db_pool_size', 'Configured pool size', ['pool'], multiprocess_mode='livesum')
+
+
+def instrumented_pool(pool_class, name: str):
+    """Subclass of a SQLAlchemy queue pool that exports checkout wait and usage"""
+
+    class InstrumentedPool(pool_class):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            DB_POOL_SIZE.labels(pool=name).set(self.size())
+
+        def _update_gauges(self):
+            DB_POOL_IN_USE.labels(pool=name).set(self.checkedout())
+            DB_POOL_OVERFLOW.labels(pool=name).set(max(self.overflow(), 0))
+
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            finally:
+                DB_POOL_CHECKOUT_WAIT.labels(pool=name).observe(time.perf_counter() - start)
+                self._update_gauges()
+
+        def _do_return_conn(self, record):
+            super()._do_return_conn(record)
+            self._update_gauges()
+
+    InstrumentedPool.__name__ = f"Instrumented{pool_class.__name__}"
+    return InstrumentedPool
+
+
+EXPORT_ROWS = Counter('export_rows_total', 'Rows written by streaming exports', ['table', 'format'])
+EXPORT_DURATION = Histogram(
+    'export_duration_seconds',
+    'Wall time of completed streaming exports',
+    ['table', 'format'],
+    buckets=(0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, float('inf'))
+)
+
+# Per-request latency, with sub-millisecond buckets for the cached/indexed routes
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf')
+)
+HTTP_REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds',
+    'API request latency by route template',
+    ['method', 'route', 'status'],
+    buckets=LATENCY_BUCKETS
+)
+HTTP_REQUEST_DB_DURATION = Histogram(
+    'http_request_db_seconds',
+    'Time spent executing SQL per API request',
+    ['method', 'route'],
+    buckets=LATENCY_BUCKETS
+)
+HTTP_REQUEST_DB_QUERIES = Counter(
+    'http_request_db_queries_total',
+    'SQL statements executed by API requests',
+    ['method', 'route']
+)
+HTTP_REQUEST_SERIALIZATION_DURATION = Histogram(
+    'http_request_serialization_seconds',
+    'Time spent serializing API responses (response_model validation, encoding, rendering)',
+    ['method', 'route'],
+    buckets=LATENCY_BUCKETS
+)
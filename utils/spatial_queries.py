@@ -0,0 +1,160 @@
+"""Index-backed spatial predicates for PostGIS geometry columns.
+
+Every helper here returns a SQLAlchemy expression built from bound parameters
+(never interpolated WKT), so callers can compose them into their own
+``select()`` and PostgreSQL can plan them against the GIST index on the
+geometry column.
+"""
+import math
+from typing import Iterable, List, Tuple
+
+from geoalchemy2 import Geography, Geometry
+from sqlalchemy import cast, func, inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from utils.logger import db_logger
+
+WGS84_SRID = 4326
+
+# Length of a degree of latitude at the equator, the shortest it gets on WGS84.
+# A degree of longitude is never shorter than this times cos(lat), so dividing
+# a metre radius by both gives a degree box for the `&&` prefilter that is
+# never smaller than the radius.
+METERS_PER_DEGREE = 110574.0
+
+
+def envelope(min_lon: float, min_lat: float, max_lon: float, max_lat: float, srid: int = WGS84_SRID):
+    """Bounding box polygon built with ST_MakeEnvelope from bound parameters"""
+    if min_lon > max_lon or min_lat > max_lat:
+        raise ValueError("Bounding box minimums must not exceed maximums")
+    return func.ST_MakeEnvelope(float(min_lon), float(min_lat), float(max_lon), float(max_lat), srid)
+
+
+def parse_bbox(value: str) -> Tuple[float, float, float, float]:
+    """Parse a `min_lon,min_lat,max_lon,max_lat` query string value"""
+    try:
+        parts = tuple(float(v) for v in value.split(","))
+    except ValueError:
+        raise ValueError("bbox values must be numbers")
+    if len(parts) != 4:
+        raise ValueError("bbox must be min_lon,min_lat,max_lon,max_lat")
+    if parts[0] > parts[2] or parts[1] > parts[3]:
+        raise ValueError("Bounding box minimums must not exceed maximums")
+    return parts
+
+
+def point(lon: float, lat: float, srid: int = WGS84_SRID):
+    """Point geometry built with ST_MakePoint from bound parameters"""
+    return func.ST_SetSRID(func.ST_MakePoint(float(lon), float(lat)), srid)
+
+
+def intersects_bbox(column, min_lon: float, min_lat: float, max_lon: float, max_lat: float):
+    """Geometries touching the bounding box (ST_Intersects implies `&&`)"""
+    return func.ST_Intersects(column, envelope(min_lon, min_lat, max_lon, max_lat))
+
+
+def within_bbox(column, min_lon: float, min_lat: float, max_lon: float, max_lat: float):
+    """Geometries lying completely inside the bounding box"""
+    bbox = envelope(min_lon, min_lat, max_lon, max_lat)
+    # ST_Within already carries an index-aware `&&`, the explicit prefilter
+    # keeps the plan index-backed on PostGIS builds that inline it differently.
+    return column.intersects(bbox) & func.ST_Within(column, bbox)
+
+
+def contains_point(column, lon: float, lat: float):
+    """Geometries containing the given coordinate"""
+    return func.ST_Contains(column, point(lon, lat))
+
+
+def within_distance(column, lon: float, lat: float, meters: float):
+    """Geometries within `meters` of the coordinate, measured on the spheroid.
+
+    The geography cast cannot use the geometry GIST index, so the predicate is
+    paired with a `&&` against a degree box that is never smaller than the
+    requested radius.
+    """
+    if meters < 0:
+        raise ValueError("Distance must be non-negative")
+    origin = point(lon, lat)
+    cos_lat = max(math.cos(math.radians(lat)), 0.01)
+    degrees = meters / (METERS_PER_DEGREE * cos_lat)
+    geography = Geography(srid=WGS84_SRID)
+    return column.intersects(func.ST_Expand(origin, degrees)) & func.ST_DWithin(
+        cast(column, geography), cast(origin, geography), float(meters)
+    )
+
+
+def nearest_order(column, lon: float, lat: float):
+    """KNN ordering (`<->`) answered directly from the GIST index"""
+    return column.distance_centroid(point(lon, lat))
+
+
+def geometry_columns(metadata) -> List[tuple]:
+    """(table, column) pairs for every geometry column declared in metadata"""
+    return [
+        (table.name, column.name)
+        for table in metadata.sorted_tables
+        for column in table.columns
+        if isinstance(column.type, Geometry)
+    ]
+
+
+def ensure_spatial_indexes(engine: Engine, metadatas: Iterable) -> List[str]:
+    """Create a GIST index on every geometry column that exists in the database.
+
+    Tables created outside ``create_all`` (sync jobs, manual loads) do not get
+    GeoAlchemy's automatic index. The indexes are built concurrently, so this
+    is safe to run against a live database (scripts/migrate_spatial_indexes.py).
+    """
+    created = []
+    existing_tables = set(inspect(engine).get_table_names())
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        # ... nor on partitioned tables, whose indexes come from the model
+        partitioned = set(conn.execute(text(
+            "SELECT relname FROM pg_class WHERE relkind = 'p' "
+            "AND relnamespace = current_schema()::regnamespace"
+        )).scalars())
+        for metadata in metadatas:
+            for table, column in geometry_columns(metadata):
+                if table not in existing_tables or table in partitioned:
+                    continue
+                index_name = f"idx_{table}_{column}"
+                conn.execute(text(
+                    f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{index_name}" '
+                    f'ON "{table}" USING GIST ("{column}")'
+                ))
+                created.append(index_name)
+    db_logger.info(f"Spatial indexes ensured: {', '.join(created) or 'none'}")
+    return created
+
+
+def _plan_nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def explain_index_scans(conn: Connection, stmt, disable_seqscan: bool = True) -> List[str]:
+    """Names of the indexes PostgreSQL uses to answer `stmt`.
+
+    Small tables such as `districts` are cheaper to scan sequentially, so by
+    default sequential scans are disabled for the EXPLAIN to show whether the
+    predicate *can* be answered from an index.
+    """
+    compiled = stmt.compile(dialect=conn.dialect)
+    if disable_seqscan:
+        conn.execute(text("SET LOCAL enable_seqscan = off"))
+    try:
+        result = conn.exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+        ).scalar()
+    finally:
+        if disable_seqscan:
+            conn.execute(text("RESET enable_seqscan"))
+    plan = result[0]["Plan"] if isinstance(result, list) else result
+    return [
+        node["Index Name"]
+        for node in _plan_nodes(plan)
+        if "Index Name" in node
+    ]
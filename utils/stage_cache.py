@@ -0,0 +1,180 @@
+"""Small DAG of file-producing stages with content-hash caching.
+
+    pipeline = StagePipeline("data/.my_pipeline_cache.json")
+    pipeline.add(Stage("prepare", prepare, inputs=[src], outputs=[parquet], params={"crs": "EPSG:4326"}))
+    pipeline.add(Stage("export", export, inputs=[parquet], outputs=[geojson]))
+    summary = pipeline.run()
+
+A stage's cache key hashes its name, code, parameters and the content of its
+input files. The code is the stage function's source plus that of everything
+listed in ``depends_on`` (helper functions, or whole modules such as
+``utils.artifacts``), so editing a helper invalidates the stage too. When the
+key matches the last successful run and the outputs are still the files that
+run wrote, the stage is skipped. Stages that consume another stage's outputs
+run after it, and rerun only if those outputs actually changed.
+
+File hashes are remembered by (size, mtime), so unchanged inputs are not
+re-read on every run. Give each pipeline its own manifest: stage records are
+keyed by name only.
+"""
+import hashlib
+import inspect
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class Stage:
+    """``func(inputs, outputs, **params)`` reads `inputs` and writes every path in `outputs`"""
+    name: str
+    func: Callable[..., Any]
+    inputs: Sequence[Path]
+    outputs: Sequence[Path]
+    params: Dict[str, Any] = field(default_factory=dict)
+    depends_on: Sequence[Any] = ()      # functions or modules `func` relies on
+
+
+def _stat_key(path: Path) -> List[int]:
+    stat = path.stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _code_digest(*objects: Any) -> str:
+    digest = hashlib.sha256()
+    for obj in objects:
+        try:
+            source = inspect.getsource(obj)
+        except (OSError, TypeError):
+            source = getattr(obj, "__qualname__", None) or getattr(obj, "__name__", repr(obj))
+        digest.update(source.encode())
+    return digest.hexdigest()
+
+
+class StagePipeline:
+    def __init__(self, manifest_path: Path):
+        self.manifest_path = Path(manifest_path)
+        self.stages: List[Stage] = []
+        self._manifest = self._load_manifest()
+
+    def add(self, stage: Stage) -> Stage:
+        self.stages.append(stage)
+        return stage
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        manifest.setdefault("files", {})
+        manifest.setdefault("stages", {})
+        return manifest
+
+    def _save_manifest(self) -> None:
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(self._manifest, f, indent=2)
+        os.replace(tmp, self.manifest_path)
+
+    def file_digest(self, path: Path) -> str:
+        """sha256 of a file's content, reused while its size and mtime match"""
+        path = Path(path)
+        key = str(path.resolve())
+        stat = _stat_key(path)
+        cached = self._manifest["files"].get(key)
+        if cached and cached["stat"] == stat:
+            return cached["sha256"]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            while chunk := f.read(HASH_CHUNK_SIZE):
+                digest.update(chunk)
+        self._manifest["files"][key] = {"stat": stat, "sha256": digest.hexdigest()}
+        return digest.hexdigest()
+
+    def stage_key(self, stage: Stage) -> str:
+        payload = {
+            "name": stage.name,
+            "code": _code_digest(stage.func, *stage.depends_on),
+            "params": stage.params,
+            "inputs": {str(p): self.file_digest(p) for p in stage.inputs},
+            "outputs": [str(p) for p in stage.outputs],
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _is_current(self, stage: Stage, key: str) -> bool:
+        record = self._manifest["stages"].get(stage.name)
+        if not record or record["key"] != key:
+            return False
+        # Outputs must still be exactly what the recorded run produced
+        for path in stage.outputs:
+            path = Path(path)
+            if not path.exists() or record["outputs"].get(str(path)) != _stat_key(path):
+                return False
+        return True
+
+    def ordered(self) -> List[Stage]:
+        """Stages in dependency order (a stage runs after the producers of its inputs)"""
+        producers = {str(Path(p)): s.name for s in self.stages for p in s.outputs}
+        by_name = {s.name: s for s in self.stages}
+        ordered, visiting, done = [], set(), set()
+
+        def visit(stage: Stage):
+            if stage.name in done:
+                return
+            if stage.name in visiting:
+                raise ValueError(f"Stage cycle through {stage.name!r}")
+            visiting.add(stage.name)
+            for path in stage.inputs:
+                producer = producers.get(str(Path(path)))
+                if producer and producer != stage.name:
+                    visit(by_name[producer])
+            visiting.discard(stage.name)
+            done.add(stage.name)
+            ordered.append(stage)
+
+        for stage in self.stages:
+            visit(stage)
+        return ordered
+
+    def run(self, force: bool = False) -> Dict[str, Any]:
+        """Run stages whose inputs changed; returns a summary with cache hits"""
+        summary = {"stages": {}, "cache_hits": 0, "cache_misses": 0}
+        start = time.perf_counter()
+        try:
+            for stage in self.ordered():
+                stage_start = time.perf_counter()
+                key = self.stage_key(stage)
+                if not force and self._is_current(stage, key):
+                    summary["cache_hits"] += 1
+                    summary["stages"][stage.name] = {"status": "cached", "seconds": 0.0}
+                    logger.info(f"Stage {stage.name}: cached ({key[:12]})")
+                    continue
+
+                logger.info(f"Stage {stage.name}: running")
+                for path in stage.outputs:
+                    Path(path).parent.mkdir(parents=True, exist_ok=True)
+                stage.func(stage.inputs, stage.outputs, **stage.params)
+                self._manifest["stages"][stage.name] = {
+                    "key": key,
+                    "outputs": {str(Path(p)): _stat_key(Path(p)) for p in stage.outputs},
+                    "completed_at": time.time(),
+                }
+                elapsed = time.perf_counter() - stage_start
+                summary["cache_misses"] += 1
+                summary["stages"][stage.name] = {"status": "ran", "seconds": round(elapsed, 3)}
+                logger.info(f"Stage {stage.name}: done in {elapsed:.2f}s")
+        finally:
+            # Stages that finished stay cached even if a later one failed
+            self._save_manifest()
+            summary["duration_seconds"] = round(time.perf_counter() - start, 3)
+        return summary
@@ -0,0 +1,160 @@
+"""Incremental parsers for streamed request bodies.
+
+Both parsers consume an async iterator of byte chunks (``request.stream()``)
+and yield ``(item, error)`` pairs as soon as each item is complete, so a
+large bulk body is never held in memory as a whole. A single item larger
+than ``MAX_ITEM_BYTES`` is rejected instead of buffered.
+"""
+import codecs
+import json
+import re
+from typing import Any, AsyncIterator, List, Optional, Tuple
+
+import orjson
+
+ParsedItem = Tuple[Optional[Any], Optional[str]]
+
+# Largest single item (NDJSON line or array element) that is buffered
+MAX_ITEM_BYTES = 16 * 1024 * 1024
+
+# Minimum growth of the buffer before re-trying to decode a partial item
+_RETRY_BYTES = 64 * 1024
+
+# What may be left of a number or literal cut off at the end of the buffer
+_PARTIAL_TOKEN = re.compile(r"[-+0-9.eE]*|t(r(ue?)?)?|f(a(l(se?)?)?)?|n(u(ll?)?)?")
+_PARTIAL_ESCAPE = re.compile(r"u[0-9a-fA-F]{0,4}(\\(u[0-9a-fA-F]{0,4})?)?")
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes],
+                      max_line_bytes: int = MAX_ITEM_BYTES) -> AsyncIterator[ParsedItem]:
+    """Yield one parsed object per non-blank line; bad or oversized lines yield an error.
+
+    Only the newly received chunk is searched for line breaks, and the pieces
+    of a line are joined once it is complete.
+    """
+    pieces: List[bytes] = []
+    size = 0
+    oversized = False
+    async for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end < 0:
+                break
+            if oversized or size + end - start > max_line_bytes:
+                yield None, f"Line exceeds {max_line_bytes} bytes"
+            else:
+                pieces.append(chunk[start:end])
+                line = b"".join(pieces)
+                if line.strip():
+                    yield _loads_line(line)
+            pieces, size, oversized = [], 0, False
+            start = end + 1
+        rest = chunk[start:]
+        if rest and not oversized:
+            if size + len(rest) > max_line_bytes:
+                # Drop the line's bytes and skip to the next line break
+                pieces, size, oversized = [], 0, True
+            else:
+                pieces.append(rest)
+                size += len(rest)
+    if oversized:
+        yield None, f"Line exceeds {max_line_bytes} bytes"
+    elif pieces:
+        line = b"".join(pieces)
+        if line.strip():
+            yield _loads_line(line)
+
+
+def _loads_line(line: bytes) -> ParsedItem:
+    try:
+        return orjson.loads(line), None
+    except orjson.JSONDecodeError as e:
+        return None, f"Invalid JSON: {e}"
+
+
+def _truncated(text: str, error: json.JSONDecodeError) -> bool:
+    """Whether `error` comes from an item cut off at the end of `text`
+    (more data may complete it) rather than from invalid JSON"""
+    if error.msg.startswith("Unterminated string"):
+        return True  # the string runs to the end of the buffer
+    tail = text[error.pos:]
+    if error.msg.startswith("Invalid \\uXXXX escape"):
+        return _PARTIAL_ESCAPE.fullmatch(tail) is not None
+    return _PARTIAL_TOKEN.fullmatch(tail) is not None
+
+
+def _skip_whitespace(text: str, pos: int) -> int:
+    while pos < len(text) and text[pos] in " \t\r\n":
+        pos += 1
+    return pos
+
+
+async def iter_json_array(chunks: AsyncIterator[bytes],
+                          max_item_bytes: int = MAX_ITEM_BYTES) -> AsyncIterator[ParsedItem]:
+    """Yield the objects of a top-level JSON array one at a time.
+
+    Raises ValueError when the body is not an array of objects, or as soon as
+    a syntax error is found; unlike NDJSON it cannot be skipped because the
+    parser cannot resynchronise.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    text, pos = "", 0
+    state = "start"          # start -> first -> (item -> separator)* -> done
+    retry_at = 0
+    finished = False
+
+    while not finished:
+        try:
+            chunk = await chunks.__anext__()
+            text = text[pos:] + text_decoder.decode(chunk)
+        except StopAsyncIteration:
+            text = text[pos:] + text_decoder.decode(b"", final=True)
+            finished = True
+        pos = 0
+
+        while True:
+            pos = _skip_whitespace(text, pos)
+            if pos >= len(text):
+                break
+            char = text[pos]
+            if state == "start":
+                if char != "[":
+                    raise ValueError("Request body must be a JSON array or NDJSON")
+                pos, state = pos + 1, "first"
+            elif state == "separator":
+                if char == ",":
+                    pos, state = pos + 1, "item"
+                elif char == "]":
+                    pos, state = pos + 1, "done"
+                else:
+                    raise ValueError(f"Expected ',' or ']' in JSON array, got {char!r}")
+            elif state == "first" and char == "]":
+                pos, state = pos + 1, "done"
+            elif state in ("first", "item"):
+                if char != "{":
+                    raise ValueError("JSON array items must be objects")
+                if not finished and len(text) - pos < retry_at:
+                    break
+                try:
+                    item, pos = decoder.raw_decode(text, pos)
+                except json.JSONDecodeError as e:
+                    if finished:
+                        raise ValueError("Truncated or invalid JSON array item")
+                    if not _truncated(text, e):
+                        raise ValueError(f"Invalid JSON array item: {e}")
+                    pending = len(text) - pos
+                    if pending > max_item_bytes:
+                        raise ValueError(f"JSON array item exceeds {max_item_bytes} bytes")
+                    # Wait for the buffer to grow before decoding the item again
+                    retry_at = pending + max(pending, _RETRY_BYTES)
+                    break
+                retry_at = 0
+                state = "separator"
+                yield item, None
+            else:
+                raise ValueError("Unexpected data after the end of the JSON array")
+
+    if state != "done":
+        raise ValueError("Truncated JSON array")
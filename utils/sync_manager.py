@@ -2,11 +2,16 @@ import hashlib
 import json
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
 import requests
 from sqlalchemy.orm import Session
 from models.district import District
 from database import get_db
 from utils.logger import setup_logger
+from utils.district_index import district_index
+from utils.cache import district_cache
+from utils.run_report import RunTracker
+from utils.tracing import span
 
 sync_logger = setup_logger('sync', 'sync.log')
 
@@ -77,34 +82,57 @@ class DataSyncManager:
             sync_logger.error(f"Error updating database: {str(e)}")
             raise
 
-    def sync(self):
-        """Main synchronization method"""
+    def sync(self, track_run: bool = False):
+        """Main synchronization method.
+
+        `track_run` records a performance report (utils.run_report); only
+        standalone runs should ask for one, since it samples the whole
+        process and resets the process-wide stage totals.
+        """
         try:
             sync_logger.info("Starting data synchronization")
-            
-            # Fetch current data
-            source_data = self.fetch_source_data()
-            
-            # Check if sync is needed
-            if not self.sync_required(source_data):
-                sync_logger.info("Data is already up to date")
-                return False
-            
-            # Update database
-            db = next(get_db())
-            self.update_database(source_data, db)
-            
-            # Save sync info
-            self.save_sync_info(self.calculate_hash(json.dumps(source_data)))
-            
-            sync_logger.info("Synchronization completed successfully")
-            return True
+
+            if track_run:
+                with RunTracker("sync") as run:
+                    updated = self._sync(run)
+            else:
+                updated = self._sync()
+
+            if updated:
+                sync_logger.info("Synchronization completed successfully")
+            return updated
             
         except Exception as e:
             sync_logger.error(f"Synchronization failed: {str(e)}")
             raise
 
-def run_sync():
+    def _sync(self, run: Optional[RunTracker] = None) -> bool:
+        # Fetch current data
+        with span("fetch"):
+            source_data = self.fetch_source_data()
+
+        # Check if sync is needed
+        if not self.sync_required(source_data):
+            sync_logger.info("Data is already up to date")
+            if run is not None:
+                run.persist = False  # no-op checks would skew throughput history
+            return False
+
+        # Update database
+        db = next(get_db())
+        with span("db_write"):
+            self.update_database(source_data, db)
+        with span("index"):
+            district_index.load(db)
+        district_cache.clear()
+        if run is not None:
+            run.features_processed = len(source_data["features"])
+
+        # Save sync info
+        self.save_sync_info(self.calculate_hash(json.dumps(source_data)))
+        return True
+
+def run_sync(track_run: bool = False):
     """Convenience function to run synchronization"""
     sync_manager = DataSyncManager()
-    return sync_manager.sync()
+    return sync_manager.sync(track_run=track_run)
@@ -0,0 +1,152 @@
+"""Minimal TopoJSON encoder for polygonal feature collections.
+
+Coordinates are quantized onto an integer grid, rings are cut at junctions
+(vertices where neighbouring polygons stop sharing a boundary) and identical
+arcs are stored once, so the edge between two adjacent districts is sent a
+single time and referenced by both.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import shapely
+from shapely.geometry import MultiPolygon, Polygon
+
+Point = Tuple[int, int]
+Ring = List[Point]
+
+
+class _Quantizer:
+    def __init__(self, bounds: Tuple[float, float, float, float], quantization: int):
+        x0, y0, x1, y1 = bounds
+        self.x0, self.y0 = x0, y0
+        self.kx = (x1 - x0) / (quantization - 1) if x1 > x0 else 1.0
+        self.ky = (y1 - y0) / (quantization - 1) if y1 > y0 else 1.0
+
+    def ring(self, coords: np.ndarray) -> Ring:
+        qx = np.round((coords[:, 0] - self.x0) / self.kx).astype(np.int64)
+        qy = np.round((coords[:, 1] - self.y0) / self.ky).astype(np.int64)
+        # Drop vertices that collapse onto their predecessor after snapping
+        keep = np.ones(len(qx), dtype=bool)
+        keep[1:] = (qx[1:] != qx[:-1]) | (qy[1:] != qy[:-1])
+        ring = list(zip(qx[keep].tolist(), qy[keep].tolist()))
+        if ring[0] != ring[-1]:
+            ring.append(ring[0])
+        return ring
+
+    @property
+    def transform(self) -> Dict[str, List[float]]:
+        return {"scale": [self.kx, self.ky], "translate": [self.x0, self.y0]}
+
+
+def _polygons(geom) -> List[Polygon]:
+    if isinstance(geom, Polygon):
+        return [geom]
+    if isinstance(geom, MultiPolygon):
+        return list(geom.geoms)
+    raise ValueError(f"TopoJSON encoding supports polygonal geometries, got {geom.geom_type}")
+
+
+def _find_junctions(rings: Iterable[Ring]) -> set:
+    """Vertices whose neighbours differ between the rings that share them"""
+    neighbours: Dict[Point, Tuple[Point, Point]] = {}
+    junctions = set()
+    for ring in rings:
+        open_ring = ring[:-1]
+        n = len(open_ring)
+        for i, p in enumerate(open_ring):
+            a, b = open_ring[i - 1], open_ring[(i + 1) % n]
+            pair = (a, b) if a <= b else (b, a)
+            seen = neighbours.setdefault(p, pair)
+            if seen != pair:
+                junctions.add(p)
+    return junctions
+
+
+def _rotate_to_min(open_ring: Ring) -> Ring:
+    start = open_ring.index(min(open_ring))
+    rotated = open_ring[start:] + open_ring[:start]
+    return rotated + [rotated[0]]
+
+
+class _ArcIndex:
+    def __init__(self):
+        self.arcs: List[Ring] = []
+        self._index: Dict[Tuple[Point, ...], int] = {}
+
+    def add(self, arc: Ring, reverse_key: Optional[Tuple[Point, ...]] = None) -> int:
+        """Index of `arc`, or the one's complement when stored reversed"""
+        key = tuple(arc)
+        if key in self._index:
+            return self._index[key]
+        rkey = reverse_key if reverse_key is not None else key[::-1]
+        if rkey in self._index:
+            return ~self._index[rkey]
+        self._index[key] = len(self.arcs)
+        self.arcs.append(arc)
+        return len(self.arcs) - 1
+
+    def ring(self, ring: Ring, junctions: set) -> List[int]:
+        open_ring = ring[:-1]
+        if len(open_ring) < 3:
+            # Ring collapsed below the quantization grid; keep it as-is
+            return [self.add(ring)]
+        cuts = [i for i, p in enumerate(open_ring) if p in junctions]
+        if not cuts:
+            # Closed ring shared with nobody else (or shared whole): canonical rotation
+            forward = _rotate_to_min(open_ring)
+            backward = _rotate_to_min(open_ring[::-1])
+            return [self.add(forward, tuple(backward))]
+        start = cuts[0]
+        rotated = open_ring[start:] + open_ring[:start]
+        closed = rotated + [rotated[0]]
+        positions = [i - start for i in cuts] + [len(rotated)]
+        return [self.add(closed[a:b + 1]) for a, b in zip(positions, positions[1:])]
+
+    def encoded(self) -> List[List[List[int]]]:
+        """Arcs delta-encoded against their previous vertex"""
+        result = []
+        for arc in self.arcs:
+            pts = np.asarray(arc, dtype=np.int64)
+            deltas = np.vstack([pts[:1], np.diff(pts, axis=0)])
+            result.append(deltas.tolist())
+        return result
+
+
+def encode_topology(features: List[Dict[str, Any]], quantization: int = 10000,
+                    object_name: str = "districts") -> Dict[str, Any]:
+    """Encode features with Shapely `geometry`, `id` and `properties` as TopoJSON"""
+    if quantization < 2:
+        raise ValueError("Quantization must be at least 2")
+    geoms = [f["geometry"] for f in features]
+    bounds = tuple(shapely.total_bounds(np.asarray(geoms, dtype=object)).tolist()) if geoms else (0, 0, 0, 0)
+    quantizer = _Quantizer(bounds, quantization)
+
+    quantized = [
+        [
+            [quantizer.ring(np.asarray(poly.exterior.coords))]
+            + [quantizer.ring(np.asarray(hole.coords)) for hole in poly.interiors]
+            for poly in _polygons(geom)
+        ]
+        for geom in geoms
+    ]
+    junctions = _find_junctions(ring for polys in quantized for rings in polys for ring in rings)
+
+    arc_index = _ArcIndex()
+    geometries = []
+    for feature, polys in zip(features, quantized):
+        arcs = [[arc_index.ring(ring, junctions) for ring in rings] for rings in polys]
+        is_multi = isinstance(feature["geometry"], MultiPolygon)
+        geometries.append({
+            "type": "MultiPolygon" if is_multi else "Polygon",
+            "arcs": arcs if is_multi else arcs[0],
+            "id": feature.get("id"),
+            "properties": feature.get("properties") or {},
+        })
+
+    return {
+        "type": "Topology",
+        "bbox": list(bounds),
+        "transform": quantizer.transform,
+        "objects": {object_name: {"type": "GeometryCollection", "geometries": geometries}},
+        "arcs": arc_index.encoded(),
+    }
@@ -0,0 +1,133 @@
+"""Lightweight per-stage tracing for the ingestion scripts.
+
+    with span("validate"):
+        geom.is_valid
+
+Every span is observed in the ``ingestion_stage_seconds`` histogram (labelled
+by stage, with microsecond-range buckets). When a trace is started with
+:func:`start_trace` (or ``TRACE_DIR`` is set for :func:`start_run_trace`), spans
+are also recorded as Chrome trace events and written as JSON that loads in
+``chrome://tracing`` or Perfetto.
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from functools import wraps
+from typing import Any, Dict, List, Optional
+
+from utils.metrics import STAGE_DURATION
+
+TRACE_DIR = os.getenv("TRACE_DIR")
+# Events kept per trace; spans beyond this are still counted in the histogram
+TRACE_MAX_EVENTS = int(os.getenv("TRACE_MAX_EVENTS", "1000000"))
+
+_observers: Dict[str, Any] = {}
+_stage_totals: Dict[str, float] = {}
+_totals_lock = threading.Lock()
+_trace_lock = threading.Lock()
+_trace_events: Optional[List[dict]] = None
+_trace_path: Optional[str] = None
+_trace_origin = 0.0
+
+
+def _observer(name: str):
+    observer = _observers.get(name)
+    if observer is None:
+        observer = _observers[name] = STAGE_DURATION.labels(stage=name)
+    return observer
+
+
+class span:
+    """Context manager timing one stage; cheap enough for per-feature use"""
+    __slots__ = ("name", "args", "_start")
+
+    def __init__(self, name: str, **args):
+        self.name = name
+        self.args = args
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        elapsed = end - self._start
+        _observer(self.name).observe(elapsed)
+        with _totals_lock:
+            _stage_totals[self.name] = _stage_totals.get(self.name, 0.0) + elapsed
+        if _trace_events is not None:
+            _record(self.name, self._start, end, self.args, exc_type)
+        return False
+
+
+def stage_totals(reset: bool = False) -> Dict[str, float]:
+    """Seconds spent in each stage since the last reset (summed across threads)"""
+    with _totals_lock:
+        totals = dict(_stage_totals)
+        if reset:
+            _stage_totals.clear()
+    return totals
+
+
+def traced(name: Optional[str] = None):
+    """Decorator wrapping a whole function in a span"""
+    def decorator(func):
+        stage = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _record(name: str, start: float, end: float, args: dict, exc_type) -> None:
+    event = {
+        "name": name,
+        "ph": "X",
+        "ts": (start - _trace_origin) * 1e6,
+        "dur": (end - start) * 1e6,
+        "pid": os.getpid(),
+        "tid": threading.get_ident(),
+    }
+    if args or exc_type:
+        event["args"] = {**args, **({"error": exc_type.__name__} if exc_type else {})}
+    with _trace_lock:
+        if _trace_events is not None and len(_trace_events) < TRACE_MAX_EVENTS:
+            _trace_events.append(event)
+
+
+def start_trace(path: str) -> None:
+    """Record spans as Chrome trace events until :func:`stop_trace`"""
+    global _trace_events, _trace_path, _trace_origin
+    with _trace_lock:
+        _trace_events = []
+        _trace_path = path
+        _trace_origin = time.perf_counter()
+
+
+def start_run_trace(run_name: str) -> Optional[str]:
+    """Start a trace file for this run under ``TRACE_DIR``, if configured"""
+    if not TRACE_DIR:
+        return None
+    os.makedirs(TRACE_DIR, exist_ok=True)
+    path = os.path.join(TRACE_DIR, f"{run_name}_{datetime.now():%Y%m%d_%H%M%S}.json")
+    start_trace(path)
+    return path
+
+
+def stop_trace() -> Optional[str]:
+    """Write the recorded events and stop tracing; returns the file path"""
+    global _trace_events, _trace_path
+    with _trace_lock:
+        events, path = _trace_events, _trace_path
+        _trace_events, _trace_path = None, None
+    if events is None or path is None:
+        return None
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    return path
@@ -0,0 +1,164 @@
+"""Background processing of uploaded geospatial files.
+
+Uploads are spooled to a temporary file in fixed-size chunks and handed to a
+worker thread that streams features out of the file into columnar feature
+batches and bulk-inserts them, geometry encoded as EWKB from the batch
+arrays. All batches of a job go into one transaction, so a job that fails
+stores nothing. The request returns immediately with an upload id whose
+progress can be polled until ``UPLOAD_JOB_TTL`` seconds after the job has
+finished.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Optional
+import os
+import tempfile
+
+import aiofiles
+import fiona
+from fastapi import UploadFile
+from geoalchemy2 import WKBElement
+from sqlalchemy import insert
+
+from config.database import SessionLocal
+from models.geospatial import GeospatialData
+from utils.feature_batch import FeatureBatchBuilder, prepare_batch
+from utils.logger import api_logger
+
+UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "geospatial_uploads")))
+SPOOL_CHUNK_SIZE = 1024 * 1024      # bytes read from the request per await
+INSERT_BATCH_SIZE = 1000            # features per INSERT
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "2"))
+UPLOAD_JOB_TTL = float(os.getenv("UPLOAD_JOB_TTL", "3600"))  # seconds a finished job stays pollable
+
+
+@dataclass
+class UploadJob:
+    id: str
+    filename: str
+    path: Path
+    data_type: str
+    status: str = "queued"
+    total_features: Optional[int] = None
+    processed_features: int = 0
+    failed_features: int = 0
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        progress = None
+        if self.total_features:
+            progress = (self.processed_features + self.failed_features) / self.total_features * 100
+        return {
+            "upload_id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "total_features": self.total_features,
+            "processed_features": self.processed_features,
+            "failed_features": self.failed_features,
+            "progress_percentage": progress,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class UploadManager:
+    def __init__(self, max_workers: int = UPLOAD_WORKERS, job_ttl: float = UPLOAD_JOB_TTL):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="upload")
+        self._jobs: Dict[str, UploadJob] = {}
+        self._lock = threading.Lock()
+        self.job_ttl = job_ttl
+
+    async def start(self, file: UploadFile, data_type: str = "geojson") -> UploadJob:
+        """Spool the upload to disk and queue it for background ingestion"""
+        UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+        upload_id = uuid.uuid4().hex
+        path = UPLOAD_DIR / f"{upload_id}{Path(file.filename).suffix}"
+        try:
+            async with aiofiles.open(path, "wb") as out:
+                while chunk := await file.read(SPOOL_CHUNK_SIZE):
+                    await out.write(chunk)
+        except BaseException:
+            path.unlink(missing_ok=True)
+            raise
+
+        job = UploadJob(id=upload_id, filename=file.filename, path=path, data_type=data_type)
+        with self._lock:
+            self._expire()
+            self._jobs[upload_id] = job
+        self._executor.submit(self._process, job)
+        api_logger.info(f"Upload {upload_id} ({file.filename}) queued for processing")
+        return job
+
+    def get(self, upload_id: str) -> Optional[UploadJob]:
+        with self._lock:
+            self._expire()
+            return self._jobs.get(upload_id)
+
+    def _expire(self) -> None:
+        """Forget jobs that finished more than `job_ttl` seconds ago (lock held)"""
+        cutoff = time.time() - self.job_ttl
+        expired = [
+            upload_id for upload_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for upload_id in expired:
+            del self._jobs[upload_id]
+
+    def _process(self, job: UploadJob):
+        job.status = "processing"
+        db = SessionLocal()
+        try:
+            with fiona.open(job.path) as source:
+                job.total_features = len(source)
+                builder = FeatureBatchBuilder()
+                for feature in source:
+                    try:
+                        builder.append(feature.__geo_interface__)
+                    except Exception as e:
+                        job.failed_features += 1
+                        api_logger.warning(f"Upload {job.id}: skipping invalid feature: {str(e)}")
+                    if builder.count >= INSERT_BATCH_SIZE:
+                        self._insert(db, job, builder)
+                self._insert(db, job, builder)
+            db.commit()
+            job.status = "completed"
+            api_logger.info(f"Upload {job.id} completed: {job.processed_features} features stored")
+        except Exception as e:
+            db.rollback()
+            job.processed_features = 0  # rolled back with the transaction
+            job.status = "failed"
+            job.error = str(e)
+            api_logger.error(f"Upload {job.id} failed, no features stored: {str(e)}")
+        finally:
+            job.finished_at = time.time()
+            db.close()
+            job.path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _insert(db, job: UploadJob, builder: FeatureBatchBuilder):
+        rows = []
+        for batch in builder.build():
+            batch, dropped = prepare_batch(batch)
+            job.failed_features += dropped
+            for properties, ewkb in zip(batch.property_dicts(), batch.to_ewkb()):
+                rows.append({
+                    "name": properties.get("name", job.filename),
+                    "data_type": job.data_type,
+                    "source": job.filename,
+                    "properties": properties,
+                    "geometry": WKBElement(ewkb, srid=4326, extended=True),
+                })
+        if not rows:
+            return
+        db.execute(insert(GeospatialData), rows)
+        job.processed_features += len(rows)
+
+
+upload_manager = UploadManager()